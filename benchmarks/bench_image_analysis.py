@@ -0,0 +1,201 @@
+# benchmarks/bench_image_analysis.py
+"""
+Offline benchmarks for the image analysis hot paths.
+
+Runs every analysis on synthetic thumbnails at YouTube's default (120x90),
+hq (480x360) and maxres (1280x720) sizes, plus any images dropped into
+benchmarks/fixtures/, and reports wall time, peak traced memory and
+throughput. Palette strategies also report their error against 'exact'
+(0 is identical, 1 is the RGB cube diagonal). Results are written as JSON
+so two runs can be diffed:
+
+    python benchmarks/bench_image_analysis.py --output before.json
+    python benchmarks/bench_image_analysis.py --output after.json --compare before.json
+
+The analysis result cache is bypassed, so every repeat does the real work.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from utils import image_analysis
+from utils.palette import PALETTE_STRATEGIES, compare_palette_strategies, extract_palette
+
+SIZES = {'default': (120, 90), 'hq': (480, 360), 'maxres': (1280, 720)}
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def synthetic_thumbnail(size, seed: int = 0) -> Image.Image:
+    """
+    A deterministic thumbnail-like image: gradient background, a few solid
+    shapes, a bright "face" blob and a block of large text.
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    channels = np.broadcast_arrays(x * 200 + 30 * y, y * 180 + 20, (1 - x) * 220 * (1 - y) + 20)
+    base = np.stack(channels, axis=2)
+    noise = rng.normal(0, 6, (height, width, 3))
+    image = Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+
+    draw = ImageDraw.Draw(image)
+    for _ in range(4):
+        x0, y0 = rng.integers(0, width * 0.7), rng.integers(0, height * 0.7)
+        x1, y1 = x0 + rng.integers(width // 10, width // 3), y0 + rng.integers(height // 10, height // 3)
+        draw.rectangle([x0, y0, x1, y1], fill=tuple(int(c) for c in rng.integers(0, 256, 3)))
+    draw.ellipse([width * 0.6, height * 0.2, width * 0.85, height * 0.75], fill=(235, 190, 160))
+    draw.text((width * 0.05, height * 0.7), "TOP 10 TIPS", fill=(255, 255, 0))
+    return image
+
+
+def load_images() -> Dict[str, Image.Image]:
+    images = {f'synthetic_{name}': synthetic_thumbnail(size, seed=i)
+              for i, (name, size) in enumerate(SIZES.items())}
+    if os.path.isdir(FIXTURES_DIR):
+        for filename in sorted(os.listdir(FIXTURES_DIR)):
+            if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
+                image = Image.open(os.path.join(FIXTURES_DIR, filename))
+                image.load()
+                images[f'fixture_{os.path.splitext(filename)[0]}'] = image
+    return images
+
+
+def measure(func: Callable[[], object], repeats: int, items: int = 1) -> Dict[str, float]:
+    """Wall time over `repeats` runs, plus peak traced memory from one extra run."""
+    func()  # warm-up: lazy imports, model loads, allocator
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        'median_ms': median * 1000,
+        'min_ms': min(times) * 1000,
+        'peak_mb': peak / (1024 * 1024),
+        'items_per_s': items / median if median else float('inf'),
+    }
+
+
+def palette_errors(image: Image.Image, n_colors: int) -> Dict[str, float]:
+    """Each palette strategy's error against the 'exact' palette for one image."""
+    return {name: scores['error'] for name, scores in compare_palette_strategies(image, n_colors).items()}
+
+
+def build_cases(images: Dict[str, Image.Image], n_colors: int, with_ocr: bool):
+    cases = []
+    for image_name, image in images.items():
+        for strategy in PALETTE_STRATEGIES:
+            cases.append((f'analyze_colors[{strategy}]', image_name,
+                          lambda image=image, strategy=strategy: extract_palette(image, n_colors, strategy), 1))
+        cases.append(('analyze_image_composition', image_name,
+                      lambda image=image: image_analysis._composition_metrics.uncached(image), 1))
+        composition = image_analysis._composition_metrics.uncached(image)
+        cases.append(('get_composition_insights', image_name,
+                      lambda composition=composition: image_analysis.get_composition_insights(composition), 1))
+        if with_ocr:
+            for mode in image_analysis.OCR_MODES:
+                cases.append((f'detect_text[{mode}]', image_name,
+                              lambda image=image, mode=mode: image_analysis._read_text.uncached(image, mode), 1))
+    return cases
+
+
+def run(repeats: int, n_colors: int, with_ocr: bool, only: Optional[str] = None) -> Dict:
+    images = load_images()
+    results: List[Dict] = []
+    errors: Dict[str, Dict[str, float]] = {}
+    for function, image_name, func, items in build_cases(images, n_colors, with_ocr):
+        if only and only not in function:
+            continue
+        try:
+            stats = measure(func, repeats, items)
+            if function.startswith('analyze_colors['):
+                if image_name not in errors:
+                    errors[image_name] = palette_errors(images[image_name], n_colors)
+                stats['error_vs_exact'] = errors[image_name][function[len('analyze_colors['):-1]]
+        except Exception as e:
+            stats = {'error': str(e)}
+        row = {'function': function, 'image': image_name, 'size': list(images[image_name].size)
+               if image_name in images else None, **stats}
+        results.append(row)
+        print(f"{function:36s} {image_name:22s} "
+              + (f"{stats['median_ms']:10.2f} ms {stats['peak_mb']:8.1f} MB {stats['items_per_s']:10.1f}/s"
+                 + (f"  error {stats['error_vs_exact']:.4f}" if 'error_vs_exact' in stats else '')
+                 if 'error' not in stats else f"error: {stats['error']}"),
+              file=sys.stderr)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'repeats': repeats,
+            'n_colors': n_colors,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> int:
+    """Print per-case speed ratios against a baseline; return the number of regressions."""
+    base = {(r['function'], r['image']): r for r in baseline['results'] if 'median_ms' in r}
+    regressions = 0
+    for row in current['results']:
+        old = base.get((row['function'], row['image']))
+        if old is None or 'median_ms' not in row:
+            continue
+        ratio = row['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{row['function']:36s} {row['image']:22s} {old['median_ms']:10.2f} -> "
+              f"{row['median_ms']:10.2f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the image analysis hot paths")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--colors', type=int, default=5)
+    parser.add_argument('--skip-ocr', action='store_true', help="Skip detect_text (needs easyocr models)")
+    parser.add_argument('--only', help="Only run functions whose name contains this string")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Slowdown ratio above which --compare reports a regression")
+    args = parser.parse_args(argv)
+
+    report = run(args.repeats, args.colors, not args.skip_ocr, args.only)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if compare(report, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# src/cli.py
+
+import os
+import sys
+import logging
+import argparse
+from datetime import date
+from typing import List, Optional
+
+from utils.api import analyze_videos, channel_report, similar_videos, write_frame
+from utils.batch import iter_file_video_ids
+from utils.channel_sync import DEFAULT_REFRESH_DAYS
+from utils.quota import background_priority
+from utils.tracing import collect_trace, prometheus_text, trace_json
+
+
+def _report_progress(done: int, row) -> None:
+    print(f"\r{done} analyzed {row['video_id']} {row['status']}", end='', file=sys.stderr, flush=True)
+
+
+def _analyze(args) -> int:
+    videos = list(args.videos)
+    if args.file:
+        videos.extend(iter_file_video_ids(args.file))
+    if not videos:
+        raise SystemExit("analyze: give at least one URL/ID or --file")
+
+    api_key = None if args.no_details else os.getenv('YOUTUBE_API_KEY')
+    frame = analyze_videos(videos, api_key=api_key, workers=args.workers, n_colors=args.colors,
+                           progress=None if args.quiet else _report_progress)
+    if not args.quiet:
+        print(file=sys.stderr)
+    write_frame(frame, args.output)
+    return 0 if (frame['status'] == 'ok').all() else 1
+
+
+def _channel(args) -> int:
+    api_key = None if args.no_sync else os.getenv('YOUTUBE_API_KEY')
+    if not api_key and not args.no_sync:
+        raise SystemExit("channel: YOUTUBE_API_KEY must be set (or pass --no-sync to use stored data)")
+
+    frame = channel_report(args.channel_id, api_key, start=args.start, end=args.end,
+                           refresh_days=args.refresh_days, analyze=args.analyze,
+                           workers=args.workers, n_colors=args.colors)
+    write_frame(frame, args.output)
+    return 0
+
+
+def _similar(args) -> int:
+    try:
+        frame = similar_videos(args.video, args.limit)
+    except ValueError as e:
+        raise SystemExit(f"similar: {str(e)}")
+    write_frame(frame, args.output)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='yt-thumbs', description="YouTube thumbnail analysis without the web UI")
+    parser.add_argument('--verbose', action='store_true', help="Log at INFO level")
+    parser.add_argument('--trace', help="Write a JSON trace of the stages run in this process "
+                                        "(chrome://tracing / Perfetto format)")
+    parser.add_argument('--metrics', help="Write stage timings and counters in Prometheus text format")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    analyze = subparsers.add_parser('analyze', help="Analyze the thumbnails of individual videos")
+    analyze.add_argument('videos', nargs='*', help="YouTube URLs or video IDs")
+    analyze.add_argument('--file', help="File with one YouTube URL or video ID per line")
+    analyze.add_argument('--no-details', action='store_true',
+                         help="Skip the video details API call (no YOUTUBE_API_KEY needed)")
+    analyze.add_argument('--quiet', action='store_true', help="Don't print progress to stderr")
+    analyze.set_defaults(handler=_analyze)
+
+    channel = subparsers.add_parser('channel', help="Sync a channel and report its videos")
+    channel.add_argument('channel_id', help="Channel ID (UC...)")
+    channel.add_argument('--start', type=date.fromisoformat, help="Earliest publish date (YYYY-MM-DD)")
+    channel.add_argument('--end', type=date.fromisoformat, help="Latest publish date (YYYY-MM-DD), inclusive")
+    channel.add_argument('--refresh-days', type=int, default=DEFAULT_REFRESH_DAYS,
+                         help="Refresh statistics of stored videos published within this many days")
+    channel.add_argument('--analyze', action='store_true', help="Also analyze every video's thumbnail")
+    channel.add_argument('--no-sync', action='store_true', help="Report stored snapshots without calling the API")
+    channel.set_defaults(handler=_channel)
+
+    similar = subparsers.add_parser('similar', help="List analyzed thumbnails that look like a video's thumbnail")
+    similar.add_argument('video', help="YouTube URL or video ID")
+    similar.add_argument('--limit', '-k', type=int, default=20, help="Number of results")
+    similar.add_argument('--output', '-o', default='-',
+                         help="Output .json, .parquet or .csv file; '-' (default) writes JSON lines to stdout")
+    similar.set_defaults(handler=_similar)
+
+    for subparser in (analyze, channel):
+        subparser.add_argument('--output', '-o', default='-',
+                               help="Output .json, .parquet or .csv file; '-' (default) writes JSON lines to stdout")
+        subparser.add_argument('--workers', type=int, default=None,
+                               help="Worker processes for thumbnail analysis (default: CPU count)")
+        subparser.add_argument('--colors', type=int, default=5, help="Dominant colors per thumbnail")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    # Cron jobs and workers should wait for quota rather than fail fast
+    with background_priority(), collect_trace() as trace:
+        status = args.handler(args)
+    if args.trace:
+        with open(args.trace, 'w') as f:
+            f.write(trace_json(trace.spans))
+    if args.metrics:
+        with open(args.metrics, 'w') as f:
+            f.write(prometheus_text())
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
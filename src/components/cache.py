@@ -0,0 +1,120 @@
+# src/components/cache.py
+import streamlit as st
+from PIL import Image, JpegImagePlugin
+
+from utils.analyzed_image import AnalyzedImage
+from utils.data_storage import get_metrics_store, image_hash
+from utils.env_loader import env_int
+from utils.fetch_pipeline import fetch_video_bundle
+from utils.image_analysis import analyze_colors, analyze_image_composition, detect_faces, detect_text
+from utils.similarity import find_similar, index_thumbnail
+from utils.youtube import get_thumbnail
+
+# Streamlit reruns the whole script on every widget change; these wrappers
+# make a rerun with unchanged inputs cost only the re-render. Fetched data
+# (API results, stored snapshots) expires sooner than analysis results,
+# which only depend on the pixels.
+FETCH_TTL = env_int('UI_CACHE_FETCH_TTL', 900)
+ANALYSIS_TTL = env_int('UI_CACHE_ANALYSIS_TTL', 3600)
+MAX_ENTRIES = env_int('UI_CACHE_MAX_ENTRIES', 256)
+
+# Hash images by decoded pixels (memoized on AnalyzedImage) instead of
+# Streamlit's sampled byte hash. Keys must be exact types.
+IMAGE_HASH_FUNCS = {
+    Image.Image: image_hash,
+    JpegImagePlugin.JpegImageFile: image_hash,
+    AnalyzedImage: image_hash,
+}
+
+
+class _Uncacheable(Exception):
+    """Raised out of a cached function to hand back a result without caching it."""
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+@st.cache_data(ttl=FETCH_TTL, max_entries=MAX_ENTRIES, show_spinner="Fetching video data...")
+def _video_bundle(video_id, _api_key, compare_video_id):
+    bundle = fetch_video_bundle(video_id, _api_key, compare_video_id)
+    if bundle.errors:
+        # Show a partial bundle once, but fetch again on the next rerun
+        raise _Uncacheable(bundle)
+    return bundle
+
+
+def video_bundle(video_id, api_key, compare_video_id=None):
+    """fetch_video_bundle, cached for FETCH_TTL when every request succeeded."""
+    try:
+        return _video_bundle(video_id, api_key, compare_video_id)
+    except _Uncacheable as e:
+        return e.value
+
+
+@st.cache_data(ttl=FETCH_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def stored_channel_data(channel_id, start, end):
+    """(latest snapshots, channel history) for a channel and date range from the metrics store."""
+    store = get_metrics_store()
+    return store.latest_snapshots(channel_id, start, end), store.channel_history(channel_id, start, end)
+
+
+@st.cache_data(ttl=FETCH_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def benchmark(category_id, subscribers):
+    """MetricsStore.get_benchmark for a video."""
+    return get_metrics_store().get_benchmark(category_id, subscribers)
+
+
+@st.cache_resource(ttl=ANALYSIS_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def thumbnail(video_id, size=None):
+    """
+    A video's thumbnail decoded at `size`, shared by every session and rerun.
+
+    Returns the same AnalyzedImage object each time, so array conversions
+    and the content hash are computed once; it must not be modified.
+    Raises like get_thumbnail, and a failed download isn't cached.
+    """
+    return AnalyzedImage(get_thumbnail(video_id, size))
+
+
+@st.cache_data(ttl=ANALYSIS_TTL, max_entries=MAX_ENTRIES, hash_funcs=IMAGE_HASH_FUNCS, show_spinner=False)
+def colors(image, n_colors):
+    return analyze_colors(image, n_colors)
+
+
+@st.cache_data(ttl=ANALYSIS_TTL, max_entries=MAX_ENTRIES, hash_funcs=IMAGE_HASH_FUNCS, show_spinner=False)
+def composition(image):
+    return analyze_image_composition(image)
+
+
+@st.cache_data(ttl=ANALYSIS_TTL, max_entries=MAX_ENTRIES, hash_funcs=IMAGE_HASH_FUNCS, show_spinner=False)
+def faces(image):
+    return detect_faces(image)
+
+
+@st.cache_data(ttl=ANALYSIS_TTL, max_entries=MAX_ENTRIES, hash_funcs=IMAGE_HASH_FUNCS,
+               show_spinner="Reading text...")
+def text(image, min_confidence):
+    return detect_text(image, min_confidence)
+
+
+@st.cache_data(ttl=FETCH_TTL, max_entries=MAX_ENTRIES, show_spinner=False)
+def similar_thumbnails(video_id, _image, limit):
+    """Index the video's thumbnail and return its closest matches; keyed by video ID only."""
+    index_thumbnail(video_id, _image)
+    return find_similar(video_id, limit)
+
+
+CACHED_FUNCTIONS = (_video_bundle, stored_channel_data, benchmark, thumbnail,
+                    colors, composition, faces, text, similar_thumbnails)
+
+
+def clear_caches():
+    """
+    Drop everything cached here, so the next run fetches fresh data.
+
+    Analysis results are still served from the persistent result cache
+    (utils.data_storage) as long as the thumbnail's pixels are unchanged.
+    """
+    for func in CACHED_FUNCTIONS:
+        func.clear()
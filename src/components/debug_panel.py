@@ -0,0 +1,35 @@
+# src/components/debug_panel.py
+import streamlit as st
+import pandas as pd
+from utils.tracing import Trace, prometheus_text, trace_json
+
+def render_debug_panel(trace: Trace):
+    with st.sidebar.expander("Debug: Timings", expanded=True):
+        if not trace.spans:
+            st.write("Nothing was timed on this run")
+            return
+
+        spans = pd.DataFrame([span.as_dict() for span in trace.spans])
+        spans['ms'] = spans['seconds'] * 1000
+        spans['cpu_ms'] = spans['cpu_seconds'] * 1000
+        spans = spans.drop(columns=['seconds', 'cpu_seconds', 'span_id', 'parent_id', 'started_at'])
+        columns = ['name', 'ms', 'cpu_ms', 'thread', 'error']
+        spans = spans[columns + [c for c in spans.columns if c not in columns]]
+
+        st.caption("Stages on this run, slowest first (ms)")
+        st.dataframe(spans.sort_values('ms', ascending=False).round(1), hide_index=True)
+
+        st.caption("Cache hits/misses and bytes on this run")
+        counters = pd.DataFrame([
+            {'counter': name, 'labels': ', '.join(f"{k}={v}" for k, v in labels), 'value': value}
+            for (name, labels), value in sorted(trace.counters.items())
+        ])
+        if counters.empty:
+            st.write("No counters recorded")
+        else:
+            st.dataframe(counters, hide_index=True)
+
+        st.download_button("Download trace (JSON)", trace_json(trace.spans),
+                           file_name="trace.json", mime="application/json")
+        st.download_button("Download metrics (Prometheus)", prometheus_text(),
+                           file_name="metrics.prom", mime="text/plain")
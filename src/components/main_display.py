@@ -1,21 +1,22 @@
 # src/components/main_display.py
+import logging
+import sqlite3
+import requests
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from utils.youtube import (
-    extract_video_id, get_thumbnail, get_video_details, 
-    format_view_counts, calculate_video_metrics,
-    get_video_stats
+    extract_video_id,
+    format_view_counts, calculate_video_metrics
 )
 from utils.image_analysis import (
-    analyze_colors
-    ,detect_faces
-    ,detect_text
-    ,analyze_image_composition
-    ,get_composition_insights
+    get_composition_insights
+    ,analyze_face_placement
+    ,get_face_placement_insight
+    ,ANALYSIS_SIZES
 )
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from utils.analyzed_image import AnalyzedImage
+from utils.metrics import SNAPSHOT_COLUMNS, calculate_metrics_frame
+from components import cache
 
 # 
 def show_main_display(sidebar_state):    
@@ -30,31 +31,48 @@ def show_main_display(sidebar_state):
         st.error("Invalid YouTube URL")
         return
 
-    try:
-        video_details = get_video_details(video_id, api_key=st.secrets["YOUTUBE_API_KEY"])        
-        video_data = calculate_video_metrics(video_details)
-        channel_id = video_data['channel_id']
-        thumbnail = get_thumbnail(video_id)
-    except:
-        st.error('Failed to get video data')
+    compare_video_id = extract_video_id(sidebar_state['compare_url']) if sidebar_state['compare_url'] else None
 
-    try:
-        video_chanel_data = get_video_stats(channel_id ,  api_key=st.secrets["YOUTUBE_API_KEY"])
-    except:
+    # Fetch everything concurrently; the page waits for the slowest request only.
+    # Cached across reruns, so widget changes don't refetch.
+    bundle = cache.video_bundle(video_id, st.secrets["YOUTUBE_API_KEY"], compare_video_id)
+    video_details = bundle.video_details
+    video_data = calculate_video_metrics(video_details) if video_details else None
+    thumbnail = bundle.thumbnail
+    video_chanel_data = bundle.channel_stats
+    compare_video_details = bundle.compare_details
+
+    # Chart the selected date range from locally stored snapshots when we have them
+    channel_history = None
+    date_range = sidebar_state['date_range']
+    if video_details and isinstance(date_range, (tuple, list)) and len(date_range) == 2:
+        stored_videos, channel_history = cache.stored_channel_data(video_details['channel_id'], *date_range)
+        # Without stored snapshots narrow the fetched videos to the range
+        # instead, so the chart never shows videos outside it
+        if not stored_videos.empty:
+            video_chanel_data = stored_videos
+        else:
+            video_chanel_data = filter_published(video_chanel_data, *date_range)
+
+    if video_data is None or thumbnail is None:
+        st.error('Failed to get video data')
+    if video_chanel_data is None:
         st.error('Failed to get channel data')
+    for name, error in bundle.errors.items():
+        st.caption(f"{name.replace('_', ' ')}: {error}")
     try:
         # Create two columns
-        if sidebar_state['compare_url']:
+        if compare_video_id:
             col1, col2, col3 = st.columns([0.45, 0.4,0.15])
         else:
             col1, col2 = st.columns(2)
 
         with col1:
             st.subheader("Channel Information")
-            display_dashboard(video_chanel_data)                  
+            display_dashboard(video_chanel_data, channel_history)                  
         
         with col2:
-            show_video_info (video_details,video_id,caption = "Video Information")  
+            show_video_info (video_details,thumbnail,caption = "Video Information")  
             st.subheader("Details")    
             # Get and display thumbnail
             try:   
@@ -76,9 +94,7 @@ def show_main_display(sidebar_state):
                     # Fill each tab with its analysis
                     current_tab = 0
                     with tabs[0]:
-                        if sidebar_state['compare_url']:
-                            compare_video_id = extract_video_id(sidebar_state['compare_url'])
-                            compare_video_details = get_video_details(compare_video_id, api_key=st.secrets["YOUTUBE_API_KEY"])
+                        if compare_video_details:
                             comparision_video = calculate_video_metrics(compare_video_details)
                             display_metrics_tab(video_data,comparision_video)
                             # Display thumbnail with half width
@@ -88,10 +104,14 @@ def show_main_display(sidebar_state):
                         current_tab += 1
                     if sidebar_state['options']['composition']:
                         with tabs[current_tab]:
-                            show_composition_analysis(thumbnail)
+                            # Shared by the composition metrics and face detection
+                            composition_image = cache.thumbnail(video_id, ANALYSIS_SIZES['composition'])
+                            show_composition_analysis(composition_image)
                             if sidebar_state['options']['color_analysis']:
                                 with tabs[current_tab]:
-                                    show_color_analysis(thumbnail, sidebar_state['settings'])   
+                                    color_image = cache.thumbnail(video_id, ANALYSIS_SIZES['colors'])
+                                    show_color_analysis(color_image, sidebar_state['settings'])
+                                    show_similar_thumbnails(video_id, color_image)
                             current_tab += 1
                         
                     # if sidebar_state['options']['face_detection']:
@@ -101,21 +121,23 @@ def show_main_display(sidebar_state):
                         # 
                     if sidebar_state['options']['text_detection']:
                         with tabs[current_tab]:
-                            show_text_analysis(thumbnail, sidebar_state['settings'])
+                            show_text_analysis(cache.thumbnail(video_id, ANALYSIS_SIZES['text']), sidebar_state['settings'])
                         current_tab += 1                                                      
             except Exception as e:
+                logging.exception(f"Thumbnail analysis failed for {video_id}")
                 st.error(f"Error processing thumbnail: {str(e)}")
 
-        with col3:
-            #
-            show_video_info (compare_video_details,compare_video_id,caption = "Video Information")  
+        if compare_video_id:
+            with col3:
+                show_video_info (compare_video_details,bundle.compare_thumbnail,caption = "Video Information")  
     except Exception as e:
-        st.error("Error")
+        logging.exception(f"Rendering video {video_id} failed")
+        st.error(f"Error displaying video: {str(e)}")
 
 
 def show_color_analysis(image, settings):
     st.subheader("Color Palette")
-    colors = analyze_colors(image, settings['color_count'])
+    colors = cache.colors(image, settings['color_count'])
     # Display each color with its percentage
     for color, percentage in colors:
         # Create columns with specific widths
@@ -158,9 +180,37 @@ def show_color_analysis(image, settings):
         st.write("")
 
 
+def show_similar_thumbnails(video_id, image, limit=8):
+    # Every thumbnail shown here becomes searchable for later ones
+    try:
+        similar = cache.similar_thumbnails(video_id, image, limit)
+    except (sqlite3.Error, ValueError) as e:
+        logging.error(f"Similar thumbnail search failed for {video_id}: {str(e)}")
+        st.warning("Similar thumbnails unavailable")
+        return
+    if not similar:
+        return
+    with st.expander("Similar thumbnails"):
+        columns = st.columns(4)
+        missing = 0
+        for idx, match in enumerate(similar):
+            try:
+                match_image = cache.thumbnail(match['video_id'], ANALYSIS_SIZES['colors'])
+            except (ValueError, requests.RequestException, sqlite3.Error) as e:
+                logging.error(f"Similar thumbnail {match['video_id']} unavailable: {str(e)}")
+                missing += 1
+                continue
+            with columns[idx % 4]:
+                st.image(match_image.image,
+                         caption=f"{match['video_id']} · {100 * (1 - match['score']):.0f}% similar",
+                         use_container_width=True)
+        if missing:
+            st.info(f"{missing} similar thumbnail{'s' if missing > 1 else ''} could not be loaded")
+
+
 def show_face_analysis(image, settings):
     st.subheader("Face Detection")
-    face_locations = detect_faces(image)
+    face_locations = cache.faces(image)
     
     if face_locations:
         st.write(f"Number of faces detected: {len(face_locations)}")
@@ -168,7 +218,7 @@ def show_face_analysis(image, settings):
         # Display image with face boxes
     
         # 
-        np_image = np.array(image)
+        np_image = AnalyzedImage.wrap(image).rgb()
         # for top, right, bottom, left in face_locations:
             # cv2.rectangle(np_image, (left, top), (right, bottom), (0, 255, 0), 2)
         st.image(np_image, caption="Faces Detected", use_column_width=True)
@@ -177,23 +227,26 @@ def show_face_analysis(image, settings):
 
 def show_text_analysis(image, settings):
     st.subheader("Text Detection")
-    text_data = detect_text(image)
+    text_data = cache.text(image, settings['min_text_confidence']/100)
     # st.write(str(text_data))
     if text_data['text']:
         st.write("Detected Text:")
         for text, conf in zip(text_data['text'], text_data['confidences']):
-            if conf >= settings['min_text_confidence']/100:
-                st.write(f"- {text} (Confidence: {conf:.1f}%)")
+            st.write(f"- {text} (Confidence: {conf * 100:.1f}%)")
     else:
         st.write("No text detected/low confidence")
+    if text_data['timings']:
+        st.caption(' · '.join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in text_data['timings'].items()))
 
-def show_video_info (video_details,video_id,caption):
+def show_video_info (video_details,thumbnail,caption):
     col1, col2  = st.columns(2)
-    # Get video thumbnail
+    # Thumbnail already downloaded by the fetch bundle
     with col1:
-        thumbnail = get_thumbnail(video_id)
-        # Display thumbnail with half width
-        st.image(thumbnail, caption= caption, use_container_width=True)
+        if thumbnail is not None:
+            # Display thumbnail with half width
+            st.image(thumbnail, caption= caption, use_container_width=True)
+        else:
+            st.warning("Thumbnail unavailable")
     with col2:
         try:
             st.markdown(f"**Channel:** {video_details['channel_name']}   **Subs:** {format_view_counts(video_details['subscriber_count'])}")
@@ -205,12 +258,12 @@ def show_video_info (video_details,video_id,caption):
                      """
                      )                       
             st.markdown(f"**Published:** {(video_details['published_date'])}")               
-        except:
-            st.error('api fail')
+        except (KeyError, TypeError) as e:
+            st.error(f"Video details unavailable: {str(e)}")
 
 def show_composition_analysis(image):
     st.subheader("Composition Analysis")
-    composition = analyze_image_composition(image)
+    composition = cache.composition(image)
     insights = get_composition_insights(composition)
     
     # Display metrics and insights in columns
@@ -234,14 +287,18 @@ def show_composition_analysis(image):
         st.markdown(f":blue[*{insights['contrast']}*] ")
     
     # Display face detection results if available
-    face_locations = detect_faces(image)
+    face_locations = cache.faces(image)
     if face_locations:
-        st.markdown(f"**Faces Detected:** {len(face_locations)}")
-        if len(face_locations) > 0:
-            st.markdown("*Consider positioning faces along rule-of-thirds points for better engagement*")
+        placement = analyze_face_placement(face_locations, image.size)
+        st.markdown(f"**Faces Detected:** {placement['face_count']}  "
+                    f"**On Thirds Points:** {placement['faces_on_thirds']}")
+        st.markdown(f":blue[*{get_face_placement_insight(placement)}*] ")
     
-def display_metrics_tab(video_data, comparison_metrics = None):
-   metrics = calculate_video_metrics(video_data)
+def display_metrics_tab(metrics, comparison_metrics = None):
+   # Both arguments are already calculate_video_metrics results
+   if metrics is None:
+       st.warning("Metrics unavailable for this video")
+       return
    
    # Default benchmarks
    default_benchmarks = {
@@ -253,7 +310,8 @@ def display_metrics_tab(video_data, comparison_metrics = None):
        'note': '* Using fixed average benchmarks from 2024 : engagement 50, like ratio: 2.5%; comment ratio: 0.3%, conversion: 2%'
    }
    
-   benchmark = comparison_metrics if comparison_metrics else default_benchmarks
+   # Compare against the other video, else stored videos like this one, else the fixed defaults
+   benchmark = comparison_metrics or stored_benchmark(metrics) or default_benchmarks
    
    col1, col2, col3 = st.columns(3)
    
@@ -298,7 +356,34 @@ def display_metrics_tab(video_data, comparison_metrics = None):
             st.write(benchmark['note'])
 
 
+def stored_benchmark(metrics):
+   """Median benchmarks for the video's category and channel size from local snapshots, if there are enough."""
+   try:
+       return cache.benchmark(metrics.get('category_id'), metrics.get('subscriber_count'))
+   except Exception as e:
+       logging.error(f"Benchmark lookup failed: {str(e)}")
+       return None
+
+
+def filter_published(df, start, end):
+   """Rows of df published from the start date through the whole end date."""
+   if df is None or df.empty:
+       return df
+   published = pd.to_datetime(df['published_at'], utc=True, format='ISO8601')
+   lower = pd.Timestamp(start, tz='UTC')
+   upper = pd.Timestamp(end, tz='UTC') + pd.Timedelta(days=1)
+   return df[(published >= lower) & (published < upper)]
+
+CHART_METRICS = ('views', 'likes', 'comments', 'like_ratio', 'comment_ratio', 'view_velocity', 'engagement_score')
+
+
+def chart_metrics(df):
+   """CHART_METRICS that have any values in df; e.g. engagement_score needs subscriber counts."""
+   return [metric for metric in CHART_METRICS if metric in df and df[metric].notna().any()]
+
 def format_date(df):
+   # Work on a copy; df may be shared with other sessions' cached results
+   df = df.copy()
    # Convert to datetime if not already
    df['published_at'] = pd.to_datetime(df['published_at'])
    
@@ -313,7 +398,10 @@ def format_date(df):
    
    return df
 
-def display_dashboard(df):
+def display_dashboard(df, history=None):
+   if df is None or df.empty:
+       st.info("No videos published in this date range")
+       return
    df = format_date(df)
    # Summary metrics
    avg_views = df['views'].sum()
@@ -329,13 +417,12 @@ def display_dashboard(df):
    col1.metric("Likes/View",f"{(df['likes'].sum()/df['views'].sum()*100):.2f}%")
    col2.metric("Comments/View",f"{(df['comments'].sum()/df['views'].sum()*100):.2f}%")
    
-   df['like_ratio'] = (df['likes'] / df['views']) * 100
-   df['comment_ratio'] = (df['comments'] / df['views']) * 100
+   df = calculate_metrics_frame(df, SNAPSHOT_COLUMNS)
    
    col1,col2 = st.columns(2)
 
    with col1:
-       metric = st.selectbox("Select Metric", ['views', 'likes', 'comments','like_ratio','comment_ratio'])
+       metric = st.selectbox("Select Metric", chart_metrics(df))
    with col2:
        chart_type = st.selectbox("Select Chart Type",  ['Line',  'Bar'])
    
@@ -343,8 +430,6 @@ def display_dashboard(df):
     #    metric = st.selectbox("Select Metric", ['views', 'likes', 'comments','like_ratio','comment_ratio'])
 #    with col2:
     #    chart_type = st.selectbox("Select Chart Type",  ['Line',  'Bar'])
-#    Create tooltip data
-   df['tooltip'] = df.apply(lambda x: f"Title: {x['title']}\nViews: {format_view_counts(x['views'])}", axis=1)
    x_col = 'published_at'
 #    Prepare data
    plot_df = df[[x_col, metric]].copy()
@@ -365,6 +450,12 @@ def display_dashboard(df):
    col2.metric("Peaked View",f"{format_view_counts(df['views'].max())}")
    
 
+   # Channel totals over time, from stored snapshots
+   if history is not None and len(history) > 1:
+       st.subheader("Channel History")
+       history_metric = metric if metric in history.columns else 'views'
+       st.line_chart(data=history, x='captured_on', y=history_metric)
+
    # Data table
    st.subheader("Latest Videos Table")
    st.dataframe(df[['display_date','views','likes','comments','title']],
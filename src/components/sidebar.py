@@ -1,6 +1,8 @@
 # src/components/sidebar.py
+import os
 import streamlit as st
 from datetime import datetime, timedelta
+from components.cache import clear_caches
 
 def show_sidebar():
     with st.sidebar:
@@ -32,8 +34,11 @@ def show_sidebar():
             settings = {
                 'color_count': st.slider("Number of colors to analyze", 3, 10, 5),
                 # 'min_face_confidence': st.slider("Face detection confidence", 0.0, 1.0, 0.5),
-                'min_text_confidence': st.slider("Text detection confidence", 0, 100, 50)
+                'min_text_confidence': st.slider("Text detection confidence", 0, 100, 50),
+                'debug': st.checkbox("Show timing debug panel", value=bool(os.getenv('YT_THUMBS_DEBUG')))
             }
+            st.button("Refresh data", on_click=clear_caches,
+                      help="Drop cached API results and analyses and fetch again")
         # URL input
         compare_url = st.text_input("Enter Comparison YouTube URL")
         return {
@@ -0,0 +1,24 @@
+# src/components/startup_report.py
+import streamlit as st
+import pandas as pd
+from utils.backends import backend_report, import_report
+from utils.singleflight import singleflight_stats
+
+def render_startup_report():
+    with st.sidebar.expander("Startup Report"):
+        st.caption("Slowest module imports in this process (ms)")
+        imports = pd.DataFrame(import_report())
+        if imports.empty:
+            st.write("No imports recorded (set YT_THUMBS_DEBUG to time startup imports)")
+        else:
+            st.dataframe(imports.round(1), hide_index=True)
+
+        st.caption("Analysis backends (loaded on first use)")
+        st.dataframe(pd.DataFrame(backend_report()), hide_index=True)
+
+        st.caption("Duplicate calls collapsed into one in-flight call")
+        flights = pd.DataFrame.from_dict(singleflight_stats(), orient='index')
+        if flights.empty:
+            st.write("No calls yet")
+        else:
+            st.dataframe(flights)
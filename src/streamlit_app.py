@@ -1,7 +1,18 @@
 # src/streamlit_app.py
 import streamlit as st
+from utils.backends import start_import_timer, stop_import_timer
+
+# With YT_THUMBS_DEBUG set, time everything the app imports at startup so
+# the startup report can show it
+start_import_timer()
+
 from components.sidebar import show_sidebar
 from components.main_display import show_main_display
+from components.startup_report import render_startup_report
+from components.debug_panel import render_debug_panel
+from utils.tracing import collect_trace
+
+stop_import_timer()
 
 def main():
     # Configure the page
@@ -14,8 +25,13 @@ def main():
     # Get sidebar state
     sidebar_state = show_sidebar()
     
-    # Show main display with sidebar state
-    show_main_display(sidebar_state)
+    # Show main display with sidebar state, timing every stage it runs
+    with collect_trace() as trace:
+        show_main_display(sidebar_state)
+
+    render_startup_report()
+    if sidebar_state['settings']['debug']:
+        render_debug_panel(trace)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,109 @@
+# src/utils/analyzed_image.py
+
+import threading
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from utils.data_storage import pixel_hash
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class AnalyzedImage:
+    """
+    One thumbnail plus the derived forms the analyses work on.
+
+    The RGB and grayscale arrays, the content hash and downscaled variants
+    are computed on first use and kept, so analyses run on the same image
+    share them instead of each converting it again. Arrays are returned
+    read-only (the BGR view and RGB of an RGB image are zero-copy), and the
+    wrapped PIL image must not be modified either.
+
+    Every analysis in utils.image_analysis accepts an AnalyzedImage as well
+    as a plain PIL image.
+    """
+
+    def __init__(self, image: Image.Image):
+        self.image = image
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._variants: Dict[Tuple[int, int], 'AnalyzedImage'] = {}
+        self._hash: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def wrap(cls, image: Union[Image.Image, 'AnalyzedImage']) -> 'AnalyzedImage':
+        """Return `image` itself if it is already an AnalyzedImage, else wrap it."""
+        return image if isinstance(image, cls) else cls(image)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.image.size
+
+    @property
+    def mode(self) -> str:
+        return self.image.mode
+
+    @property
+    def has_alpha(self) -> bool:
+        return 'A' in self.image.getbands() or (self.image.mode == 'P' and 'transparency' in self.image.info)
+
+    def _array(self, mode: str) -> np.ndarray:
+        array = self._arrays.get(mode)
+        if array is None:
+            with self._lock:
+                array = self._arrays.get(mode)
+                if array is None:
+                    source = self.image if self.image.mode == mode else self.image.convert(mode)
+                    array = self._arrays[mode] = _read_only(np.asarray(source))
+        return array
+
+    def pixels(self) -> np.ndarray:
+        """Pixels in the image's own mode."""
+        return self._array(self.image.mode)
+
+    def rgb(self) -> np.ndarray:
+        """H x W x 3 uint8 RGB array."""
+        return self._array('RGB')
+
+    def bgr(self) -> np.ndarray:
+        """H x W x 3 uint8 BGR view of rgb(), for OpenCV."""
+        return self.rgb()[:, :, ::-1]
+
+    def gray(self) -> np.ndarray:
+        """H x W uint8 luma array, as PIL's convert('L')."""
+        return self._array('L')
+
+    @property
+    def content_hash(self) -> str:
+        """Same value as utils.data_storage.image_hash of the wrapped image."""
+        if self._hash is None:
+            self._hash = pixel_hash(self.image.mode, self.image.size, self.pixels())
+        return self._hash
+
+    def fit(self, size: Optional[Tuple[int, int]]) -> 'AnalyzedImage':
+        """
+        Downscaled variant fitting inside `size`, keeping the aspect ratio.
+
+        Args:
+            size: (width, height) box, e.g. an entry of ANALYSIS_SIZES
+
+        Returns:
+            This image if it already fits (or size is None), else a memoized
+            smaller AnalyzedImage
+        """
+        if size is None or (self.image.width <= size[0] and self.image.height <= size[1]):
+            return self
+        variant = self._variants.get(size)
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get(size)
+                if variant is None:
+                    resized = self.image.copy()
+                    resized.thumbnail(size, Image.BILINEAR)
+                    variant = self._variants[size] = AnalyzedImage(resized)
+        return variant
@@ -0,0 +1,159 @@
+# src/utils/api.py
+
+import os
+import sys
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+import requests
+from googleapiclient.errors import HttpError
+
+from utils.youtube import extract_video_id, get_thumbnail, get_videos_details
+from utils.batch import analyze_many, batch_columns
+from utils.channel_sync import DEFAULT_REFRESH_DAYS, sync_channel
+from utils.data_storage import get_metrics_store
+from utils.metrics import SNAPSHOT_COLUMNS, calculate_metrics_frame
+from utils.image_analysis import ANALYSIS_SIZES
+from utils.similarity import find_similar, get_similarity_index, index_thumbnail
+from utils.youtube_client import BatchRequestError
+from utils.quota import QuotaExceededError
+
+# Video detail fields joined onto analysis rows
+DETAIL_COLUMNS = (
+    'title', 'channel_id', 'channel_name', 'published_at', 'duration',
+    'view_count', 'like_count', 'comment_count', 'subscriber_count', 'category_id',
+)
+
+
+def resolve_video_ids(values: Iterable[str]) -> List[str]:
+    """Video IDs for a mix of YouTube URLs and bare IDs, de-duplicated in order."""
+    return list(dict.fromkeys(extract_video_id(value) or value.strip() for value in values if value.strip()))
+
+
+def analyze_videos(videos: Iterable[str], api_key: Optional[str] = None, workers: Optional[int] = None,
+                   n_colors: int = 5, progress: Optional[Callable[[int, Dict], None]] = None) -> pd.DataFrame:
+    """
+    Run the thumbnail analyses on several videos, without Streamlit.
+
+    Args:
+        videos: YouTube URLs or video IDs
+        api_key: YouTube Data API key; when given, DETAIL_COLUMNS from one
+            batched videos.list call and the engagement metrics from
+            utils.metrics are joined onto the rows. If that call fails the
+            error is logged and the rows come back without them
+        workers: Worker processes, at most one per video; 1 (or a single
+            video) analyzes in this process
+        n_colors: Number of dominant colors per thumbnail
+        progress: Called as progress(done, row) after each video
+
+    Returns:
+        One row per video in input order, with the batch_columns layout
+    """
+    video_ids = resolve_video_ids(videos)
+    rows = []
+    for row in analyze_many(video_ids, workers, n_colors):
+        rows.append(row)
+        if progress:
+            progress(len(rows), row)
+
+    frame = pd.DataFrame(rows).reindex(columns=batch_columns(n_colors))
+    frame = frame.set_index('video_id').reindex(video_ids).rename_axis('video_id').reset_index()
+    if api_key and video_ids:
+        try:
+            details = get_videos_details(video_ids, api_key)
+        except (HttpError, BatchRequestError, QuotaExceededError) as e:
+            # The analyses are the expensive part; don't throw them away
+            logging.error(f"Video details unavailable, returning analyses only: {str(e)}")
+            return frame
+        detail_frame = pd.DataFrame(
+            [{'video_id': video_id, **{key: info.get(key) for key in DETAIL_COLUMNS}}
+             for video_id, info in details.items()],
+            columns=['video_id', *DETAIL_COLUMNS]
+        )
+        frame = calculate_metrics_frame(frame.merge(detail_frame, on='video_id', how='left'))
+    return frame
+
+
+def channel_report(channel_id: str, api_key: Optional[str] = None, start=None, end=None,
+                   refresh_days: int = DEFAULT_REFRESH_DAYS, analyze: bool = False,
+                   workers: Optional[int] = None, n_colors: int = 5) -> pd.DataFrame:
+    """
+    A channel's videos with their latest statistics, optionally with thumbnail analyses.
+
+    Args:
+        channel_id: YouTube channel ID
+        api_key: YouTube Data API key; when given the channel is synced
+            incrementally first, otherwise only stored snapshots are used
+        start: Earliest publish date to include
+        end: Latest publish date to include
+        refresh_days: See utils.channel_sync.sync_channel
+        analyze: Also run the thumbnail analyses on every video
+        workers: Worker processes for the analyses
+        n_colors: Number of dominant colors per thumbnail
+
+    Returns:
+        One row per video with its engagement metrics, ordered by publish date
+    """
+    store = get_metrics_store()
+    if api_key:
+        sync_channel(channel_id, api_key, refresh_days, store)
+        store.refresh_benchmarks()
+    frame = calculate_metrics_frame(store.latest_snapshots(channel_id, start, end), SNAPSHOT_COLUMNS)
+    if analyze and not frame.empty:
+        analyses = analyze_videos(frame['video_id'], workers=workers, n_colors=n_colors)
+        frame = frame.merge(analyses, on='video_id', how='left')
+    return frame
+
+
+def similar_videos(video: str, k: int = 20) -> pd.DataFrame:
+    """
+    The indexed thumbnails that look most like a video's thumbnail.
+
+    Thumbnails are indexed whenever they are analyzed (see
+    utils.similarity); the queried video's own thumbnail is downloaded and
+    indexed first if it isn't yet.
+
+    Args:
+        video: YouTube URL or video ID
+        k: Number of results
+
+    Returns:
+        One row per similar video, best first, with the columns of
+        SimilarityIndex.query
+
+    Raises:
+        ValueError: If the video isn't indexed and its thumbnail can't be
+            downloaded or indexed
+    """
+    video_id = resolve_video_ids([video])[0]
+    if get_similarity_index().get(video_id) is None:
+        try:
+            thumbnail = get_thumbnail(video_id, ANALYSIS_SIZES['colors'])
+        except (ValueError, requests.RequestException) as e:
+            raise ValueError(f"Could not download the thumbnail of {video_id}: {str(e)}") from e
+        if not index_thumbnail(video_id, thumbnail):
+            raise ValueError(f"Could not index the thumbnail of {video_id}")
+    return pd.DataFrame(find_similar(video_id, k), columns=['video_id', 'hamming', 'palette_distance', 'score'])
+
+
+def write_frame(frame: pd.DataFrame, path: str) -> None:
+    """
+    Write a result frame as JSON, Parquet or CSV, chosen by extension.
+
+    Args:
+        frame: Rows to write
+        path: '.parquet', '.csv' or '.json' file; '-' writes JSON lines to stdout
+    """
+    if path == '-':
+        frame.to_json(sys.stdout, orient='records', lines=True, date_format='iso')
+        return
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        frame.to_parquet(path, index=False)
+    elif extension == '.csv':
+        frame.to_csv(path, index=False)
+    elif extension == '.json':
+        frame.to_json(path, orient='records', indent=2, date_format='iso')
+    else:
+        raise ValueError(f"Unsupported output format '{extension}', expected .json, .parquet or .csv")
@@ -0,0 +1,144 @@
+# src/utils/backends.py
+
+import os
+import sys
+import time
+import builtins
+import importlib
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, List
+
+from utils.tracing import span
+
+_loaders: Dict[str, Callable[[], Any]] = {}
+_loaded: Dict[str, Any] = {}
+_load_seconds: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def register_backend(name: str, loader: Callable[[], Any]) -> None:
+    """Register how to load a heavy backend; nothing is imported until get_backend."""
+    _loaders[name] = loader
+
+
+def get_backend(name: str) -> Any:
+    """
+    Load a registered backend on first use and return it.
+
+    Args:
+        name: Backend name given to register_backend
+
+    Returns:
+        Whatever the loader returns (usually a module)
+    """
+    backend = _loaded.get(name)
+    if backend is not None:
+        return backend
+    with _lock:
+        if name not in _loaded:
+            if name not in _loaders:
+                raise KeyError(f"Unknown analysis backend '{name}'")
+            start = time.perf_counter()
+            with span('backend.load', backend=name):
+                _loaded[name] = _loaders[name]()
+            _load_seconds[name] = time.perf_counter() - start
+        return _loaded[name]
+
+
+def backend_report() -> List[Dict[str, Any]]:
+    """Registered backends, whether they are loaded and how long loading took."""
+    return [
+        {'backend': name, 'loaded': name in _loaded, 'seconds': _load_seconds.get(name)}
+        for name in _loaders
+    ]
+
+
+register_backend('easyocr', lambda: importlib.import_module('easyocr'))
+register_backend('sklearn.cluster', lambda: importlib.import_module('sklearn.cluster'))
+register_backend('cv2', lambda: importlib.import_module('cv2'))
+register_backend('face_recognition', lambda: importlib.import_module('face_recognition'))
+
+
+# -- import timing ---------------------------------------------------------
+
+_import_times: Dict[str, Dict[str, float]] = {}
+_import_state = threading.local()
+_original_import = builtins.__import__
+_original_import_module = importlib.import_module
+
+
+def _timed(module_name: str, load: Callable[[], Any]) -> Any:
+    """Run one import, charging its time to module_name and to the import that triggered it."""
+    if module_name in sys.modules:
+        return load()
+
+    stack = getattr(_import_state, 'stack', None)
+    if stack is None:
+        stack = _import_state.stack = []
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return load()
+    finally:
+        cumulative = time.perf_counter() - start
+        children = stack.pop()
+        if stack:
+            stack[-1] += cumulative
+        _import_times.setdefault(module_name, {'self': cumulative - children, 'cumulative': cumulative})
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    try:
+        package = (globals or {}).get('__package__') if level else None
+        module_name = importlib.util.resolve_name('.' * level + name, package) if level else name
+    except (ImportError, ValueError):
+        module_name = name
+    return _timed(module_name, lambda: _original_import(name, globals, locals, fromlist, level))
+
+
+def _timed_import_module(name, package=None):
+    try:
+        module_name = importlib.util.resolve_name(name, package) if name.startswith('.') else name
+    except (ImportError, ValueError):
+        module_name = name
+    return _timed(module_name, lambda: _original_import_module(name, package))
+
+
+def start_import_timer() -> None:
+    """
+    Record how long each newly imported module takes, like `python -X importtime`.
+
+    Only runs when YT_THUMBS_DEBUG is set, and only measures modules
+    imported (by import statements or importlib.import_module) until
+    stop_import_timer. Safe to call on every Streamlit rerun.
+    """
+    if not os.getenv('YT_THUMBS_DEBUG'):
+        return
+    if builtins.__import__ is not _timed_import:
+        builtins.__import__ = _timed_import
+    if importlib.import_module is not _timed_import_module:
+        importlib.import_module = _timed_import_module
+
+
+def stop_import_timer() -> None:
+    """Put the original import functions back; what was recorded stays in import_report."""
+    if builtins.__import__ is _timed_import:
+        builtins.__import__ = _original_import
+    if importlib.import_module is _timed_import_module:
+        importlib.import_module = _original_import_module
+
+
+def import_report(limit: int = 25) -> List[Dict[str, Any]]:
+    """
+    Slowest imports recorded so far, by cumulative time.
+
+    Returns:
+        List of {'module', 'self_ms', 'cumulative_ms'} dictionaries
+    """
+    rows = [
+        {'module': module, 'self_ms': t['self'] * 1000, 'cumulative_ms': t['cumulative'] * 1000}
+        for module, t in _import_times.items()
+    ]
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:limit]
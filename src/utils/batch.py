@@ -0,0 +1,300 @@
+# src/utils/batch.py
+
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from collections.abc import Sized
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from utils.youtube import extract_video_id
+from utils.youtube_client import execute, get_youtube_client
+from utils.quota import BACKGROUND
+
+COMPOSITION_METRICS = (
+    'balance_horizontal', 'balance_vertical', 'thirds_intensity',
+    'overall_brightness', 'edge_density', 'contrast',
+)
+CHECKPOINT_SUFFIX = '.checkpoint.csv'
+# Futures kept in flight per worker; enough to hide scheduling gaps while
+# still streaming sources of any size
+IN_FLIGHT_PER_WORKER = 4
+
+
+def iter_playlist_video_ids(playlist_id: str, api_key: str) -> Iterator[str]:
+    """Yield every video ID in a playlist, 50 per playlistItems.list page."""
+    youtube = get_youtube_client(api_key)
+    page_token = None
+    while True:
+        response = execute(youtube.playlistItems().list(
+            part='contentDetails',
+            playlistId=playlist_id,
+            maxResults=50,
+            pageToken=page_token
+        ), priority=BACKGROUND)
+        for item in response.get('items', []):
+            yield item['contentDetails']['videoId']
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+
+def iter_channel_video_ids(channel_id: str, api_key: str) -> Iterator[str]:
+    """Yield a channel's uploads via its uploads playlist (1 quota unit per page, not 100)."""
+    uploads_playlist = 'UU' + channel_id[2:] if channel_id.startswith('UC') else channel_id
+    return iter_playlist_video_ids(uploads_playlist, api_key)
+
+
+def iter_file_video_ids(path: str) -> Iterator[str]:
+    """Yield video IDs from a file with one YouTube URL (or bare ID) per line."""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            video_id = extract_video_id(line) or line
+            yield video_id
+
+
+def analyze_thumbnail(video_id: str, n_colors: int = 5) -> Dict:
+    """
+    Fetch one thumbnail and run the batch analyses on it.
+
+    Runs inside worker processes, so it imports the analysis stack lazily
+    and never raises: failures come back as a row with status 'error'. The
+    analyses run with raise_errors, so a failed analysis (e.g. easyocr not
+    installed) fails the row instead of writing empty results marked 'ok'
+    that a resumed run would never retry.
+
+    Returns:
+        Flat dictionary suitable for one row of the output file
+    """
+    from utils.youtube import get_thumbnail
+    from utils.analyzed_image import AnalyzedImage
+    from utils.image_analysis import ANALYSIS_SIZES, analyze_colors, analyze_image_composition, detect_text
+    from utils.similarity import PALETTE_COLORS, index_thumbnail
+
+    start = time.perf_counter()
+    row = {'video_id': video_id, 'status': 'ok', 'error': ''}
+    try:
+        # Each analysis gets the thumbnail decoded at the size it declares;
+        # the download itself is shared through the thumbnail cache.
+        thumbnail = AnalyzedImage(get_thumbnail(video_id, ANALYSIS_SIZES['text']))
+        row['width'], row['height'] = thumbnail.size
+
+        composition = analyze_image_composition(AnalyzedImage(get_thumbnail(video_id, ANALYSIS_SIZES['composition'])),
+                                                raise_errors=True)
+        row.update({f'composition_{name}': float(value) for name, value in composition.items()})
+
+        color_image = AnalyzedImage(get_thumbnail(video_id, ANALYSIS_SIZES['colors']))
+        colors = analyze_colors(color_image, n_colors, raise_errors=True)
+        for idx, (color, percentage) in enumerate(colors):
+            row[f'color_{idx}'] = '#{:02x}{:02x}{:02x}'.format(*(int(c) for c in color))
+            row[f'color_{idx}_share'] = float(percentage)
+        index_thumbnail(video_id, color_image, colors if n_colors == PALETTE_COLORS else None)
+
+        text = detect_text(thumbnail, raise_errors=True)
+        row['text'] = text['full_text']
+        row['text_regions'] = len(text['text'])
+        row['text_confidence'] = (
+            float(sum(text['confidences']) / len(text['confidences'])) if text['confidences'] else 0.0
+        )
+    except Exception as e:
+        row['status'] = 'error'
+        row['error'] = str(e)
+    row['seconds'] = time.perf_counter() - start
+    return row
+
+
+def _checkpoint_path(output_path: str) -> str:
+    return output_path if output_path.endswith('.csv') else output_path + CHECKPOINT_SUFFIX
+
+
+def _previous_statuses(output_path: str) -> pd.DataFrame:
+    """video_id and status of every row already written for output_path."""
+    frames = []
+    checkpoint = _checkpoint_path(output_path)
+    if os.path.exists(checkpoint):
+        frames.append(pd.read_csv(checkpoint, usecols=['video_id', 'status']))
+    if output_path.endswith('.parquet') and os.path.exists(output_path):
+        frames.append(pd.read_parquet(output_path, columns=['video_id', 'status']))
+    if not frames:
+        return pd.DataFrame(columns=['video_id', 'status'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _latest_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    """One row per video, the most recently written one."""
+    return frame.drop_duplicates('video_id', keep='last')
+
+
+def batch_columns(n_colors: int) -> List[str]:
+    """Column order of the output file, fixed up front so appended chunks line up."""
+    columns = ['video_id', 'status', 'error', 'width', 'height']
+    columns += [f'composition_{name}' for name in COMPOSITION_METRICS]
+    for idx in range(n_colors):
+        columns += [f'color_{idx}', f'color_{idx}_share']
+    columns += ['text', 'text_regions', 'text_confidence', 'seconds']
+    return columns
+
+
+def _append_rows(path: str, rows: List[Dict], columns: List[str]) -> None:
+    frame = pd.DataFrame(rows).reindex(columns=columns)
+    write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+    frame.to_csv(path, mode='a', header=write_header, index=False)
+
+
+def analyze_many(video_ids: Iterable[str], workers: Optional[int] = None, n_colors: int = 5) -> Iterator[Dict]:
+    """
+    Analyze thumbnails in parallel, yielding rows as they complete.
+
+    Only a few futures per worker are kept in flight, so `video_ids` can be
+    a lazy source of any size. When `video_ids` has a length the pool gets
+    no more workers than videos, and with a single worker (or video) the
+    analyses run in this process instead of a pool.
+
+    Args:
+        video_ids: Iterable of video IDs, consumed lazily
+        workers: Worker processes; defaults to the CPU count
+        n_colors: Number of dominant colors per thumbnail
+
+    Yields:
+        analyze_thumbnail rows, in completion order
+    """
+    workers = workers or os.cpu_count() or 1
+    if isinstance(video_ids, Sized):
+        workers = max(1, min(workers, len(video_ids)))
+    if workers == 1:
+        for video_id in video_ids:
+            yield analyze_thumbnail(video_id, n_colors)
+        return
+
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for video_id in video_ids:
+            pending.add(executor.submit(analyze_thumbnail, video_id, n_colors))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+def run_batch(video_ids: Iterable[str], output_path: str, workers: Optional[int] = None,
+              n_colors: int = 5, resume: bool = True, flush_every: int = 50,
+              progress: Optional[Callable[[int, int, Dict], None]] = None) -> Dict[str, int]:
+    """
+    Analyze many thumbnails on a process pool and stream the rows to disk.
+
+    Rows are appended to a CSV checkpoint as they complete, so an
+    interrupted run can be resumed: with `resume`, videos that already have
+    an 'ok' row are skipped and failed ones are analyzed again, replacing
+    their earlier row once the run finishes. For a .parquet output the
+    checkpoint is merged into (or, without `resume`, replaces) the Parquet
+    file at the end.
+
+    Args:
+        video_ids: Iterable of video IDs, consumed lazily
+        output_path: Destination .csv or .parquet file
+        workers: Worker processes; defaults to the CPU count
+        n_colors: Number of dominant colors per thumbnail
+        resume: Skip videos already analyzed successfully in output_path
+        flush_every: Rows buffered before each append to disk
+        progress: Called as progress(done, skipped, row) after each video
+
+    Returns:
+        Counts of 'ok', 'error' and 'skipped' videos
+    """
+    previous = _previous_statuses(output_path) if resume else pd.DataFrame(columns=['video_id', 'status'])
+    completed = set(previous.loc[previous['status'] == 'ok', 'video_id'])
+    # Videos with an earlier (failed) row that this run writes again
+    retried = set(previous['video_id']) - completed
+    rewritten = False
+    checkpoint = _checkpoint_path(output_path)
+    if not resume and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    counts = {'ok': 0, 'error': 0, 'skipped': 0}
+    buffer: List[Dict] = []
+    columns = batch_columns(n_colors)
+
+    def unfinished():
+        nonlocal rewritten
+        for video_id in video_ids:
+            if video_id in completed:
+                counts['skipped'] += 1
+                continue
+            completed.add(video_id)
+            if video_id in retried:
+                rewritten = True
+            yield video_id
+
+    for row in analyze_many(unfinished(), workers, n_colors):
+        counts[row['status']] += 1
+        buffer.append(row)
+        if progress:
+            progress(counts['ok'] + counts['error'], counts['skipped'], row)
+        if len(buffer) >= flush_every:
+            _append_rows(checkpoint, buffer, columns)
+            buffer.clear()
+
+    if buffer:
+        _append_rows(checkpoint, buffer, columns)
+
+    if output_path.endswith('.parquet') and os.path.exists(checkpoint):
+        frames = [pd.read_csv(checkpoint)]
+        if resume and os.path.exists(output_path):
+            frames.insert(0, pd.read_parquet(output_path))
+        _latest_rows(pd.concat(frames, ignore_index=True)).to_parquet(output_path, index=False)
+        os.remove(checkpoint)
+    elif rewritten:
+        # Drop the earlier rows of videos analyzed again
+        tmp_path = f"{checkpoint}.{os.getpid()}.tmp"
+        _latest_rows(pd.read_csv(checkpoint)).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, checkpoint)
+
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk thumbnail analysis")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--channel', help="Channel ID (analyzes its uploads)")
+    source.add_argument('--playlist', help="Playlist ID")
+    source.add_argument('--file', help="File with one YouTube URL or video ID per line")
+    parser.add_argument('--output', required=True, help="Output .csv or .parquet file")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--colors', type=int, default=5, help="Dominant colors per thumbnail")
+    parser.add_argument('--no-resume', action='store_true', help="Start over instead of skipping finished videos")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        video_ids = iter_file_video_ids(args.file)
+    else:
+        api_key = os.getenv('YOUTUBE_API_KEY')
+        if not api_key:
+            parser.error("YOUTUBE_API_KEY must be set to list channel or playlist videos")
+        video_ids = (iter_channel_video_ids(args.channel, api_key) if args.channel
+                     else iter_playlist_video_ids(args.playlist, api_key))
+
+    start = time.perf_counter()
+
+    def report(done, skipped, row):
+        rate = done / (time.perf_counter() - start) * 3600
+        print(f"\r{done} analyzed, {skipped} skipped ({rate:,.0f}/h) {row['video_id']} {row['status']}",
+              end='', file=sys.stderr, flush=True)
+
+    counts = run_batch(video_ids, args.output, workers=args.workers, n_colors=args.colors,
+                       resume=not args.no_resume, progress=report)
+    print(f"\nDone: {counts['ok']} ok, {counts['error']} failed, {counts['skipped']} skipped", file=sys.stderr)
+    return 0 if counts['error'] == 0 else 1
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
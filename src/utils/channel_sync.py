@@ -0,0 +1,145 @@
+# src/utils/channel_sync.py
+
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from utils.env_loader import env_int
+from utils.youtube_client import execute, get_youtube_client, list_channels, list_videos
+from utils.quota import background_priority
+from utils.data_storage import MetricsStore, get_metrics_store
+
+# How far back already-known videos keep getting their statistics refreshed
+DEFAULT_REFRESH_DAYS = env_int('SYNC_REFRESH_DAYS', 30)
+# Uploads fetched for a channel that has never been synced
+INITIAL_RESULTS = 50
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+
+
+def fetch_new_video_ids(youtube, channel_id: str, published_after: Optional[str]) -> List[str]:
+    """
+    IDs of uploads published after the high-water mark, newest first.
+
+    search.list treats publishedAfter as inclusive, so the mark is moved
+    one second forward to avoid re-fetching the last seen video. Without a
+    mark only the latest page of uploads is fetched.
+    """
+    params = {'part': 'id', 'channelId': channel_id, 'order': 'date', 'type': 'video', 'maxResults': 50}
+    if published_after:
+        after = _parse_timestamp(published_after) + timedelta(seconds=1)
+        params['publishedAfter'] = after.strftime('%Y-%m-%dT%H:%M:%SZ')
+    else:
+        params['maxResults'] = INITIAL_RESULTS
+
+    video_ids = []
+    page_token = None
+    while True:
+        response = execute(youtube.search().list(pageToken=page_token, **params))
+        video_ids.extend(item['id']['videoId'] for item in response.get('items', []))
+        page_token = response.get('nextPageToken')
+        # Paging only makes sense when bounded by publishedAfter
+        if not page_token or not published_after:
+            return video_ids
+
+
+def sync_channel(channel_id: str, api_key: str, refresh_days: int = DEFAULT_REFRESH_DAYS,
+                 store: Optional[MetricsStore] = None) -> Dict:
+    """
+    Incrementally sync one channel into the metrics store.
+
+    Only uploads newer than the channel's high-water mark are searched for.
+    Their statistics, and those of every stored video published within the
+    last `refresh_days`, are fetched in one batched videos.list call (per
+    50 videos) and appended as snapshots, then the mark is advanced.
+
+    Returns:
+        Summary with the number of new and refreshed videos and the new mark
+    """
+    store = store or get_metrics_store()
+    youtube = get_youtube_client(api_key)
+
+    high_water_mark = store.get_high_water_mark(channel_id)
+    new_ids = fetch_new_video_ids(youtube, channel_id, high_water_mark)
+    known_ids = store.recent_video_ids(channel_id, datetime.now(timezone.utc) - timedelta(days=refresh_days))
+    video_ids = list(dict.fromkeys(new_ids + known_ids))
+
+    videos = list_videos(youtube, video_ids, part='snippet,statistics')
+    channel = list_channels(youtube, [channel_id], part='statistics').get(channel_id)
+    subscribers = int(channel['statistics'].get('subscriberCount', 0)) if channel else None
+
+    rows = []
+    for video_id, item in videos.items():
+        snippet = item['snippet']
+        stats = item['statistics']
+        rows.append({
+            'video_id': video_id,
+            'title': snippet['title'],
+            'published_at': snippet['publishedAt'],
+            'views': int(stats.get('viewCount', 0)),
+            'likes': int(stats.get('likeCount', 0)),
+            'comments': int(stats.get('commentCount', 0)),
+            'category_id': snippet.get('categoryId'),
+        })
+    store.record_snapshots(channel_id, pd.DataFrame(rows), subscribers)
+
+    newest = max((row['published_at'] for row in rows), default=None)
+    if high_water_mark and (newest is None or newest < high_water_mark):
+        newest = high_water_mark
+    store.set_high_water_mark(channel_id, newest)
+
+    return {
+        'channel_id': channel_id,
+        'new_videos': len(new_ids),
+        'refreshed_videos': len(videos) - len(set(new_ids) & set(videos)),
+        'high_water_mark': newest,
+    }
+
+
+def sync_channels(channel_ids: List[str], api_key: str, refresh_days: int = DEFAULT_REFRESH_DAYS) -> List[Dict]:
+    """
+    Sync several channels, logging (not raising) per-channel failures, then
+    refresh the benchmark buckets the new snapshots touched.
+    """
+    results = []
+    for channel_id in channel_ids:
+        try:
+            results.append(sync_channel(channel_id, api_key, refresh_days))
+        except Exception as e:
+            logging.error(f"Sync failed for channel {channel_id}: {str(e)}")
+            results.append({'channel_id': channel_id, 'error': str(e)})
+    try:
+        get_metrics_store().refresh_benchmarks()
+    except Exception as e:
+        logging.error(f"Benchmark refresh failed: {str(e)}")
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Incrementally sync tracked channels into the metrics store")
+    parser.add_argument('channel_ids', nargs='+', help="Channel IDs to sync")
+    parser.add_argument('--refresh-days', type=int, default=DEFAULT_REFRESH_DAYS,
+                        help="Refresh statistics of stored videos published within this many days")
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv('YOUTUBE_API_KEY')
+    if not api_key:
+        parser.error("YOUTUBE_API_KEY must be set")
+
+    with background_priority():
+        results = sync_channels(args.channel_ids, api_key, args.refresh_days)
+    for result in results:
+        print(result)
+    return 1 if any('error' in result for result in results) else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
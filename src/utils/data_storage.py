@@ -0,0 +1,681 @@
+# src/utils/data_storage.py
+
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import date, datetime, timedelta, timezone
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.env_loader import env_float, env_int, get_cache_dir
+from utils.singleflight import get_group
+from utils.tracing import count, span
+from utils.metrics import SNAPSHOT_COLUMNS, calculate_metrics_frame
+
+# None means data.sqlite3 in the cache directory, resolved (and created) on first connect
+DEFAULT_DB_PATH = os.getenv('YT_THUMBS_DB')
+DEFAULT_RESULT_TTL = env_int('ANALYSIS_CACHE_TTL', 30 * 24 * 3600)
+DEFAULT_RESULT_MAX_BYTES = env_int('ANALYSIS_CACHE_MAX_MB', 256) * 1024 * 1024
+# Puts between full expiry/size passes; in between, eviction only runs once
+# the running size estimate goes past max_bytes
+RESULT_EVICT_INTERVAL = 256
+# Share of max_bytes left after evicting, so a full cache isn't recounted on every put
+RESULT_EVICT_TARGET = 0.9
+
+_MISSING = object()
+
+# Channel size buckets for benchmarks: (upper subscriber bound, label)
+SUBSCRIBER_BUCKETS = (
+    (10_000, '<10K'),
+    (100_000, '10K-100K'),
+    (1_000_000, '100K-1M'),
+    (10_000_000, '1M-10M'),
+    (float('inf'), '10M+'),
+)
+# Wildcard category/bucket under which every video is also summarized
+ANY = '*'
+BENCHMARK_METRICS = ('engagement_score', 'like_ratio', 'comment_ratio', 'sub_conversion', 'view_velocity')
+BENCHMARK_PERCENTILES = (25, 50, 75, 90)
+# Fewer stored videos than this and a bucket falls back to a wider one
+BENCHMARK_MIN_VIDEOS = env_int('BENCHMARK_MIN_VIDEOS', 20)
+# Buckets spanning every category read the whole table (every write marks
+# them dirty), so they are recomputed at most this often (seconds)
+BENCHMARK_GLOBAL_INTERVAL = env_float('BENCHMARK_GLOBAL_INTERVAL', 3600.0)
+
+
+def connect(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Open a connection to the app's SQLite database.
+
+    WAL mode lets Streamlit workers read while another one writes.
+    """
+    db_path = db_path or DEFAULT_DB_PATH or os.path.join(get_cache_dir(), 'data.sqlite3')
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def pixel_hash(mode: str, size: Tuple[int, int], pixels: np.ndarray) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{mode}:{size[0]}x{size[1]}:".encode())
+    digest.update(np.ascontiguousarray(pixels).data)
+    return digest.hexdigest()
+
+
+def image_hash(image) -> str:
+    """
+    Content hash of an image's decoded pixels.
+
+    Hashing pixels rather than file bytes means the same thumbnail hashes
+    the same whether it came from the network, the disk cache or a re-encode
+    that didn't change any pixel. An AnalyzedImage's memoized hash is reused.
+    """
+    content_hash = getattr(image, 'content_hash', None)
+    if content_hash is not None:
+        return content_hash
+    return pixel_hash(image.mode, image.size, np.asarray(image))
+
+
+def _to_json(value: Any) -> Any:
+    """JSON form of the numpy values analyses return."""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class AnalysisResultCache:
+    """
+    Persistent cache of analysis results in SQLite.
+
+    Rows are keyed by the image's content hash plus the analysis name,
+    version and parameters, so bumping an analysis' version invalidates
+    its old results. Entries expire after `ttl` seconds and the least
+    recently used ones are evicted once the table grows past `max_bytes`.
+    The table size is tracked as a running estimate (other processes may
+    write to the same file), recounted whenever eviction runs.
+
+    Results are stored as JSON, so numpy arrays and scalars come back as
+    lists and Python numbers, and tuples as lists.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl: int = DEFAULT_RESULT_TTL,
+                 max_bytes: int = DEFAULT_RESULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._conn = connect(db_path)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_results (
+                    key TEXT PRIMARY KEY,
+                    image_hash TEXT NOT NULL,
+                    analysis TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    result BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_analysis_results_accessed ON analysis_results (accessed_at)'
+            )
+            self._size_estimate = self._total_size()
+        self._puts_since_evict = 0
+
+    @staticmethod
+    def make_key(image_digest: str, analysis: str, version: str, params: Dict[str, Any]) -> str:
+        params_json = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(f"{image_digest}|{analysis}|{version}|{params_json}".encode()).hexdigest()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT result, created_at FROM analysis_results WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return default
+            if now - row[1] > self.ttl:
+                with self._conn:
+                    self._conn.execute('DELETE FROM analysis_results WHERE key = ?', (key,))
+                return default
+            try:
+                result = json.loads(row[0])
+            except ValueError:
+                # Written by an older version in another format
+                with self._conn:
+                    self._conn.execute('DELETE FROM analysis_results WHERE key = ?', (key,))
+                return default
+            with self._conn:
+                self._conn.execute('UPDATE analysis_results SET accessed_at = ? WHERE key = ?', (now, key))
+        return result
+
+    def put(self, key: str, image_digest: str, analysis: str, version: str,
+            params: Dict[str, Any], result: Any) -> None:
+        blob = json.dumps(result, default=_to_json).encode()
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO analysis_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, image_digest, analysis, version, json.dumps(params, sort_keys=True, default=str),
+                 blob, len(blob), now, now)
+            )
+            # Replacing a row over-counts, which only brings the next recount forward
+            self._size_estimate += len(blob)
+            self._puts_since_evict += 1
+            if self._size_estimate > self.max_bytes or self._puts_since_evict >= RESULT_EVICT_INTERVAL:
+                self._evict(now)
+
+    def _total_size(self) -> int:
+        return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM analysis_results').fetchone()[0]
+
+    def _evict(self, now: float) -> None:
+        self._puts_since_evict = 0
+        self._conn.execute('DELETE FROM analysis_results WHERE created_at < ?', (now - self.ttl,))
+        total = self._total_size()
+        if total > self.max_bytes:
+            target = self.max_bytes * RESULT_EVICT_TARGET
+            rows = self._conn.execute('SELECT key, size FROM analysis_results ORDER BY accessed_at').fetchall()
+            stale = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                stale.append((key,))
+                total -= size
+            self._conn.executemany('DELETE FROM analysis_results WHERE key = ?', stale)
+        self._size_estimate = total
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM analysis_results')
+            self._size_estimate = 0
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> AnalysisResultCache:
+    """Return the process-wide analysis result cache, creating it on first use."""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = AnalysisResultCache()
+    return _result_cache
+
+
+def cached_analysis(name: str, version: str = '1') -> Callable:
+    """
+    Decorator that caches an image analysis' result by image content and parameters.
+
+    The wrapped function must take the image as its first argument; every
+    other argument becomes part of the cache key. Concurrent misses for the
+    same key share one computation. Failures to read or write the cache are
+    logged and the analysis simply runs uncached.
+
+    Args:
+        name: Analysis name stored with the result
+        version: Bump this whenever the analysis' output changes
+    """
+    def decorator(func: Callable) -> Callable:
+        flights = get_group(f'analysis.{name}')
+
+        @wraps(func)
+        def wrapper(image, *args, **kwargs):
+            try:
+                cache = get_result_cache()
+                digest = image_hash(image)
+                params = {'args': list(args), 'kwargs': kwargs}
+                key = cache.make_key(digest, name, version, params)
+                result = cache.get(key, _MISSING)
+                if result is not _MISSING:
+                    count('analysis_cache', analysis=name, result='hit')
+                    return result
+            except Exception as e:
+                logging.warning(f"Analysis cache unavailable for {name}: {str(e)}")
+                count('analysis_cache', analysis=name, result='unavailable')
+                with span(f'analysis.{name}'):
+                    return func(image, *args, **kwargs)
+
+            count('analysis_cache', analysis=name, result='miss')
+
+            return flights.do(key, compute_and_store, cache, key, digest, params, image, *args, **kwargs)
+
+        def compute_and_store(cache, key, digest, params, image, *args, **kwargs):
+            with span(f'analysis.{name}'):
+                result = func(image, *args, **kwargs)
+            try:
+                cache.put(key, digest, name, version, params, result)
+            except Exception as e:
+                logging.warning(f"Could not cache {name} result: {str(e)}")
+            return result
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def _iso_utc(value) -> str:
+    """Normalise a datetime/date/ISO string to 'YYYY-MM-DDTHH:MM:SSZ' so strings sort by time."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def subscriber_bucket(subscribers: Optional[float]) -> str:
+    """Size bucket label for a channel's subscriber count ('unknown' if missing)."""
+    if subscribers is None or pd.isna(subscribers):
+        return 'unknown'
+    for upper, label in SUBSCRIBER_BUCKETS:
+        if subscribers < upper:
+            return label
+    return SUBSCRIBER_BUCKETS[-1][1]
+
+
+def _benchmark_keys(category_id: Optional[str], bucket: str) -> List[Tuple[str, str]]:
+    """Summary rows a video contributes to, most specific first."""
+    category = category_id if isinstance(category_id, str) and category_id else 'unknown'
+    return [(category, bucket), (ANY, bucket), (category, ANY), (ANY, ANY)]
+
+
+def _bucket_filter(category: str, size: str) -> Tuple[str, List[Any]]:
+    """SQL condition (and parameters) matching video_snapshots rows in a benchmark bucket."""
+    clauses, params = [], []
+    if category == 'unknown':
+        clauses.append("(category_id IS NULL OR category_id = '')")
+    elif category != ANY:
+        clauses.append('category_id = ?')
+        params.append(category)
+    if size == 'unknown':
+        clauses.append('subscribers IS NULL')
+    elif size != ANY:
+        labels = [label for _, label in SUBSCRIBER_BUCKETS]
+        index = labels.index(size)
+        if index > 0:
+            clauses.append('subscribers >= ?')
+            params.append(SUBSCRIBER_BUCKETS[index - 1][0])
+        if index < len(SUBSCRIBER_BUCKETS) - 1:
+            clauses.append('subscribers < ?')
+            params.append(SUBSCRIBER_BUCKETS[index][0])
+    return ' AND '.join(clauses) or '1', params
+
+
+def _range_bounds(start, end) -> Tuple[str, str]:
+    """Inclusive date range to [start, end) timestamp bounds; plain dates cover the whole end day."""
+    # 'YYYY-MM-DD' strings (e.g. from the CLI) are plain dates too
+    if isinstance(end, str) and len(end) == len('YYYY-MM-DD'):
+        end = date.fromisoformat(end)
+    lower = _iso_utc(start) if start is not None else '0000'
+    if end is None:
+        upper = '9999'
+    elif isinstance(end, date) and not isinstance(end, datetime):
+        upper = _iso_utc(end + timedelta(days=1))
+    else:
+        upper = _iso_utc(end)
+    return lower, upper
+
+
+class MetricsStore:
+    """
+    Append-only store of per-video statistics snapshots.
+
+    Every fetch of a channel's videos appends one row per video with the
+    views, likes, comments and channel subscribers at capture time. Rows are
+    indexed by channel and by publish/capture time, so dashboards can chart
+    a date range from local data instead of calling the API.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._conn = connect(db_path)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS video_snapshots (
+                    channel_id TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    title TEXT,
+                    published_at TEXT NOT NULL,
+                    captured_at TEXT NOT NULL,
+                    views INTEGER NOT NULL,
+                    likes INTEGER NOT NULL,
+                    comments INTEGER NOT NULL,
+                    subscribers INTEGER,
+                    category_id TEXT
+                )
+            ''')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_snapshots_channel_published '
+                'ON video_snapshots (channel_id, published_at)'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_snapshots_channel_captured '
+                'ON video_snapshots (channel_id, captured_at)'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_snapshots_video_captured '
+                'ON video_snapshots (video_id, captured_at)'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_snapshots_category_subscribers '
+                'ON video_snapshots (category_id, subscribers)'
+            )
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS channel_sync_state (
+                    channel_id TEXT PRIMARY KEY,
+                    last_published_at TEXT,
+                    last_synced_at TEXT NOT NULL
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS benchmark_summary (
+                    category_id TEXT NOT NULL,
+                    size_bucket TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    p25 REAL, p50 REAL, p75 REAL, p90 REAL,
+                    videos INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (category_id, size_bucket, metric)
+                ) WITHOUT ROWID
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS benchmark_dirty (
+                    category_id TEXT NOT NULL,
+                    size_bucket TEXT NOT NULL,
+                    marked_at REAL NOT NULL,
+                    PRIMARY KEY (category_id, size_bucket)
+                ) WITHOUT ROWID
+            ''')
+        self._refresh_lock = threading.Lock()
+
+    def record_snapshots(self, channel_id: str, videos: pd.DataFrame, subscribers: Optional[int] = None,
+                         captured_at=None) -> int:
+        """
+        Append one snapshot per video.
+
+        Args:
+            channel_id: Channel the videos belong to
+            videos: Frame with video_id, title, published_at, views, likes,
+                comments and optionally category_id (as from get_video_stats)
+            subscribers: Channel subscriber count at capture time
+            captured_at: Capture timestamp; defaults to now
+
+        Returns:
+            Number of rows written
+        """
+        if videos is None or videos.empty:
+            return 0
+        captured = _iso_utc(captured_at or datetime.now(timezone.utc))
+        categories = videos['category_id'] if 'category_id' in videos else [None] * len(videos)
+        rows = [
+            (channel_id, video_id, title, _iso_utc(published_at), captured,
+             int(views), int(likes), int(comments), subscribers, category_id)
+            for video_id, title, published_at, views, likes, comments, category_id in zip(
+                videos['video_id'], videos['title'], videos['published_at'],
+                videos['views'], videos['likes'], videos['comments'], categories
+            )
+        ]
+        bucket = subscriber_bucket(subscribers)
+        dirty = {key for category_id in set(categories) for key in _benchmark_keys(category_id, bucket)}
+        marked_at = time.time()
+        with self._lock, self._conn:
+            # The buckets of the channel's previous capture lose these videos
+            # if its size bucket changed
+            previous = self._conn.execute('''
+                SELECT DISTINCT category_id, subscribers FROM video_snapshots
+                WHERE channel_id = ? AND captured_at = (
+                    SELECT MAX(captured_at) FROM video_snapshots WHERE channel_id = ?
+                )
+            ''', (channel_id, channel_id)).fetchall()
+            dirty.update(key for category_id, old_subscribers in previous
+                         if subscriber_bucket(old_subscribers) != bucket
+                         for key in _benchmark_keys(category_id, subscriber_bucket(old_subscribers)))
+            self._conn.executemany('INSERT INTO video_snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self._conn.executemany('''
+                INSERT INTO benchmark_dirty (category_id, size_bucket, marked_at) VALUES (?, ?, ?)
+                ON CONFLICT (category_id, size_bucket) DO UPDATE SET marked_at = excluded.marked_at
+            ''', [(category, size, marked_at) for category, size in dirty])
+        return len(rows)
+
+    def last_captured_at(self, channel_id: str) -> Optional[datetime]:
+        """When the channel was last snapshotted, or None if never."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MAX(captured_at) FROM video_snapshots WHERE channel_id = ?', (channel_id,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return datetime.strptime(row[0], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+
+    def latest_snapshots(self, channel_id: str, start=None, end=None) -> pd.DataFrame:
+        """
+        Latest snapshot of each video published in [start, end].
+
+        Returns:
+            Frame with the same columns as get_video_stats, plus
+            subscribers and captured_at, ordered by publish date
+        """
+        lower, upper = _range_bounds(start, end)
+        with self._lock:
+            return pd.read_sql_query('''
+                SELECT video_id, title, published_at, views, likes, comments, subscribers, captured_at
+                FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY video_id ORDER BY captured_at DESC) AS rn
+                    FROM video_snapshots
+                    WHERE channel_id = ? AND published_at >= ? AND published_at < ?
+                )
+                WHERE rn = 1
+                ORDER BY published_at
+            ''', self._conn, params=(channel_id, lower, upper))
+
+    def channel_history(self, channel_id: str, start=None, end=None) -> pd.DataFrame:
+        """
+        Channel totals per capture day within [start, end].
+
+        Views, likes and comments are summed over each video's last snapshot
+        of the day; subscribers is the day's last known count.
+        """
+        lower, upper = _range_bounds(start, end)
+        with self._lock:
+            return pd.read_sql_query('''
+                SELECT day AS captured_on,
+                       SUM(views) AS views, SUM(likes) AS likes, SUM(comments) AS comments,
+                       MAX(subscribers) AS subscribers, COUNT(*) AS videos
+                FROM (
+                    SELECT substr(captured_at, 1, 10) AS day, video_id, views, likes, comments, subscribers,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY substr(captured_at, 1, 10), video_id ORDER BY captured_at DESC
+                           ) AS rn
+                    FROM video_snapshots
+                    WHERE channel_id = ? AND captured_at >= ? AND captured_at < ?
+                )
+                WHERE rn = 1
+                GROUP BY day
+                ORDER BY day
+            ''', self._conn, params=(channel_id, lower, upper))
+
+    def video_history(self, video_id: str, start=None, end=None) -> pd.DataFrame:
+        """Every snapshot of one video captured within [start, end], oldest first."""
+        lower, upper = _range_bounds(start, end)
+        with self._lock:
+            return pd.read_sql_query('''
+                SELECT captured_at, views, likes, comments, subscribers
+                FROM video_snapshots
+                WHERE video_id = ? AND captured_at >= ? AND captured_at < ?
+                ORDER BY captured_at
+            ''', self._conn, params=(video_id, lower, upper))
+
+    def recent_video_ids(self, channel_id: str, published_since) -> List[str]:
+        """IDs of the channel's stored videos published on or after `published_since`."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT DISTINCT video_id FROM video_snapshots WHERE channel_id = ? AND published_at >= ?',
+                (channel_id, _iso_utc(published_since))
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_high_water_mark(self, channel_id: str) -> Optional[str]:
+        """publishedAt of the newest video seen by the last sync, or None if never synced."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT last_published_at FROM channel_sync_state WHERE channel_id = ?', (channel_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_high_water_mark(self, channel_id: str, last_published_at: Optional[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute('''
+                INSERT INTO channel_sync_state (channel_id, last_published_at, last_synced_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT (channel_id) DO UPDATE SET
+                    last_published_at = COALESCE(excluded.last_published_at, last_published_at),
+                    last_synced_at = excluded.last_synced_at
+            ''', (channel_id, last_published_at and _iso_utc(last_published_at),
+                  _iso_utc(datetime.now(timezone.utc))))
+
+    # -- benchmarks --------------------------------------------------------
+
+    def refresh_benchmarks(self, global_interval: float = BENCHMARK_GLOBAL_INTERVAL) -> int:
+        """
+        Recompute the benchmark summary rows of buckets that got new snapshots.
+
+        Each video counts once, with its latest snapshot, in its category and
+        channel size bucket (plus the wildcard rows). Only buckets marked
+        dirty by record_snapshots are recomputed, each from just its own
+        rows; buckets spanning every category are recomputed at most every
+        `global_interval` seconds and otherwise stay dirty. Marks added
+        while this runs are kept for the next refresh. A refresh already
+        running in another thread makes this a no-op.
+
+        Returns:
+            Number of buckets recomputed
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                dirty = self._conn.execute('SELECT category_id, size_bucket, marked_at FROM benchmark_dirty').fetchall()
+                due_before = _iso_utc(datetime.now(timezone.utc) - timedelta(seconds=global_interval))
+                refreshed = [
+                    (category, size, marked_at) for category, size, marked_at in dirty
+                    if category != ANY or (self._summary_updated_at(category, size) or '') <= due_before
+                ]
+            if not refreshed:
+                return 0
+
+            updated_at = _iso_utc(datetime.now(timezone.utc))
+            rows = []
+            for category, size, _ in refreshed:
+                condition, params = _bucket_filter(category, size)
+                with self._lock:
+                    # Latest snapshot of every video that has ever been in the
+                    # bucket, kept if it still is
+                    bucket = pd.read_sql_query(f'''
+                        SELECT views, likes, comments, subscribers, published_at
+                        FROM (
+                            SELECT *, ROW_NUMBER() OVER (PARTITION BY video_id ORDER BY captured_at DESC) AS rn
+                            FROM video_snapshots
+                            WHERE video_id IN (SELECT video_id FROM video_snapshots WHERE {condition})
+                        )
+                        WHERE rn = 1 AND {condition}
+                    ''', self._conn, params=params * 2)
+                bucket = calculate_metrics_frame(bucket, SNAPSHOT_COLUMNS)
+                for metric in BENCHMARK_METRICS:
+                    values = bucket[metric].dropna().to_numpy()
+                    percentiles = np.percentile(values, BENCHMARK_PERCENTILES) if len(values) else [None] * 4
+                    rows.append((category, size, metric,
+                                 *(None if p is None else float(p) for p in percentiles),
+                                 len(values), updated_at))
+
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO benchmark_summary VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+                )
+                self._conn.executemany(
+                    'DELETE FROM benchmark_dirty WHERE category_id = ? AND size_bucket = ? AND marked_at <= ?',
+                    refreshed
+                )
+            return len(refreshed)
+        finally:
+            self._refresh_lock.release()
+
+    def _summary_updated_at(self, category: str, size: str) -> Optional[str]:
+        """When a bucket's summary rows were last computed; call with the lock held."""
+        return self._conn.execute(
+            'SELECT MIN(updated_at) FROM benchmark_summary WHERE category_id = ? AND size_bucket = ?', (category, size)
+        ).fetchone()[0]
+
+    def get_benchmark(self, category_id: Optional[str], subscribers: Optional[float],
+                      percentile: int = 50, min_videos: int = BENCHMARK_MIN_VIDEOS) -> Optional[Dict[str, Any]]:
+        """
+        Benchmark values for a video's category and channel size, from the summary table.
+
+        Tries the exact (category, size bucket) row first, then the same size
+        in any category, the category at any size, and finally everything,
+        taking the first with at least `min_videos` videos. Each try is a
+        primary-key lookup; nothing is recomputed.
+
+        Args:
+            category_id: Video category ID
+            subscribers: Channel subscriber count
+            percentile: One of BENCHMARK_PERCENTILES
+            min_videos: Smallest sample a bucket needs to be used
+
+        Returns:
+            {metric: value} for BENCHMARK_METRICS plus 'videos', 'category_id',
+            'size_bucket' and a human-readable 'note', or None without enough data
+        """
+        if percentile not in BENCHMARK_PERCENTILES:
+            raise ValueError(f"percentile must be one of {BENCHMARK_PERCENTILES}")
+        column = f'p{percentile}'
+        with self._lock:
+            for category, size in _benchmark_keys(category_id, subscriber_bucket(subscribers)):
+                rows = self._conn.execute(
+                    f'SELECT metric, {column}, videos FROM benchmark_summary WHERE category_id = ? AND size_bucket = ?',
+                    (category, size)
+                ).fetchall()
+                if rows and min(videos for _, _, videos in rows) >= min_videos:
+                    break
+            else:
+                return None
+
+        benchmark = {metric: value for metric, value, _ in rows}
+        sample = max(videos for _, _, videos in rows)
+        scope = ', '.join(filter(None, [
+            f"category {category}" if category != ANY else None,
+            f"{size} subscriber channels" if size != ANY else None,
+        ])) or "all categories and channel sizes"
+        benchmark.update({
+            'videos': sample,
+            'category_id': category,
+            'size_bucket': size,
+            'note': f"* {percentile}th percentile of {sample} stored videos ({scope})",
+        })
+        return benchmark
+
+
+_metrics_store = None
+_metrics_store_lock = threading.Lock()
+
+
+def get_metrics_store() -> MetricsStore:
+    """Return the process-wide metrics store, creating it on first use."""
+    global _metrics_store
+    if _metrics_store is None:
+        with _metrics_store_lock:
+            if _metrics_store is None:
+                _metrics_store = MetricsStore()
+    return _metrics_store
@@ -1,6 +1,6 @@
 import os
+import logging
 from dotenv import load_dotenv
-import streamlit as st
 
 def load_environment():
     """Load environment variables from .env file or streamlit secrets"""
@@ -26,4 +26,39 @@ def load_environment():
     return {
         'YOUTUBE_API_KEY': youtube_key,
         'GEMINI_API_KEY': gemini_key
-    }
\ No newline at end of file
+    }
+
+
+def get_cache_dir(*parts):
+    """
+    Return (and create) a directory under the app's local cache root.
+
+    The root defaults to ~/.cache/youtube-thumbnails and can be moved with
+    the YT_THUMBS_CACHE_DIR environment variable.
+    """
+    root = os.getenv('YT_THUMBS_CACHE_DIR',
+                     os.path.join(os.path.expanduser('~'), '.cache', 'youtube-thumbnails'))
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _env_number(name, default, parse):
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return parse(value)
+    except ValueError:
+        logging.warning(f"Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+
+def env_int(name, default):
+    """Integer environment setting; a missing or malformed value gives `default` (with a warning if malformed)."""
+    return _env_number(name, default, int)
+
+
+def env_float(name, default):
+    """Float environment setting; a missing or malformed value gives `default` (with a warning if malformed)."""
+    return _env_number(name, default, float)
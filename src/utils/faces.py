@@ -0,0 +1,92 @@
+# src/utils/faces.py
+
+import os
+import threading
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.backends import get_backend
+from utils.analyzed_image import AnalyzedImage
+
+# (top, right, bottom, left), the order face_recognition uses
+FaceBox = Tuple[int, int, int, int]
+
+DEFAULT_FACE_DETECTOR = os.getenv('FACE_DETECTOR', 'haar')
+HAAR_CASCADE = os.getenv('FACE_HAAR_CASCADE', 'haarcascade_frontalface_default.xml')
+HAAR_SCALE_FACTOR = 1.1
+HAAR_MIN_NEIGHBORS = 5
+HAAR_MIN_SIZE = (24, 24)
+
+# CascadeClassifier isn't safe to share between threads, so each thread
+# loads its own (a few milliseconds, once)
+_local = threading.local()
+
+
+def _haar_classifier():
+    classifier = getattr(_local, 'haar', None)
+    if classifier is None:
+        cv2 = get_backend('cv2')
+        path = HAAR_CASCADE if os.path.isabs(HAAR_CASCADE) else os.path.join(cv2.data.haarcascades, HAAR_CASCADE)
+        classifier = cv2.CascadeClassifier(path)
+        if classifier.empty():
+            raise RuntimeError(f"Could not load Haar cascade from {path}")
+        _local.haar = classifier
+    return classifier
+
+
+def haar_faces(image: AnalyzedImage) -> List[FaceBox]:
+    """Frontal faces from OpenCV's bundled Haar cascade; CPU-only and fast."""
+    cv2 = get_backend('cv2')
+    gray = cv2.equalizeHist(np.ascontiguousarray(image.gray()))
+    boxes = _haar_classifier().detectMultiScale(
+        gray, scaleFactor=HAAR_SCALE_FACTOR, minNeighbors=HAAR_MIN_NEIGHBORS, minSize=HAAR_MIN_SIZE
+    )
+    return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in boxes]
+
+
+def hog_faces(image: AnalyzedImage) -> List[FaceBox]:
+    """face_recognition's HOG detector; slower, needs dlib installed."""
+    face_recognition = get_backend('face_recognition')
+    return [tuple(int(v) for v in box) for box in face_recognition.face_locations(np.ascontiguousarray(image.rgb()))]
+
+
+FACE_DETECTORS: Dict[str, Callable[[AnalyzedImage], List[FaceBox]]] = {
+    'haar': haar_faces,
+    'hog': hog_faces,
+}
+
+
+def find_faces(image: AnalyzedImage, detection_size: Optional[Tuple[int, int]] = None,
+               detector: Optional[str] = None) -> List[FaceBox]:
+    """
+    Detect faces on a downscaled copy and map the boxes back to `image`.
+
+    Args:
+        image: Image to search
+        detection_size: (width, height) box the image is shrunk into before
+            detection; None runs at full resolution
+        detector: One of FACE_DETECTORS; defaults to DEFAULT_FACE_DETECTOR
+
+    Returns:
+        Face boxes as (top, right, bottom, left) in `image` coordinates,
+        largest first
+    """
+    detector = detector or DEFAULT_FACE_DETECTOR
+    if detector not in FACE_DETECTORS:
+        raise ValueError(f"Unknown face detector '{detector}', expected one of {sorted(FACE_DETECTORS)}")
+
+    small = image.fit(detection_size)
+    scale_x = image.size[0] / small.size[0]
+    scale_y = image.size[1] / small.size[1]
+    width, height = image.size
+
+    faces = []
+    for top, right, bottom, left in FACE_DETECTORS[detector](small):
+        faces.append((
+            max(0, round(top * scale_y)),
+            min(width, round(right * scale_x)),
+            min(height, round(bottom * scale_y)),
+            max(0, round(left * scale_x)),
+        ))
+    faces.sort(key=lambda box: (box[2] - box[0]) * (box[1] - box[3]), reverse=True)
+    return faces
@@ -0,0 +1,162 @@
+# src/utils/fetch_pipeline.py
+
+import time
+import logging
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+from PIL import Image
+
+from utils.env_loader import env_float, env_int
+from utils.youtube import get_thumbnail, get_videos_details, get_video_stats
+from utils.data_storage import get_metrics_store
+from utils.channel_sync import sync_channel
+from utils.tracing import count, run_in_context, span
+
+FETCH_WORKERS = env_int('FETCH_WORKERS', 8)
+DEFAULT_TIMEOUTS = {
+    'details': 10.0,
+    'thumbnail': 10.0,
+    'compare_thumbnail': 10.0,
+    'channel_stats': 15.0,
+}
+# Channel stats snapshotted more recently than this are served from the local store
+CHANNEL_STATS_MAX_AGE = env_float('CHANNEL_STATS_MAX_AGE', 900.0)
+
+# Shared across sessions; a request that times out keeps its worker until it
+# finishes, so the pool is sized for a few stragglers on top of live pages.
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='fetch')
+# Benchmark refreshes run one at a time on their own thread, never on a fetch worker
+_benchmark_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='benchmarks')
+
+
+@dataclass
+class FetchBundle:
+    """Everything the main display needs for one video (and its comparison)."""
+    video_details: Optional[Dict] = None
+    thumbnail: Optional[Image.Image] = None
+    channel_stats: Optional[pd.DataFrame] = None
+    channel_stats_from_store: bool = False
+    compare_details: Optional[Dict] = None
+    compare_thumbnail: Optional[Image.Image] = None
+    errors: Dict[str, str] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def _submit(name: str, func: Callable, *args) -> Future:
+    # The worker never touches the bundle: a request that times out keeps
+    # running after fetch_video_bundle has returned it. Its result, error
+    # and duration come back through the future instead.
+    def run():
+        start = time.perf_counter()
+        try:
+            with span(f'fetch.{name}'):
+                result = func(*args)
+        except Exception as e:
+            return None, e, time.perf_counter() - start
+        return result, None, time.perf_counter() - start
+    # Run in a copy of this context so the stage's spans join the caller's trace
+    return _executor.submit(run_in_context(run))
+
+
+def _wait(bundle: FetchBundle, name: str, future: Future, deadline: float):
+    try:
+        result, error, seconds = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+    except FutureTimeoutError:
+        bundle.errors[name] = "timed out"
+        return None
+    bundle.timings[name] = seconds
+    if error is not None:
+        logging.error(f"Fetching {name} failed: {str(error)}")
+        bundle.errors[name] = str(error)
+        return None
+    return result
+
+
+def _fetch_channel_stats(channel_id: str, api_key: str, max_age: float) -> Tuple[pd.DataFrame, bool]:
+    """The channel's latest video stats, and whether they came from the store without an API call."""
+    store = get_metrics_store()
+    last_captured = store.last_captured_at(channel_id)
+    if last_captured is not None and (datetime.now(timezone.utc) - last_captured).total_seconds() < max_age:
+        count('channel_stats', source='store')
+        return store.latest_snapshots(channel_id), True
+
+    try:
+        sync_channel(channel_id, api_key, store=store)
+    except Exception as e:
+        # Fall back to a plain fetch so the page still has something to show
+        logging.error(f"Incremental sync failed for {channel_id}: {str(e)}")
+        count('channel_stats', source='search_fallback')
+        return get_video_stats(channel_id, api_key), False
+    count('channel_stats', source='sync')
+    # Fold the new snapshots into the benchmarks off the page's critical path
+    _benchmark_executor.submit(store.refresh_benchmarks)
+    return store.latest_snapshots(channel_id), False
+
+
+def fetch_video_bundle(video_id: str, api_key: str, compare_video_id: Optional[str] = None,
+                       timeouts: Optional[Dict[str, float]] = None,
+                       channel_stats_max_age: float = CHANNEL_STATS_MAX_AGE) -> FetchBundle:
+    """
+    Fetch a video's details, thumbnail and channel stats (plus an optional
+    comparison video) concurrently.
+
+    Both videos' details come from one batched API call. The thumbnails are
+    downloaded alongside it, and the channel stats request starts as soon
+    as the channel ID is known, so the total latency is roughly the slowest
+    chain rather than the sum of every request.
+
+    Args:
+        video_id: Main video ID
+        api_key: YouTube Data API key
+        compare_video_id: Optional second video to fetch alongside
+        timeouts: Per-request timeouts in seconds, overriding DEFAULT_TIMEOUTS
+        channel_stats_max_age: Seconds for which the channel's stored snapshots
+            are fresh enough to skip the API; otherwise the channel is
+            synced incrementally into the store
+
+    Returns:
+        FetchBundle with whatever succeeded; failures and timeouts are listed
+        in `errors` by request name, and `timings` holds the duration of
+        every request that finished in time
+    """
+    timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+    bundle = FetchBundle()
+    started = time.perf_counter()
+
+    video_ids = [video_id] + ([compare_video_id] if compare_video_id else [])
+    details_future = _submit('details', get_videos_details, video_ids, api_key)
+    thumbnail_future = _submit('thumbnail', get_thumbnail, video_id)
+    compare_thumbnail_future = None
+    if compare_video_id:
+        compare_thumbnail_future = _submit('compare_thumbnail', get_thumbnail, compare_video_id)
+
+    details = _wait(bundle, 'details', details_future, started + timeouts['details'])
+    channel_future = None
+    if details is not None:
+        bundle.video_details = details.get(video_id)
+        if bundle.video_details is None:
+            bundle.errors['video_details'] = "video not found"
+        else:
+            channel_started = time.perf_counter()
+            channel_future = _submit('channel_stats', _fetch_channel_stats,
+                                     bundle.video_details['channel_id'], api_key, channel_stats_max_age)
+        if compare_video_id:
+            bundle.compare_details = details.get(compare_video_id)
+            if bundle.compare_details is None:
+                bundle.errors['compare_details'] = "video not found"
+
+    bundle.thumbnail = _wait(bundle, 'thumbnail', thumbnail_future, started + timeouts['thumbnail'])
+    if compare_thumbnail_future is not None:
+        bundle.compare_thumbnail = _wait(bundle, 'compare_thumbnail', compare_thumbnail_future,
+                                         started + timeouts['compare_thumbnail'])
+    if channel_future is not None:
+        channel_stats = _wait(bundle, 'channel_stats', channel_future, channel_started + timeouts['channel_stats'])
+        if channel_stats is not None:
+            bundle.channel_stats, bundle.channel_stats_from_store = channel_stats
+
+    bundle.timings['total'] = time.perf_counter() - started
+    return bundle
@@ -1,140 +1,250 @@
 # src/utils/image_analysis.py
 
+import os
+import time
 import numpy as np
 from PIL import Image
-# import face_recognition
-import easyocr
-from sklearn.cluster import KMeans
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional, Union
 import logging
+from utils.analyzed_image import AnalyzedImage
+from utils.ocr_pool import get_ocr_pool
+from utils.palette import extract_palette, DEFAULT_PALETTE_STRATEGY
+from utils.faces import find_faces
+from utils.data_storage import cached_analysis
+from utils.env_loader import env_float, env_int
+from utils.tracing import span
 
-def analyze_colors(image: Image.Image, n_colors: int = 5) -> List[Tuple[np.ndarray, float]]:
+# Resolution each analysis needs, as the (width, height) box thumbnails are
+# decoded into before it runs (see utils.youtube.get_thumbnail). None means
+# full resolution: small text is lost quickly when downscaled.
+ANALYSIS_SIZES: Dict[str, Optional[Tuple[int, int]]] = {
+    'colors': (320, 180),
+    'composition': (640, 360),
+    'faces': (480, 270),
+    'text': None,
+}
+
+# Anything the analyses accept: a PIL image, or an AnalyzedImage to share
+# array conversions and the content hash between them
+ImageInput = Union[Image.Image, AnalyzedImage]
+
+_cached_palette = cached_analysis('colors', version='1')(extract_palette)
+
+def analyze_colors(image: ImageInput, n_colors: int = 5, strategy: Optional[str] = None,
+                   raise_errors: bool = False) -> List[Tuple[np.ndarray, float]]:
     """
-    Analyze dominant colors in the image using K-means clustering.
+    Analyze dominant colors in the image.
     
     Args:
-        image: PIL Image object
+        image: PIL Image object (RGB, RGBA, grayscale or palette) or AnalyzedImage
         n_colors: Number of dominant colors to extract
+        strategy: Palette strategy from utils.palette.PALETTE_STRATEGIES;
+            defaults to the PALETTE_STRATEGY environment setting
+        raise_errors: Raise failures instead of logging them and returning
+            an empty palette
         
     Returns:
         List of tuples containing (RGB color array, percentage)
     """
     try:
-        # Convert image to numpy array
-        np_image = np.array(image)
-        
-        # Reshape the image to be a list of pixels
-        pixels = np_image.reshape(-1, 3)
-        
-        # Use KMeans to find dominant colors
-        kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-        kmeans.fit(pixels)
-        
-        # Get the colors and their percentages
-        colors = kmeans.cluster_centers_.astype(int)
-        labels = kmeans.labels_
-        percentages = np.bincount(labels) / len(labels)
-        
-        # Sort colors by percentage
-        color_percentages = list(zip(colors, percentages))
-        color_percentages.sort(key=lambda x: x[1], reverse=True)
-        
-        return color_percentages
+        palette = _cached_palette(AnalyzedImage.wrap(image), n_colors, strategy or DEFAULT_PALETTE_STRATEGY)
+        # Cached results come back from JSON as lists
+        return [(np.asarray(color), float(share)) for color, share in palette]
     except Exception as e:
+        if raise_errors:
+            raise
         logging.error(f"Error in color analysis: {str(e)}")
         return []
     
-def detect_text(image: Image.Image) -> Dict[str, any]:
-    try:
-        img_array = np.array(image)
-        reader = easyocr.Reader(['en'], gpu= False )
-        results = reader.readtext(image)
+# 'fast' runs easyocr's text detector on a reduced canvas and only
+# recognizes regions that pass the size and score thresholds below; 'full'
+# is plain readtext at full resolution.
+OCR_MODES = ('fast', 'full')
+DEFAULT_OCR_MODE = os.getenv('OCR_MODE', 'fast')
+# Longest side the detector sees in fast mode; thumbnail text is large by design
+OCR_CANVAS_SIZE = env_int('OCR_CANVAS_SIZE', 640)
+# Regions shorter than this (in input pixels) are never recognized; easyocr
+# itself only drops regions under 20 pixels in both directions
+OCR_MIN_TEXT_SIZE = env_int('OCR_MIN_TEXT_SIZE', 24)
+# Detector text score a region needs to be recognized at all, also used as
+# the score that bounds a region; easyocr's defaults are 0.7 and 0.4
+OCR_TEXT_THRESHOLD = env_float('OCR_TEXT_THRESHOLD', 0.8)
+
+
+def _tall_enough(horizontal_list: List, free_list: List, min_text_size: int) -> Tuple[List, List]:
+    """Detector boxes at least min_text_size pixels tall."""
+    horizontal_list = [box for box in horizontal_list if box[3] - box[2] >= min_text_size]
+    free_list = [box for box in free_list
+                 if max(point[1] for point in box) - min(point[1] for point in box) >= min_text_size]
+    return horizontal_list, free_list
+
+# The fast-mode settings are arguments so they are part of the cache key
+@cached_analysis('text', version='3')
+def _read_text(image: ImageInput, mode: str = DEFAULT_OCR_MODE, canvas_size: int = OCR_CANVAS_SIZE,
+               min_text_size: int = OCR_MIN_TEXT_SIZE, text_threshold: float = OCR_TEXT_THRESHOLD) -> Dict[str, any]:
+    if mode not in OCR_MODES:
+        raise ValueError(f"Unknown OCR mode '{mode}', expected one of {list(OCR_MODES)}")
+    img_array = AnalyzedImage.wrap(image).rgb()
+    timings = {}
+    with get_ocr_pool().engine() as reader:
+        start = time.perf_counter()
+        if mode == 'full':
+            with span('ocr.readtext'):
+                results = reader.readtext(img_array)
+            timings['readtext'] = time.perf_counter() - start
+        else:
+            with span('ocr.detect', canvas_size=canvas_size):
+                horizontal_list, free_list = reader.detect(
+                    img_array, canvas_size=canvas_size, min_size=min_text_size,
+                    text_threshold=text_threshold, low_text=text_threshold
+                )
+            timings['detect'] = time.perf_counter() - start
+            # detect() returns one list of boxes per input image; its min_size
+            # only drops boxes small in both directions, so short wide strips
+            # are dropped here
+            horizontal_list, free_list = _tall_enough(horizontal_list[0], free_list[0], min_text_size)
+            start = time.perf_counter()
+            results = []
+            if horizontal_list or free_list:
+                with span('ocr.recognize', regions=len(horizontal_list) + len(free_list)):
+                    results = reader.recognize(img_array, horizontal_list=horizontal_list, free_list=free_list)
+            timings['recognize'] = time.perf_counter() - start
+    
+    filtered_text = []
+    confidences = []
+    positions = []
+    
+    for bbox, text, conf in results:
+        filtered_text.append(text)
+        confidences.append(conf)
+        positions.append({
+            'left': int(bbox[0][0]),
+            'top': int(bbox[0][1]),
+            'width': int(bbox[2][0] - bbox[0][0]),
+            'height': int(bbox[2][1] - bbox[0][1])
+        })
         
-        filtered_text = []
-        confidences = []
-        positions = []
+    return {
+        'text': filtered_text,
+        'confidences': confidences,
+        'positions': positions,
+        'full_text': ' '.join(filtered_text),
+        'timings': timings
+    }
+
+def detect_text(image: ImageInput, min_confidence: float = 0.0, mode: Optional[str] = None,
+                raise_errors: bool = False) -> Dict[str, any]:
+    """
+    Detect text in the image with a reader borrowed from the shared OCR pool.
+    
+    Args:
+        image: PIL Image object or AnalyzedImage
+        min_confidence: Drop recognized text below this confidence (0-1);
+            applied after the cache, so changing it doesn't rerun OCR
+        mode: One of OCR_MODES; defaults to the OCR_MODE environment setting
+        raise_errors: Raise failures (e.g. easyocr missing) instead of
+            logging them and returning an empty result
         
-        for bbox, text, conf in results:
-            filtered_text.append(text)
-            confidences.append(conf)
-            positions.append({
-                'left': int(bbox[0][0]),
-                'top': int(bbox[0][1]),
-                'width': int(bbox[2][0] - bbox[0][0]),
-                'height': int(bbox[2][1] - bbox[0][1])
-            })
-            
-        return {
-            'text': filtered_text,
-            'confidences': confidences,
-            'positions': positions,
-            'full_text': ' '.join(filtered_text)
-        }
+    Returns:
+        Dictionary containing detected text, confidences and positions, plus
+        per-stage 'timings' in seconds of the pass that produced it (a cached
+        result keeps its original timings)
+    """
+    try:
+        result = _read_text(AnalyzedImage.wrap(image), mode or DEFAULT_OCR_MODE,
+                            OCR_CANVAS_SIZE, OCR_MIN_TEXT_SIZE, OCR_TEXT_THRESHOLD)
     except Exception as e:
+        if raise_errors:
+            raise
         logging.error(f"Error in text detection: {str(e)}")
-        return {'text': [], 'confidences': [], 'positions': [], 'full_text': ''}
+        return {'text': [], 'confidences': [], 'positions': [], 'full_text': '', 'timings': {}}
+    
+    keep = [i for i, conf in enumerate(result['confidences']) if conf >= min_confidence]
+    if len(keep) == len(result['confidences']):
+        return result
+    # Cached results may be shared between callers, so filter into a copy
+    text = [result['text'][i] for i in keep]
+    return {
+        'text': text,
+        'confidences': [result['confidences'][i] for i in keep],
+        'positions': [result['positions'][i] for i in keep],
+        'full_text': ' '.join(text),
+        'timings': result['timings']
+    }
 
 
+@cached_analysis('composition', version='2')
+def _composition_metrics(image: ImageInput) -> Dict[str, float]:
+    """
+    Composition metrics for one image from its H x W uint8 grayscale array.
+    
+    Region means come from per-row/per-column sums and slice sums, mean and
+    contrast from a 256-bin histogram, and the gradients are computed in
+    float32 in place.
+    """
+    gray = AnalyzedImage.wrap(image).gray()
+    height, width = gray.shape
+    max_pixel_value = 255.0
+    pixels = height * width
+    
+    # Brightness in halves from row/column sums
+    col_sums = gray.sum(axis=0, dtype=np.float64)
+    row_sums = gray.sum(axis=1, dtype=np.float64)
+    left_brightness = col_sums[:width//2].sum() / (height * (width // 2))
+    right_brightness = col_sums[width//2:].sum() / (height * (width - width // 2))
+    top_brightness = row_sums[:height//2].sum() / ((height // 2) * width)
+    bottom_brightness = row_sums[height//2:].sum() / ((height - height // 2) * width)
+    
+    # Centre third, averaged over the whole frame like the old masked mean
+    third_h = height // 3
+    third_w = width // 3
+    thirds_sum = gray[third_h:2*third_h, third_w:2*third_w].sum(dtype=np.float64)
+    
+    # Mean and standard deviation from one histogram
+    hist = np.bincount(gray.ravel(), minlength=256)
+    levels = np.arange(256, dtype=np.float64)
+    mean = hist @ levels / pixels
+    variance = max(hist @ (levels ** 2) / pixels - mean ** 2, 0)
+    
+    # Edge density from forward differences (first row/column has no gradient)
+    dx = np.zeros(gray.shape, dtype=np.float32)
+    np.subtract(gray[:, 1:], gray[:, :-1], out=dx[:, 1:], dtype=np.float32)
+    np.square(dx, out=dx)
+    dy = np.zeros(gray.shape, dtype=np.float32)
+    np.subtract(gray[1:, :], gray[:-1, :], out=dy[1:, :], dtype=np.float32)
+    np.square(dy, out=dy)
+    dx += dy
+    del dy
+    np.sqrt(dx, out=dx)
+    edge_density = dx.mean(dtype=np.float64)
+    
+    return {
+        'balance_horizontal': float(abs(left_brightness - right_brightness) / max_pixel_value),
+        'balance_vertical': float(abs(top_brightness - bottom_brightness) / max_pixel_value),
+        'thirds_intensity': float(thirds_sum / pixels / max_pixel_value),
+        'overall_brightness': float(mean / max_pixel_value),
+        'edge_density': float(edge_density / max_pixel_value),
+        'contrast': float(np.sqrt(variance) / max_pixel_value)
+    }
 
-def analyze_image_composition(image: Image.Image) -> Dict[str, float]:
+def analyze_image_composition(image: ImageInput, raise_errors: bool = False) -> Dict[str, float]:
     """
     Analyze the composition of the image including rule of thirds and visual balance
     using PIL and numpy instead of OpenCV.
     
     Args:
-        image: PIL Image object
+        image: PIL Image object or AnalyzedImage
+        raise_errors: Raise failures instead of logging them and returning
+            all-zero metrics
         
     Returns:
         Dictionary containing composition analysis results
     """
     try:
-        # Convert image to grayscale using PIL
-        gray_image = image.convert('L')
-        
-        # Convert to numpy array for calculations
-        np_image = np.array(gray_image)
-        height, width = np_image.shape
-        
-        # Calculate rule of thirds points
-        third_h = height // 3
-        third_w = width // 3
-        
-        # Create masks for different regions
-        thirds_mask = np.zeros((height, width))
-        thirds_mask[third_h:2*third_h, third_w:2*third_w] = 1
-        
-        # Calculate brightness in different regions
-        # Using numpy operations directly on grayscale array
-        left_brightness = np.mean(np_image[:, :width//2])
-        right_brightness = np.mean(np_image[:, width//2:])
-        top_brightness = np.mean(np_image[:height//2, :])
-        bottom_brightness = np.mean(np_image[height//2:, :])
-        
-        # Normalize values between 0 and 1
-        max_pixel_value = 255.0
-        
-        analysis_results = {
-            'balance_horizontal': abs(left_brightness - right_brightness) / max_pixel_value,
-            'balance_vertical': abs(top_brightness - bottom_brightness) / max_pixel_value,
-            'thirds_intensity': np.mean(np_image * thirds_mask) / max_pixel_value,
-            'overall_brightness': np.mean(np_image) / max_pixel_value
-        }
-        
-        # Add additional composition metrics
-        
-        # Calculate edge density using Sobel-like operations
-        dx = np.diff(np_image, axis=1, prepend=np_image[:, :1])
-        dy = np.diff(np_image, axis=0, prepend=np_image[:1, :])
-        edge_magnitude = np.sqrt(dx**2 + dy**2)
-        analysis_results['edge_density'] = np.mean(edge_magnitude) / max_pixel_value
-        
-        # Calculate contrast
-        contrast = np.std(np_image) / max_pixel_value
-        analysis_results['contrast'] = contrast
-        
-        return analysis_results
-        
+        return _composition_metrics(AnalyzedImage.wrap(image))
     except Exception as e:
+        if raise_errors:
+            raise
         logging.error(f"Error in composition analysis: {str(e)}")
         return {
             'balance_horizontal': 0,
@@ -186,28 +296,28 @@ def get_composition_insights(analysis_results: Dict[str, float]) -> Dict[str, st
     return insights
 
 
-def detect_faces(image: Image.Image) -> List[Tuple[int, int, int, int]]:
+@cached_analysis('faces', version='2')
+def _face_locations(image: ImageInput, detector: Optional[str] = None) -> List[Tuple[int, int, int, int]]:
+    return find_faces(AnalyzedImage.wrap(image), ANALYSIS_SIZES['faces'], detector)
+
+def detect_faces(image: ImageInput, detector: Optional[str] = None) -> List[Tuple[int, int, int, int]]:
     """
     Detect faces in the image and return their locations.
     
+    Detection runs on a copy shrunk to ANALYSIS_SIZES['faces'] and the boxes
+    are mapped back, so they are in the coordinates of `image`.
+    
     Args:
-        image: PIL Image object
+        image: PIL Image object or AnalyzedImage
+        detector: Face detector from utils.faces.FACE_DETECTORS; defaults to
+            the FACE_DETECTOR environment setting
         
     Returns:
-        List of tuples containing face locations (top, right, bottom, left)
+        List of tuples containing face locations (top, right, bottom, left),
+        largest first
     """
     try:
-        # Convert PIL image to numpy array
-        np_image = np.array(image)
-        
-        # Convert RGB to BGR for cv2
-        if len(np_image.shape) == 3:  # Color image
-            np_image = np_image[:, :, ::-1]
-        
-        # Detect faces using face_recognition library
-        face_locations = face_recognition.face_locations(np_image)
-        
-        return face_locations
+        return [tuple(box) for box in _face_locations(AnalyzedImage.wrap(image), detector)]
     except Exception as e:
         logging.error(f"Error in face detection: {str(e)}")
         return []
@@ -229,3 +339,50 @@ def detect_faces(image: Image.Image) -> List[Tuple[int, int, int, int]]:
 
 
 
+
+# Rule-of-thirds power points, as fractions of width and height
+THIRDS_POINTS = np.array([(x, y) for x in (1 / 3, 2 / 3) for y in (1 / 3, 2 / 3)])
+# A face centre within this (normalized) distance of a power point counts as on it
+THIRDS_TOLERANCE = 0.1
+
+def analyze_face_placement(face_locations: List[Tuple[int, int, int, int]],
+                           image_size: Tuple[int, int]) -> Dict[str, float]:
+    """
+    Measure how the detected faces sit relative to the rule-of-thirds points.
+    
+    Args:
+        face_locations: Boxes from detect_faces, (top, right, bottom, left)
+        image_size: (width, height) of the image the boxes refer to
+        
+    Returns:
+        Dictionary with the face count, the share of the frame covered by the
+        largest face, its centre's distance to the nearest thirds point (in
+        fractions of the frame) and how many faces sit on a thirds point
+    """
+    if not face_locations:
+        return {'face_count': 0, 'largest_face_share': 0.0, 'thirds_distance': 0.0, 'faces_on_thirds': 0}
+    
+    width, height = image_size
+    boxes = np.array(face_locations, dtype=np.float64)
+    top, right, bottom, left = boxes.T
+    centres = np.stack([(left + right) / 2 / width, (top + bottom) / 2 / height], axis=1)
+    distances = np.linalg.norm(centres[:, None, :] - THIRDS_POINTS[None, :, :], axis=2).min(axis=1)
+    areas = (right - left) * (bottom - top)
+    largest = int(np.argmax(areas))
+    
+    return {
+        'face_count': len(face_locations),
+        'largest_face_share': float(areas[largest] / (width * height)),
+        'thirds_distance': float(distances[largest]),
+        'faces_on_thirds': int((distances <= THIRDS_TOLERANCE).sum())
+    }
+
+def get_face_placement_insight(placement: Dict[str, float]) -> Optional[str]:
+    """Short advice on face placement, or None when no face was found."""
+    if placement['face_count'] == 0:
+        return None
+    if placement['thirds_distance'] <= THIRDS_TOLERANCE:
+        return "Main face sits on a rule-of-thirds point"
+    if placement['largest_face_share'] > 0.25:
+        return "Face fills much of the frame; thirds placement matters less"
+    return "Consider moving the main face towards a rule-of-thirds point"
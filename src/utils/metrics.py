@@ -0,0 +1,88 @@
+# src/utils/metrics.py
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+# Input column names for frames built from get_videos_details dicts
+DETAIL_COLUMNS = {
+    'views': 'view_count',
+    'likes': 'like_count',
+    'comments': 'comment_count',
+    'subscribers': 'subscriber_count',
+    'published_at': 'published_at',
+}
+# Input column names for MetricsStore / get_video_stats frames
+SNAPSHOT_COLUMNS = {
+    'views': 'views',
+    'likes': 'likes',
+    'comments': 'comments',
+    'subscribers': 'subscribers',
+    'published_at': 'published_at',
+}
+
+METRIC_COLUMNS = ('like_ratio', 'comment_ratio', 'sub_conversion', 'view_velocity', 'engagement_score',
+                  'like_grade', 'comment_grade')
+
+# (good, average) thresholds in percent; anything at or below average is 'Poor'
+LIKE_RATIO_GRADES = (4.0, 1.0)
+COMMENT_RATIO_GRADES = (0.5, 0.1)
+
+
+def _grade(values: pd.Series, thresholds) -> pd.Series:
+    good, average = thresholds
+    grades = np.select([values > good, values > average], ['Good', 'Average'], 'Poor')
+    return pd.Series(grades, index=values.index, dtype=object).where(values.notna())
+
+
+def calculate_metrics_frame(frame: pd.DataFrame, columns: Optional[Dict[str, str]] = None,
+                            now=None) -> pd.DataFrame:
+    """
+    Engagement metrics for every row of a frame, as column operations.
+
+    Computes the same metrics as calculate_video_metrics: like_ratio,
+    comment_ratio and sub_conversion in percent, view_velocity in views
+    per day since publishing (at least one day), engagement_score capped
+    at 100, and 'Good'/'Average'/'Poor' like and comment grades. Rows with
+    zero views (or zero/unknown subscribers, for the subscriber-based
+    metrics) get NaN rather than raising.
+
+    Args:
+        frame: One row per video
+        columns: Maps 'views', 'likes', 'comments', 'subscribers' and
+            'published_at' to the frame's column names; defaults to
+            DETAIL_COLUMNS (see also SNAPSHOT_COLUMNS). A missing
+            subscribers column is treated as unknown.
+        now: Reference time for view_velocity; defaults to the current UTC time
+
+    Returns:
+        Copy of `frame` with METRIC_COLUMNS added (replacing any existing ones)
+    """
+    names = {**DETAIL_COLUMNS, **(columns or {})}
+    views = frame[names['views']].astype('float64')
+    views = views.where(views > 0)
+    likes = frame[names['likes']].astype('float64')
+    comments = frame[names['comments']].astype('float64')
+    if names['subscribers'] in frame:
+        subscribers = frame[names['subscribers']].astype('float64')
+        subscribers = subscribers.where(subscribers > 0)
+    else:
+        subscribers = pd.Series(np.nan, index=frame.index)
+
+    now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+    if now.tzinfo is None:
+        now = now.tz_localize('UTC')
+    published = pd.to_datetime(frame[names['published_at']], utc=True, format='ISO8601')
+    age_days = (now - published).dt.days.clip(lower=1)
+
+    result = frame.drop(columns=list(METRIC_COLUMNS), errors='ignore')
+    result['like_ratio'] = likes / views * 100
+    result['comment_ratio'] = comments / views * 100
+    result['sub_conversion'] = views / subscribers * 100
+    result['view_velocity'] = views / age_days
+    result['engagement_score'] = (
+        result['like_ratio'] * 20 + result['comment_ratio'] * 30 + result['sub_conversion'] * 0.3
+    ).clip(upper=100)
+    result['like_grade'] = _grade(result['like_ratio'], LIKE_RATIO_GRADES)
+    result['comment_grade'] = _grade(result['comment_ratio'], COMMENT_RATIO_GRADES)
+    return result
@@ -0,0 +1,127 @@
+# src/utils/ocr_pool.py
+
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from utils.backends import get_backend
+from utils.env_loader import env_float, env_int
+from utils.tracing import span
+
+DEFAULT_POOL_SIZE = max(1, env_int('OCR_POOL_SIZE', 1))
+DEFAULT_ACQUIRE_TIMEOUT = env_float('OCR_ACQUIRE_TIMEOUT', 60.0)
+
+
+class OCREnginePool:
+    """
+    Thread-safe pool of easyocr readers.
+
+    Readers are created lazily, at most `size` of them, and each one is
+    handed to a single caller at a time, so `size` also bounds how many
+    OCR passes run concurrently. A new reader gets a warm-up pass before it
+    is first handed out, so the first real thumbnail doesn't pay for
+    torch's lazy initialisation.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, languages: Sequence[str] = ('en',),
+                 gpu: bool = False, factory: Optional[Callable[[], object]] = None):
+        self.size = max(1, int(size))
+        self.languages = list(languages)
+        self.gpu = gpu
+        self._factory = factory
+        # Idle readers, most recently returned last; guarded by _available,
+        # which is notified whenever a reader or a creation slot frees up
+        self._idle = []
+        self._created = 0
+        self._available = threading.Condition()
+
+    def _create_engine(self):
+        with span('ocr.load_model', languages=','.join(self.languages)):
+            if self._factory is not None:
+                reader = self._factory()
+            else:
+                reader = get_backend('easyocr').Reader(self.languages, gpu=self.gpu)
+            self._warm_up(reader)
+        return reader
+
+    @staticmethod
+    def _warm_up(reader):
+        try:
+            reader.readtext(np.zeros((32, 32, 3), dtype=np.uint8))
+        except Exception as e:
+            logging.warning(f"OCR warm-up failed: {str(e)}")
+
+    def _acquire(self, timeout: Optional[float]):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while not self._idle and self._created >= self.size:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No OCR engine became available within {timeout}s")
+                self._available.wait(remaining)
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+
+        try:
+            return self._create_engine()
+        except Exception:
+            # Give the slot back and wake a waiter to try creating one itself
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+
+    def _release(self, reader) -> None:
+        with self._available:
+            self._idle.append(reader)
+            self._available.notify()
+
+    @contextmanager
+    def engine(self, timeout: Optional[float] = DEFAULT_ACQUIRE_TIMEOUT):
+        """
+        Borrow a reader for the duration of the `with` block.
+
+        Args:
+            timeout: Seconds to wait for a free reader once the pool is full
+
+        Yields:
+            An easyocr.Reader (or whatever `factory` builds)
+        """
+        with span('ocr.acquire'):
+            reader = self._acquire(timeout)
+        try:
+            yield reader
+        finally:
+            self._release(reader)
+
+    def warm_up(self) -> None:
+        """Create (and warm) the first reader ahead of the first request."""
+        with self.engine():
+            pass
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'size': self.size,
+            'created': self._created,
+            'idle': len(self._idle),
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> OCREnginePool:
+    """Return the process-wide OCR pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCREnginePool()
+    return _pool
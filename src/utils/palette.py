@@ -0,0 +1,184 @@
+# src/utils/palette.py
+
+import os
+import time
+import numpy as np
+from PIL import Image
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from utils.backends import get_backend
+from utils.analyzed_image import AnalyzedImage
+
+Palette = List[Tuple[np.ndarray, float]]
+
+# 'exact' stays the default only so results match the palettes already in
+# the 'colors' cache and batch outputs. It is not a full-fidelity palette:
+# it clusters float32 pixels of the 320x180 'colors' decode (see
+# image_analysis.ANALYSIS_SIZES), and run directly on a maxres image it
+# takes ~6.8 s against ~68 ms for 'downsample'. Set
+# PALETTE_STRATEGY=downsample for the faster sampled version;
+# benchmarks/bench_image_analysis.py reports each strategy's error vs 'exact'.
+DEFAULT_PALETTE_STRATEGY = os.getenv('PALETTE_STRATEGY', 'exact')
+DOWNSAMPLE_MAX_PIXELS = 20_000
+MINIBATCH_SIZE = 4096
+
+
+def image_to_pixels(image: Union[Image.Image, AnalyzedImage]) -> np.ndarray:
+    """
+    Flatten an image of any mode into an (N, 3) uint8 array of RGB pixels.
+
+    Grayscale and palette images are expanded to RGB; for images with an
+    alpha channel, fully transparent pixels are dropped so they don't show
+    up as a dominant colour.
+
+    Args:
+        image: PIL Image object or AnalyzedImage
+
+    Returns:
+        Array of shape (N, 3) with dtype uint8
+    """
+    if isinstance(image, AnalyzedImage):
+        if not image.has_alpha:
+            return image.rgb().reshape(-1, 3)
+        image = image.image
+    if 'A' in image.getbands() or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = np.asarray(image.convert('RGBA'))
+        pixels = rgba.reshape(-1, 4)
+        opaque = pixels[pixels[:, 3] > 0, :3]
+        # An all-transparent image still has colours, just no visible ones
+        return opaque if len(opaque) else pixels[:, :3]
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.asarray(image).reshape(-1, 3)
+
+
+def _sorted_palette(colors: np.ndarray, counts: np.ndarray) -> Palette:
+    keep = counts > 0
+    colors = colors[keep].astype(int)
+    percentages = counts[keep] / counts.sum()
+    color_percentages = list(zip(colors, percentages))
+    color_percentages.sort(key=lambda x: x[1], reverse=True)
+    return color_percentages
+
+
+def _kmeans_palette(model, pixels: np.ndarray, n_colors: int) -> Palette:
+    model.fit(pixels.astype(np.float32))
+    counts = np.bincount(model.labels_, minlength=n_colors)
+    return _sorted_palette(model.cluster_centers_, counts)
+
+
+def exact_palette(pixels: np.ndarray, n_colors: int) -> Palette:
+    """Full KMeans over every pixel with ten restarts (the original behaviour)."""
+    KMeans = get_backend('sklearn.cluster').KMeans
+    return _kmeans_palette(KMeans(n_clusters=n_colors, random_state=42, n_init=10), pixels, n_colors)
+
+
+def downsample_palette(pixels: np.ndarray, n_colors: int) -> Palette:
+    """KMeans over a fixed-size random sample of the pixels."""
+    if len(pixels) > DOWNSAMPLE_MAX_PIXELS:
+        rng = np.random.default_rng(42)
+        pixels = pixels[rng.choice(len(pixels), DOWNSAMPLE_MAX_PIXELS, replace=False)]
+    KMeans = get_backend('sklearn.cluster').KMeans
+    return _kmeans_palette(KMeans(n_clusters=n_colors, random_state=42, n_init=3), pixels, n_colors)
+
+
+def minibatch_palette(pixels: np.ndarray, n_colors: int) -> Palette:
+    """MiniBatch KMeans over all pixels."""
+    MiniBatchKMeans = get_backend('sklearn.cluster').MiniBatchKMeans
+    model = MiniBatchKMeans(n_clusters=n_colors, random_state=42, n_init=3, batch_size=MINIBATCH_SIZE)
+    return _kmeans_palette(model, pixels, n_colors)
+
+
+def median_cut_palette(pixels: np.ndarray, n_colors: int) -> Palette:
+    """Pillow's median-cut quantizer; no clustering at all."""
+    strip = Image.fromarray(np.ascontiguousarray(pixels).reshape(-1, 1, 3), mode='RGB')
+    quantized = strip.quantize(colors=n_colors, method=Image.Quantize.MEDIANCUT)
+    counts = np.bincount(np.asarray(quantized).ravel(), minlength=n_colors)
+    colors = np.array(quantized.getpalette()[:3 * len(counts)]).reshape(-1, 3)
+    return _sorted_palette(colors, counts[:len(colors)])
+
+
+PALETTE_STRATEGIES: Dict[str, Callable[[np.ndarray, int], Palette]] = {
+    'exact': exact_palette,
+    'downsample': downsample_palette,
+    'minibatch': minibatch_palette,
+    'median_cut': median_cut_palette,
+}
+
+
+def extract_palette(image: Union[Image.Image, AnalyzedImage], n_colors: int = 5, strategy: Optional[str] = None) -> Palette:
+    """
+    Extract the dominant colours of an image with the chosen strategy.
+
+    Args:
+        image: PIL Image object (any mode) or AnalyzedImage
+        n_colors: Number of dominant colors to extract
+        strategy: One of PALETTE_STRATEGIES; defaults to DEFAULT_PALETTE_STRATEGY
+
+    Returns:
+        List of tuples containing (RGB color array, percentage), most common first
+    """
+    strategy = strategy or DEFAULT_PALETTE_STRATEGY
+    if strategy not in PALETTE_STRATEGIES:
+        raise ValueError(f"Unknown palette strategy '{strategy}', expected one of {sorted(PALETTE_STRATEGIES)}")
+
+    pixels = image_to_pixels(image)
+    # KMeans refuses more clusters than there are samples
+    n_colors = max(1, min(n_colors, len(pixels)))
+    return PALETTE_STRATEGIES[strategy](pixels, n_colors)
+
+
+def palette_error(palette: Palette, reference: Palette) -> float:
+    """
+    Distance between a palette and a reference palette.
+
+    Each reference colour is matched to its nearest colour in `palette`;
+    the result is the percentage-weighted mean RGB distance, normalised to
+    0..1 by the length of the RGB cube diagonal.
+
+    Args:
+        palette: Palette under test
+        reference: Palette treated as ground truth (usually the exact one)
+
+    Returns:
+        Error between 0 (identical) and 1
+    """
+    if not palette or not reference:
+        return 1.0
+    colors = np.array([color for color, _ in palette], dtype=np.float32)
+    ref_colors = np.array([color for color, _ in reference], dtype=np.float32)
+    weights = np.array([pct for _, pct in reference], dtype=np.float32)
+    distances = np.linalg.norm(ref_colors[:, None, :] - colors[None, :, :], axis=2).min(axis=1)
+    return float(np.average(distances, weights=weights) / np.sqrt(3 * 255.0 ** 2))
+
+
+def compare_palette_strategies(image: Image.Image, n_colors: int = 5,
+                               strategies: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Run each strategy on the same image and score it against the exact palette.
+
+    Args:
+        image: PIL Image object
+        n_colors: Number of dominant colors to extract
+        strategies: Strategy names to compare; defaults to all of them
+
+    Returns:
+        Dictionary mapping strategy name to {'seconds', 'error'}
+    """
+    strategies = strategies or list(PALETTE_STRATEGIES)
+    report = {}
+
+    start = time.perf_counter()
+    reference = extract_palette(image, n_colors, 'exact')
+    report['exact'] = {'seconds': time.perf_counter() - start, 'error': 0.0}
+
+    for name in strategies:
+        if name == 'exact':
+            continue
+        start = time.perf_counter()
+        palette = extract_palette(image, n_colors, name)
+        report[name] = {
+            'seconds': time.perf_counter() - start,
+            'error': palette_error(palette, reference),
+        }
+    return report
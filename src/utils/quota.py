@@ -0,0 +1,271 @@
+# src/utils/quota.py
+
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from utils.env_loader import env_float, env_int
+from utils.singleflight import get_group
+from utils.tracing import count, span
+
+# Quota units per call, from the YouTube Data API v3 quota calculator
+QUOTA_COSTS: Dict[str, int] = {
+    'search.list': 100,
+    'videos.list': 1,
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'playlists.list': 1,
+    'commentThreads.list': 1,
+    'comments.list': 1,
+    'videoCategories.list': 1,
+    'i18nRegions.list': 1,
+}
+DEFAULT_COST = 1
+
+DAILY_QUOTA = env_int('YOUTUBE_DAILY_QUOTA', 10000)
+QUOTA_BURST = env_int('YOUTUBE_QUOTA_BURST', 2000)
+# Share of the bucket background work may not dip into, kept for interactive pages
+BACKGROUND_RESERVE = env_float('YOUTUBE_QUOTA_BACKGROUND_RESERVE', 0.25)
+INTERACTIVE_TIMEOUT = env_float('YOUTUBE_QUOTA_INTERACTIVE_TIMEOUT', 5.0)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_priority: contextvars.ContextVar = contextvars.ContextVar('youtube_request_priority', default=INTERACTIVE)
+
+
+class QuotaExceededError(Exception):
+    """Raised when a request can't be made without exceeding the API quota."""
+
+
+@contextmanager
+def background_priority():
+    """Run the API calls made inside the block as background (sync/batch) work."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class TokenBucket:
+    """Token bucket holding up to `capacity` quota units, refilled continuously."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def take(self, cost: float) -> None:
+        self._refill()
+        self.tokens -= cost
+
+    def seconds_until(self, tokens: float) -> float:
+        """Seconds until the bucket holds `tokens` units (0 if it already does)."""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float('inf')
+        return (tokens - self.tokens) / self.refill_per_second
+
+    def drain(self) -> None:
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+
+class QuotaScheduler:
+    """
+    Central gate for YouTube Data API calls.
+
+    Each API key gets a token bucket sized in quota units. A call may start
+    once its endpoint's cost is available; background calls additionally
+    leave `background_reserve` of the bucket untouched and yield to any
+    interactive call that is waiting. Identical requests already in flight
+    are coalesced through the 'youtube_api' single-flight group: later
+    callers wait for the first one's response instead of spending quota
+    again.
+    """
+
+    def __init__(self, daily_quota: int = DAILY_QUOTA, burst: int = QUOTA_BURST,
+                 background_reserve: float = BACKGROUND_RESERVE):
+        self.daily_quota = daily_quota
+        self.burst = burst
+        self.background_reserve = background_reserve
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._flights = get_group('youtube_api')
+        self._waiting_interactive = 0
+        self._condition = threading.Condition()
+        self.stats = {'calls': 0, 'units': 0, 'rejected': 0}
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.burst, self.daily_quota / 86400.0)
+        return bucket
+
+    def acquire(self, key: str, cost: int, priority: Optional[int] = None,
+                timeout: Optional[float] = None) -> None:
+        """
+        Block until `cost` units can be spent for `key`, then spend them.
+
+        Args:
+            key: API key (or any quota owner)
+            cost: Quota units the call will use
+            priority: INTERACTIVE or BACKGROUND; defaults to the current context
+            timeout: Seconds to wait; interactive calls default to a few
+                seconds, background calls wait as long as needed
+
+        Raises:
+            QuotaExceededError: If the units don't become available in time
+        """
+        priority = current_priority() if priority is None else priority
+        if timeout is None:
+            timeout = INTERACTIVE_TIMEOUT if priority == INTERACTIVE else float('inf')
+        deadline = time.monotonic() + timeout
+        reserve = self.burst * self.background_reserve if priority == BACKGROUND else 0.0
+
+        with self._condition:
+            bucket = self._bucket(key)
+            if priority == INTERACTIVE:
+                self._waiting_interactive += 1
+            try:
+                while True:
+                    yield_to_interactive = priority == BACKGROUND and self._waiting_interactive > 0
+                    wait = bucket.seconds_until(cost + reserve)
+                    if wait == 0 and not yield_to_interactive:
+                        bucket.take(cost)
+                        self.stats['calls'] += 1
+                        self.stats['units'] += cost
+                        return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or wait > remaining:
+                        self.stats['rejected'] += 1
+                        raise QuotaExceededError(
+                            f"YouTube API quota exhausted for this key; {cost} units needed, "
+                            f"available again in about {wait / 60:.0f} min"
+                        )
+                    wait_for = min(remaining, wait) if wait else remaining
+                    self._condition.wait(None if wait_for == float('inf') else wait_for)
+            finally:
+                if priority == INTERACTIVE:
+                    self._waiting_interactive -= 1
+                    self._condition.notify_all()
+
+    def mark_exhausted(self, key: str) -> None:
+        """The API reported quotaExceeded: stop spending on this key until it refills."""
+        with self._condition:
+            self._bucket(key).drain()
+
+    def execute(self, request, priority: Optional[int] = None, timeout: Optional[float] = None):
+        """
+        Execute a googleapiclient request under the quota budget.
+
+        Args:
+            request: Unexecuted googleapiclient HttpRequest
+            priority: INTERACTIVE or BACKGROUND; defaults to the current context
+            timeout: Seconds to wait for quota (see acquire)
+
+        Returns:
+            The API response
+        """
+        coalesce_key = (request.method, request.uri, request.body)
+        return self._flights.do(coalesce_key, self._execute_now, request, priority, timeout)
+
+    def execute_batch(self, batch, requests: List, priority: Optional[int] = None,
+                      timeout: Optional[float] = None):
+        """
+        Execute a googleapiclient BatchHttpRequest under the quota budget.
+
+        Every call in a batch is billed as if it were made on its own, so the
+        batch costs the sum of its requests. Errors of individual calls go to
+        the batch's callbacks instead of being raised; pass them through
+        api_error so quotaExceeded pauses the key there too.
+
+        Args:
+            batch: Unexecuted BatchHttpRequest
+            requests: The requests added to `batch`, all billed to one key
+            priority: INTERACTIVE or BACKGROUND; defaults to the current context
+            timeout: Seconds to wait for quota (see acquire)
+        """
+        return self._run(request_key(requests[0]), sum(request_cost(request) for request in requests),
+                         endpoint_name(requests[0]), batch.execute, priority, timeout)
+
+    def api_error(self, key: str, error: Exception) -> Exception:
+        """
+        The exception to surface for a failed API call billed to `key`.
+
+        A quotaExceeded response drains the key's bucket (see mark_exhausted)
+        and becomes a QuotaExceededError; any other error is returned as is.
+        """
+        if not _is_quota_error(error):
+            return error
+        self.mark_exhausted(key)
+        quota_error = QuotaExceededError(f"YouTube API quota exceeded: {error}")
+        quota_error.__cause__ = error
+        return quota_error
+
+    def _execute_now(self, request, priority: Optional[int], timeout: Optional[float]):
+        return self._run(request_key(request), request_cost(request), endpoint_name(request),
+                         request.execute, priority, timeout)
+
+    def _run(self, key: str, cost: int, endpoint: str, call: Callable[[], object],
+             priority: Optional[int], timeout: Optional[float]):
+        with span('youtube_api.quota_wait', endpoint=endpoint):
+            self.acquire(key, cost, priority, timeout)
+        count('youtube_quota_units', cost, endpoint=endpoint)
+        try:
+            with span(f'youtube_api.{endpoint}', cost=cost):
+                return call()
+        except Exception as e:
+            raise self.api_error(key, e)
+
+def endpoint_name(request) -> str:
+    """'search.list' for a request whose methodId is 'youtube.search.list'."""
+    method_id = getattr(request, 'methodId', None) or ''
+    return method_id.split('.', 1)[1] if method_id.startswith('youtube.') else method_id
+
+
+def request_key(request) -> str:
+    """API key a request is billed to, taken from its URI."""
+    return parse_qs(urlparse(request.uri).query).get('key', [''])[0]
+
+
+def request_cost(request) -> int:
+    return QUOTA_COSTS.get(endpoint_name(request), DEFAULT_COST)
+
+
+def _is_quota_error(error: Exception) -> bool:
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return status == 403 and b'quota' in (getattr(error, 'content', b'') or b'').lower()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> QuotaScheduler:
+    """Return the process-wide quota scheduler, creating it on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = QuotaScheduler()
+    return _scheduler
@@ -0,0 +1,293 @@
+# src/utils/similarity.py
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from utils.env_loader import env_float
+from utils.analyzed_image import AnalyzedImage
+from utils.data_storage import connect
+from utils.image_analysis import analyze_colors
+from utils.tracing import span
+
+# dHash compares HASH_SIZE + 1 columns of a HASH_SIZE-row grayscale
+# miniature, giving HASH_SIZE ** 2 = 64 bits
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+# Palette colors indexed per thumbnail, and levels per RGB channel of the
+# share histogram they are binned into (4 -> 64 bins, one byte each)
+PALETTE_COLORS = 5
+PALETTE_LEVELS = 4
+PALETTE_BINS = PALETTE_LEVELS ** 3
+# Share of the ranking score that comes from the palette (the rest is dHash)
+PALETTE_WEIGHT = env_float('SIMILARITY_PALETTE_WEIGHT', 0.3)
+# Candidates kept from the Hamming pass per requested result before the
+# palette re-ranking
+CANDIDATES_PER_RESULT = 20
+
+# Set bits per byte, for numpy versions without np.bitwise_count
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Set bits of each uint64."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+
+def dhash(image) -> int:
+    """
+    64-bit difference hash of an image.
+
+    Each bit says whether a pixel of a 9x8 grayscale miniature is brighter
+    than its left neighbour, so re-encodes, rescales and small edits keep
+    most bits while different layouts flip many.
+
+    Args:
+        image: PIL Image or AnalyzedImage
+
+    Returns:
+        Hash as an unsigned 64-bit int
+    """
+    gray = Image.fromarray(np.asarray(AnalyzedImage.wrap(image).gray()))
+    small = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS), dtype=np.int16)
+    bits = small[:, 1:] > small[:, :-1]
+    return int(np.packbits(bits.ravel()).view('>u8')[0])
+
+
+def palette_vector(colors: Sequence[Tuple[np.ndarray, float]]) -> np.ndarray:
+    """
+    Fixed-length form of an analyze_colors palette for distance computations.
+
+    Colors are binned into a PALETTE_LEVELS ** 3 RGB histogram weighted by
+    their shares, so palettes compare regardless of color order or count.
+
+    Returns:
+        PALETTE_BINS uint8 shares scaled to 0-255
+    """
+    histogram = np.zeros(PALETTE_BINS, dtype=np.float64)
+    for color, share in colors:
+        r, g, b = (min(int(c) * PALETTE_LEVELS // 256, PALETTE_LEVELS - 1) for c in color[:3])
+        histogram[(r * PALETTE_LEVELS + g) * PALETTE_LEVELS + b] += share
+    total = histogram.sum()
+    if total > 0:
+        histogram /= total
+    return np.round(histogram * 255).astype(np.uint8)
+
+
+def _signed(value: int) -> int:
+    """uint64 hash as the signed 64-bit integer SQLite can store."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour index of thumbnails by dHash and color palette.
+
+    Rows live in SQLite; each process keeps them in memory as a packed
+    uint64 hash array and a uint8 palette matrix, catching up on rows other
+    processes added (e.g. batch workers) before every query. A query is an
+    XOR + popcount over every hash, a partial sort for the closest
+    candidates by Hamming distance, then a re-rank of those candidates by
+    a blend of Hamming and palette distance.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._conn = connect(db_path)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            # AUTOINCREMENT so a replaced row always gets a higher id than
+            # any this process has already loaded
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS thumbnail_hashes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    video_id TEXT NOT NULL UNIQUE,
+                    dhash INTEGER NOT NULL,
+                    palette BLOB NOT NULL,
+                    indexed_at TEXT NOT NULL
+                )
+            ''')
+        self._video_ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._palettes = np.empty((0, PALETTE_BINS), dtype=np.uint8)
+        self._last_id = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._video_ids)
+
+    def add(self, video_id: str, hash_value: int, palette: np.ndarray) -> bool:
+        """
+        Index (or re-index) one thumbnail.
+
+        Returns:
+            Whether a row was written; re-adding an unchanged thumbnail
+            doesn't replace its row (which every process would then reload)
+        """
+        palette = np.asarray(palette, dtype=np.uint8)
+        indexed_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        with self._lock:
+            self._sync()
+            position = self._positions.get(video_id)
+            if (position is not None and int(self._hashes[position]) == hash_value
+                    and np.array_equal(self._palettes[position], palette)):
+                return False
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO thumbnail_hashes (video_id, dhash, palette, indexed_at) '
+                    'VALUES (?, ?, ?, ?)',
+                    (video_id, _signed(hash_value), palette.tobytes(), indexed_at)
+                )
+            return True
+
+    def get(self, video_id: str) -> Optional[Tuple[int, np.ndarray]]:
+        """(dhash, palette vector) of an indexed thumbnail, or None."""
+        with self._lock:
+            self._sync()
+            position = self._positions.get(video_id)
+            if position is None:
+                return None
+            return int(self._hashes[position]), self._palettes[position].copy()
+
+    def _sync(self) -> None:
+        """Load rows added since the last sync; call with the lock held."""
+        rows = self._conn.execute(
+            'SELECT id, video_id, dhash, palette FROM thumbnail_hashes WHERE id > ? ORDER BY id', (self._last_id,)
+        ).fetchall()
+        if not rows:
+            return
+        hashes = np.array([row[2] for row in rows], dtype=np.int64).view(np.uint64)
+        palettes = np.frombuffer(b''.join(row[3] for row in rows), dtype=np.uint8).reshape(-1, PALETTE_BINS)
+
+        targets = np.empty(len(rows), dtype=np.intp)
+        for offset, (_, video_id, _, _) in enumerate(rows):
+            position = self._positions.get(video_id)
+            if position is None:
+                position = self._positions[video_id] = len(self._video_ids)
+                self._video_ids.append(video_id)
+            targets[offset] = position
+
+        # Grow the buffers geometrically so indexing one thumbnail at a time
+        # doesn't copy the whole index
+        if len(self._video_ids) > len(self._hashes):
+            capacity = max(len(self._video_ids), 2 * len(self._hashes), 1024)
+            hashes_buffer = np.zeros(capacity, dtype=np.uint64)
+            palettes_buffer = np.zeros((capacity, PALETTE_BINS), dtype=np.uint8)
+            hashes_buffer[:len(self._hashes)] = self._hashes
+            palettes_buffer[:len(self._palettes)] = self._palettes
+            self._hashes, self._palettes = hashes_buffer, palettes_buffer
+        self._hashes[targets] = hashes
+        self._palettes[targets] = palettes
+        self._last_id = rows[-1][0]
+
+    def query(self, hash_value: int, palette: Optional[np.ndarray] = None, k: int = 20,
+              exclude: Optional[str] = None, palette_weight: float = PALETTE_WEIGHT) -> List[Dict[str, Any]]:
+        """
+        The k indexed thumbnails most similar to a hash and palette.
+
+        Args:
+            hash_value: dHash of the query image
+            palette: palette_vector of the query image; None ranks by dHash only
+            k: Number of results
+            exclude: Video ID to leave out (usually the query's own)
+            palette_weight: Share of the score from palette distance, 0-1
+
+        Returns:
+            Dicts with 'video_id', 'hamming' (differing bits out of 64),
+            'palette_distance' (0-1) and 'score' (0 = identical), best first
+        """
+        with self._lock, span('similarity.query', k=k):
+            self._sync()
+            if not self._video_ids or k <= 0:
+                return []
+            distances = _popcount(self._hashes[:len(self._video_ids)] ^ np.uint64(hash_value)).astype(np.int16)
+            if exclude in self._positions:
+                distances[self._positions[exclude]] = HASH_BITS + 1
+
+            candidates = min(len(distances), k * CANDIDATES_PER_RESULT)
+            if candidates < len(distances):
+                nearest = np.argpartition(distances, candidates - 1)[:candidates]
+            else:
+                nearest = np.arange(len(distances))
+            nearest = nearest[distances[nearest] <= HASH_BITS]
+
+            hamming = distances[nearest].astype(np.float64)
+            if palette is None:
+                palette_distance = np.zeros(len(nearest))
+                palette_weight = 0.0
+            else:
+                delta = self._palettes[nearest].astype(np.int16) - np.asarray(palette, dtype=np.int16)
+                palette_distance = np.abs(delta).sum(axis=1) / (2 * 255)
+            scores = (1 - palette_weight) * hamming / HASH_BITS + palette_weight * palette_distance
+
+            order = np.argsort(scores, kind='stable')[:k]
+            return [
+                {
+                    'video_id': self._video_ids[nearest[i]],
+                    'hamming': int(hamming[i]),
+                    'palette_distance': float(palette_distance[i]),
+                    'score': float(scores[i]),
+                }
+                for i in order
+            ]
+
+
+_similarity_index = None
+_similarity_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """Return the process-wide similarity index, creating it on first use."""
+    global _similarity_index
+    if _similarity_index is None:
+        with _similarity_index_lock:
+            if _similarity_index is None:
+                _similarity_index = SimilarityIndex()
+    return _similarity_index
+
+
+def index_thumbnail(video_id: str, image, colors: Optional[Sequence[Tuple[np.ndarray, float]]] = None) -> bool:
+    """
+    Add a thumbnail to the similarity index, logging (not raising) failures.
+
+    Args:
+        video_id: YouTube video ID
+        image: Thumbnail as a PIL Image or AnalyzedImage; the 'colors'
+            entry of ANALYSIS_SIZES is plenty
+        colors: Its analyze_colors palette with PALETTE_COLORS colors, if
+            already computed
+
+    Returns:
+        Whether the thumbnail was indexed
+    """
+    try:
+        image = AnalyzedImage.wrap(image)
+        if colors is None:
+            colors = analyze_colors(image, PALETTE_COLORS)
+        get_similarity_index().add(video_id, dhash(image), palette_vector(colors))
+        return True
+    except Exception as e:
+        logging.error(f"Could not index thumbnail {video_id}: {str(e)}")
+        return False
+
+
+def find_similar(video_id: str, k: int = 20) -> List[Dict[str, Any]]:
+    """
+    The k indexed thumbnails most similar to an indexed video's thumbnail.
+
+    Returns:
+        See SimilarityIndex.query; empty if `video_id` isn't indexed
+    """
+    index = get_similarity_index()
+    entry = index.get(video_id)
+    if entry is None:
+        return []
+    hash_value, palette = entry
+    return index.query(hash_value, palette, k, exclude=video_id)
@@ -0,0 +1,119 @@
+# src/utils/singleflight.py
+
+import copy
+import threading
+from concurrent.futures import Future
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_groups: Dict[str, 'SingleFlight'] = {}
+_groups_lock = threading.Lock()
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one.
+
+    The first caller for a key runs the function; callers arriving with the
+    same key while it is still running wait for its result (or exception)
+    and get their own copy of it, so one caller modifying a DataFrame or
+    dict doesn't change what the others see. Nothing is cached once the
+    call completes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.collapsed = 0
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+            else:
+                self.collapsed += 1
+        if not owner:
+            return _copy_result(future.result())
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executed': self.calls - self.collapsed,
+                'collapsed': self.collapsed,
+                'in_flight': len(self._in_flight),
+            }
+
+
+def _copy_result(value: Any) -> Any:
+    """A waiter's copy of a shared result; DataFrames, arrays and images copy themselves."""
+    if isinstance(value, (dict, list, set, tuple)):
+        return copy.deepcopy(value)
+    if hasattr(value, 'copy') and not isinstance(value, (str, bytes, frozenset)):
+        return value.copy()
+    return value
+
+
+def get_group(name: str) -> SingleFlight:
+    """Return the process-wide single-flight group called `name`."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """Calls, executions and collapsed duplicates for every group."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats for group in groups}
+
+
+def _freeze(value) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def single_flight(name: Optional[str] = None, key: Optional[Callable[..., Hashable]] = None) -> Callable:
+    """
+    Decorator that collapses concurrent calls with the same arguments.
+
+    Args:
+        name: Group name used in singleflight_stats; defaults to the
+            function's qualified name
+        key: Builds the key from the call's arguments; defaults to the
+            arguments themselves (lists and dicts are frozen)
+    """
+    def decorator(func: Callable) -> Callable:
+        group = get_group(name or f"{func.__module__}.{func.__qualname__}")
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else (_freeze(args), _freeze(kwargs))
+            return group.do(call_key, func, *args, **kwargs)
+        wrapper.flight = group
+        return wrapper
+    return decorator
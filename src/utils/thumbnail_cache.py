@@ -0,0 +1,349 @@
+# src/utils/thumbnail_cache.py
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from PIL import Image
+
+from utils.env_loader import env_float, env_int, get_cache_dir
+from utils.tracing import count, span
+
+THUMBNAIL_URL = "https://i.ytimg.com/vi/{video_id}/{resolution}.jpg"
+THUMBNAIL_RESOLUTIONS = ('maxresdefault', 'hqdefault')
+# Video IDs end up in URLs and cache file names, so anything else is refused
+VIDEO_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{11}')
+
+DEFAULT_MEMORY_BYTES = env_int('THUMBNAIL_CACHE_MEMORY_MB', 128) * 1024 * 1024
+DEFAULT_MAX_AGE = env_int('THUMBNAIL_CACHE_MAX_AGE', 3600)
+# How long a 404 is remembered; videos rarely gain a maxres thumbnail later
+DEFAULT_MISSING_MAX_AGE = env_int('THUMBNAIL_CACHE_MISSING_MAX_AGE', 7 * 24 * 3600)
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Keep-alive connections kept open to the thumbnail host per process; batch
+# runs pull thousands of thumbnails from it
+HTTP_POOL_SIZE = env_int('THUMBNAIL_HTTP_POOL_SIZE', 16)
+# (connect, read) timeouts in seconds
+HTTP_TIMEOUT = (env_float('THUMBNAIL_CONNECT_TIMEOUT', 3.05),
+                env_float('THUMBNAIL_READ_TIMEOUT', 10.0))
+# Retries of connection errors and throttling/server errors, with
+# exponential backoff (0.5s, 1s, 2s...) that honours Retry-After
+HTTP_RETRIES = env_int('THUMBNAIL_HTTP_RETRIES', 3)
+HTTP_RETRY_BACKOFF = 0.5
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def make_http_session(pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES) -> requests.Session:
+    """
+    A requests Session with a bounded keep-alive pool and retry/backoff.
+
+    Retries give up with the last response rather than raising, so callers
+    see the final status code as usual.
+    """
+    retry = Retry(
+        total=retries, connect=retries, read=retries, status=retries,
+        backoff_factor=HTTP_RETRY_BACKOFF, status_forcelist=HTTP_RETRY_STATUSES,
+        respect_retry_after_header=True, raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def decode_image(data: bytes, size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """
+    Decode image bytes, optionally straight into a smaller size.
+
+    For JPEGs, draft mode lets libjpeg decode at 1/2, 1/4 or 1/8 scale, so
+    a 1280x720 thumbnail needed at 320x180 never materialises at full size.
+    The result is then shrunk to fit inside `size`, keeping its aspect ratio.
+
+    Args:
+        data: Encoded image
+        size: (width, height) box to fit into, or None for full resolution
+
+    Returns:
+        Loaded PIL Image
+    """
+    with span('thumbnail.decode', size=size):
+        image = Image.open(BytesIO(data))
+        if size is not None:
+            image.draft('RGB', size)
+            image.thumbnail(size, Image.BILINEAR)
+        image.load()
+    return image
+
+
+def _image_nbytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class ThumbnailCache:
+    """
+    Two-tier cache of decoded thumbnails keyed by (video_id, resolution).
+
+    The memory tier is an LRU of decoded PIL images, one per requested
+    decode size, bounded by their pixel buffer size. The disk tier stores
+    each JPEG once under its SHA-256 (so identical images share a blob)
+    plus a small JSON record per key with the ETag/Last-Modified
+    validators. Entries older than `max_age`
+    are revalidated with a conditional GET; a 304 just refreshes them.
+    A 404 is recorded too, so for `missing_max_age` a video without e.g. a
+    maxres thumbnail goes straight to the next resolution without a request.
+
+    Downloads share one keep-alive Session per process (see
+    make_http_session).
+
+    Images handed out are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_memory_bytes: int = DEFAULT_MEMORY_BYTES,
+                 max_age: int = DEFAULT_MAX_AGE, missing_max_age: int = DEFAULT_MISSING_MAX_AGE,
+                 session: Optional[requests.Session] = None):
+        self.cache_dir = cache_dir or get_cache_dir('thumbnails')
+        self.max_memory_bytes = max_memory_bytes
+        self.max_age = max_age
+        self.missing_max_age = missing_max_age
+        self._http_session = session
+        self._http_session_pid = os.getpid() if session is not None else None
+        self._memory: "OrderedDict[Tuple, Tuple[Image.Image, float]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(self.cache_dir, 'blobs'), exist_ok=True)
+        os.makedirs(os.path.join(self.cache_dir, 'index'), exist_ok=True)
+
+    # -- memory tier -------------------------------------------------------
+
+    def _memory_get(self, key) -> Optional[Tuple[Image.Image, float]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key, image: Image.Image, validated_at: float) -> None:
+        size = _image_nbytes(image)
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= _image_nbytes(old[0])
+            self._memory[key] = (image, validated_at)
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (evicted, _) = self._memory.popitem(last=False)
+                self._memory_bytes -= _image_nbytes(evicted)
+
+    def _memory_evict(self, video_id: str, resolution: str) -> None:
+        """Drop every decoded size of one thumbnail."""
+        with self._lock:
+            for key in [key for key in self._memory if key[:2] == (video_id, resolution)]:
+                image, _ = self._memory.pop(key)
+                self._memory_bytes -= _image_nbytes(image)
+
+    # -- disk tier ---------------------------------------------------------
+
+    def _index_path(self, video_id: str, resolution: str) -> str:
+        if not VIDEO_ID_PATTERN.fullmatch(video_id) or resolution not in THUMBNAIL_RESOLUTIONS:
+            raise ValueError(f"Invalid thumbnail key {video_id!r}/{resolution!r}")
+        return os.path.join(self.cache_dir, 'index', f"{video_id}_{resolution}.json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, 'blobs', digest[:2], f"{digest}.jpg")
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read_record(self, video_id: str, resolution: str) -> Optional[Dict]:
+        try:
+            with open(self._index_path(video_id, resolution)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_record(self, video_id: str, resolution: str, record: Dict) -> None:
+        self._atomic_write(self._index_path(video_id, resolution), json.dumps(record).encode())
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_blob(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            self._atomic_write(path, data)
+        return digest
+
+    # -- network -----------------------------------------------------------
+
+    def _session(self) -> requests.Session:
+        # Pooled sockets must not be shared with forked batch workers, so a
+        # child process opens its own session
+        if self._http_session is None or self._http_session_pid != os.getpid():
+            with self._lock:
+                if self._http_session is None or self._http_session_pid != os.getpid():
+                    self._http_session = make_http_session()
+                    self._http_session_pid = os.getpid()
+        return self._http_session
+
+    def _fetch(self, video_id: str, resolution: str, record: Optional[Dict]) -> requests.Response:
+        headers = {}
+        if record:
+            if record.get('etag'):
+                headers['If-None-Match'] = record['etag']
+            if record.get('last_modified'):
+                headers['If-Modified-Since'] = record['last_modified']
+        url = THUMBNAIL_URL.format(video_id=video_id, resolution=resolution)
+        response = self._session().get(url, headers=headers, stream=True, timeout=HTTP_TIMEOUT)
+        retries = getattr(response.raw, 'retries', None)
+        if retries is not None and retries.history:
+            count('http_retries', len(retries.history), source='thumbnail')
+        return response
+
+    # -- public API --------------------------------------------------------
+
+    @staticmethod
+    def _read_stream(response: requests.Response) -> bytes:
+        # One join into the final bytes; BytesIO and hashlib then use them
+        # without further copies
+        return b''.join(response.iter_content(chunk_size=STREAM_CHUNK_BYTES))
+
+    def get(self, video_id: str, resolution: str, size: Optional[Tuple[int, int]] = None) -> Optional[Image.Image]:
+        """
+        Return the decoded thumbnail, fetching or revalidating it if needed.
+
+        Args:
+            video_id: YouTube video ID
+            resolution: Thumbnail name such as 'maxresdefault' or 'hqdefault'
+            size: Optional (width, height) box to decode into; see decode_image
+
+        Returns:
+            PIL Image, or None if YouTube has no thumbnail at this resolution
+
+        Raises:
+            ValueError: If video_id isn't an 11-character YouTube video ID
+                or resolution isn't one of THUMBNAIL_RESOLUTIONS
+        """
+        if not isinstance(video_id, str) or not VIDEO_ID_PATTERN.fullmatch(video_id):
+            raise ValueError(f"Invalid YouTube video ID {video_id!r}")
+        if resolution not in THUMBNAIL_RESOLUTIONS:
+            raise ValueError(f"Unknown thumbnail resolution {resolution!r}")
+        key = (video_id, resolution, size)
+        now = time.time()
+
+        entry = self._memory_get(key)
+        if entry is not None and now - entry[1] < self.max_age:
+            count('thumbnail_cache', result='memory_hit')
+            return entry[0]
+
+        record = self._read_record(video_id, resolution)
+        if record and record.get('missing'):
+            if now - record['validated_at'] < self.missing_max_age:
+                count('thumbnail_cache', result='known_missing')
+                return None
+            record = None
+        data = self._read_blob(record['sha256']) if record else None
+        if data is None:
+            record = None
+        elif now - record['validated_at'] < self.max_age:
+            count('thumbnail_cache', result='disk_hit')
+            image = entry[0] if entry is not None else decode_image(data, size)
+            self._memory_put(key, image, record['validated_at'])
+            return image
+
+        try:
+            with span('thumbnail.request', resolution=resolution, conditional=data is not None):
+                response = self._fetch(video_id, resolution, record)
+        except requests.RequestException as e:
+            if data is None:
+                raise
+            logging.warning(f"Thumbnail revalidation failed for {video_id}, serving stale copy: {str(e)}")
+            count('thumbnail_cache', result='stale')
+            return entry[0] if entry is not None else decode_image(data, size)
+
+        with response:
+            if response.status_code in (304, 404):
+                # Read the (empty) body so closing the response hands the
+                # connection back to the pool instead of dropping it
+                response.content
+            if response.status_code == 304 and data is not None:
+                count('thumbnail_cache', result='not_modified')
+                record['validated_at'] = now
+                self._write_record(video_id, resolution, record)
+                image = entry[0] if entry is not None else decode_image(data, size)
+                self._memory_put(key, image, now)
+                return image
+
+            if response.status_code == 404:
+                count('thumbnail_cache', result='not_found')
+                self._write_record(video_id, resolution, {'missing': True, 'validated_at': now})
+                return None
+            response.raise_for_status()
+            with span('thumbnail.download', resolution=resolution) as download:
+                data = self._read_stream(response)
+                download.set('bytes', len(data))
+        count('thumbnail_cache', result='downloaded')
+        count('bytes_downloaded', len(data), source='thumbnail')
+
+        digest = self._write_blob(data)
+        if record is None or record['sha256'] != digest:
+            # Sizes decoded from the old image must not be served (or
+            # revalidated against the new ETag) any more
+            self._memory_evict(video_id, resolution)
+        record = {
+            'sha256': digest,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'validated_at': now,
+        }
+        self._write_record(video_id, resolution, record)
+        image = decode_image(data, size)
+        self._memory_put(key, image, now)
+        return image
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._memory), 'memory_bytes': self._memory_bytes}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Return the process-wide thumbnail cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ThumbnailCache()
+    return _cache
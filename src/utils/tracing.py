@@ -0,0 +1,262 @@
+# src/utils/tracing.py
+
+import os
+import json
+import time
+import itertools
+import threading
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.env_loader import env_int
+
+# Finished spans kept for the process-wide JSON trace
+RECENT_SPANS = env_int('TRACE_RECENT_SPANS', 2000)
+METRIC_PREFIX = 'yt_thumbs'
+
+_span_ids = itertools.count(1)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('trace_current_span', default=None)
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('trace_collector', default=None)
+
+
+@dataclass
+class Span:
+    """One timed stage: wall and CPU time, free-form attributes and the error if it failed."""
+    name: str
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    span_id: int = field(default_factory=lambda: next(_span_ids))
+    parent_id: Optional[int] = None
+    thread: str = ''
+    started_at: float = 0.0
+    seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name, 'span_id': self.span_id, 'parent_id': self.parent_id,
+            'thread': self.thread, 'started_at': self.started_at, 'seconds': self.seconds,
+            'cpu_seconds': self.cpu_seconds, 'error': self.error, **self.attributes,
+        }
+
+
+class Tracer:
+    """
+    Process-wide sink for spans and counters.
+
+    Spans are aggregated per name (calls, errors, wall and CPU seconds) for
+    the Prometheus export, and the most recent ones are kept for the JSON
+    trace. Counters carry labels, e.g. cache hits per tier or bytes
+    downloaded per source.
+    """
+
+    def __init__(self, recent: int = RECENT_SPANS):
+        self._lock = threading.Lock()
+        self._recent: deque = deque(maxlen=recent)
+        self._stages: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {'calls': 0, 'errors': 0, 'seconds': 0.0, 'cpu_seconds': 0.0})
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self._recent.append(span)
+            stage = self._stages[span.name]
+            stage['calls'] += 1
+            stage['errors'] += span.error is not None
+            stage['seconds'] += span.seconds
+            stage['cpu_seconds'] += span.cpu_seconds
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def recent_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._recent)
+
+    def stage_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stages.items()}
+
+    def counters(self) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._stages.clear()
+            self._counters.clear()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _tracer
+
+
+class Trace:
+    """Spans and counters recorded inside one collect_trace() block (e.g. one page render)."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def _add_span(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def _add_count(self, name: str, value: float, labels: Dict[str, Any]) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+
+@contextmanager
+def collect_trace():
+    """
+    Collect every span and counter recorded in this context into a Trace.
+
+    Work handed to other threads is included when it runs in a copy of this
+    context (see run_in_context).
+    """
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def run_in_context(func: Callable) -> Callable:
+    """Bind `func` to a copy of the current context, so spans it records in a worker thread join this trace."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a stage.
+
+    Records wall time, the calling thread's CPU time, the attributes (more
+    can be added with span.set) and the exception message if the block
+    raises; the exception itself propagates.
+
+    Args:
+        name: Stage name, dotted by area, e.g. 'fetch.details' or 'analysis.text'
+        **attributes: Extra fields stored with the span
+    """
+    parent = _current_span.get()
+    current = Span(name, attributes, parent_id=parent.span_id if parent else None,
+                   thread=threading.current_thread().name, started_at=time.time())
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.seconds = time.perf_counter() - start
+        current.cpu_seconds = time.thread_time() - cpu_start
+        _current_span.reset(token)
+        _tracer.record(current)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace._add_span(current)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator that runs the function inside span(name); defaults to the function's qualified name."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    """Add to a labelled counter, e.g. count('cache', tier='memory', result='hit')."""
+    _tracer.count(name, value, **labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace._add_count(name, value, labels)
+
+
+# -- export ----------------------------------------------------------------
+
+def _prometheus_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        f'{key}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def prometheus_text(tracer: Optional[Tracer] = None) -> str:
+    """
+    Stage totals and counters in the Prometheus text exposition format.
+
+    Stages become yt_thumbs_stage_{calls,errors,seconds,cpu_seconds}_total
+    labelled by stage; each counter becomes yt_thumbs_<name>_total.
+    """
+    tracer = tracer or _tracer
+    lines = []
+    stages = tracer.stage_stats()
+    for metric, help_text in (('calls', 'Stage executions'), ('errors', 'Stage executions that raised'),
+                              ('seconds', 'Wall-clock seconds spent in the stage'),
+                              ('cpu_seconds', 'CPU seconds spent in the stage by its thread')):
+        full_name = f'{METRIC_PREFIX}_stage_{metric}_total'
+        lines.append(f'# HELP {full_name} {help_text}')
+        lines.append(f'# TYPE {full_name} counter')
+        for stage, stats in sorted(stages.items()):
+            lines.append(f'{full_name}{_prometheus_labels((("stage", stage),))} {stats[metric]:g}')
+
+    by_name: Dict[str, List] = defaultdict(list)
+    for (name, labels), value in tracer.counters().items():
+        by_name[name].append((labels, value))
+    for name, series in sorted(by_name.items()):
+        full_name = f'{METRIC_PREFIX}_{name}_total'
+        lines.append(f'# TYPE {full_name} counter')
+        for labels, value in sorted(series):
+            lines.append(f'{full_name}{_prometheus_labels(labels)} {value:g}')
+    return '\n'.join(lines) + '\n'
+
+
+def trace_json(spans: Optional[List[Span]] = None) -> str:
+    """
+    Spans as a Chrome trace (open in chrome://tracing or ui.perfetto.dev).
+
+    Args:
+        spans: Spans to export; defaults to the tracer's recent spans
+    """
+    spans = _tracer.recent_spans() if spans is None else spans
+    pid = os.getpid()
+    events = [
+        {
+            'name': s.name, 'ph': 'X', 'pid': pid, 'tid': s.thread,
+            'ts': s.started_at * 1e6, 'dur': s.seconds * 1e6,
+            'args': {'cpu_ms': s.cpu_seconds * 1000, 'error': s.error, **s.attributes},
+        }
+        for s in spans
+    ]
+    return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}, default=str)
@@ -1,13 +1,14 @@
 import re
-import requests
-from PIL import Image
-from io import BytesIO
+import logging
 import pandas as pd
-from typing import List, Dict
-from googleapiclient.discovery import build
+from typing import List, Dict, Optional, Tuple
 from googleapiclient.errors import HttpError
 import isodate
 from datetime import datetime,timezone
+from utils.youtube_client import execute, get_youtube_client, list_videos, list_channels
+from utils.thumbnail_cache import get_thumbnail_cache, THUMBNAIL_RESOLUTIONS
+from utils.singleflight import single_flight
+from utils.metrics import calculate_metrics_frame
 
 def extract_video_id(url):
     patterns = [
@@ -22,18 +23,34 @@ def extract_video_id(url):
             return match.group(1)
     return None
 
-def get_thumbnail(video_id):
-    url = f"http://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
-    response = requests.get(url)
-    if response.status_code == 404:
-        url = f"http://img.youtube.com/vi/{video_id}/hqdefault.jpg"
-        response = requests.get(url)
-    return Image.open(BytesIO(response.content))
+@single_flight('youtube.get_thumbnail')
+def get_thumbnail(video_id, size: Optional[Tuple[int, int]] = None):
+    """
+    Get the best available thumbnail for a video from the shared thumbnail cache.
+
+    Args:
+        video_id: YouTube video ID
+        size: Optional (width, height) box to decode into, e.g. an entry of
+            utils.image_analysis.ANALYSIS_SIZES; None decodes at full resolution
+    """
+    cache = get_thumbnail_cache()
+    for resolution in THUMBNAIL_RESOLUTIONS:
+        image = cache.get(video_id, resolution, size)
+        if image is not None:
+            return image
+    raise ValueError(f"No thumbnail available for video {video_id}")
 
 def calculate_video_metrics(video_data):
+    """
+    Engagement metrics for one video's details; see utils.metrics.calculate_metrics_frame.
+
+    Returns:
+        Copy of video_data with the metrics and a 'performance' dict of
+        grades added, or None if fields are missing or views/subscribers are zero
+    """
     try:
         # Validate required fields
-        required_fields = ['like_count', 'view_count', 'comment_count', 'subscriber_count', 'published_date']
+        required_fields = ['like_count', 'view_count', 'comment_count', 'subscriber_count', 'published_at']
         if not all(field in video_data for field in required_fields):
             raise KeyError("Missing required fields in video_data")
             
@@ -41,111 +58,118 @@ def calculate_video_metrics(video_data):
         if video_data['view_count'] == 0 or video_data['subscriber_count'] == 0:
             raise ValueError("View count or subscriber count cannot be zero")
 
-        metrics = video_data.copy()  # Create a copy instead of direct reference
-        
-        # Calculate base metrics
-        metrics.update({
-            'like_ratio': (video_data['like_count'] / video_data['view_count']) * 100,
-            'comment_ratio': (video_data['comment_count'] / video_data['view_count']) * 100,
-            'sub_conversion': (video_data['view_count'] / video_data['subscriber_count']) * 100,
-            'view_velocity': video_data['view_count'] / ((datetime.now() - datetime.strptime(video_data['published_date'], '%B %d, %Y')).days or 1)
-        })
+        row = calculate_metrics_frame(pd.DataFrame([{field: video_data[field] for field in required_fields}])).iloc[0]
 
-        # Calculate derived metrics
+        metrics = video_data.copy()  # Create a copy instead of direct reference
         metrics.update({
-            'engagement_score': min((metrics['like_ratio'] * 20) + (metrics['comment_ratio'] * 30) + (metrics['sub_conversion'] * 0.3), 100),
-            'performance': {
-                'like_ratio': 'Good' if metrics['like_ratio'] > 4 else 'Average' if metrics['like_ratio'] > 1 else 'Poor',
-                'comment_ratio': 'Good' if metrics['comment_ratio'] > 0.5 else 'Average' if metrics['comment_ratio'] > 0.1 else 'Poor'
-            }
+            name: float(row[name])
+            for name in ('like_ratio', 'comment_ratio', 'sub_conversion', 'view_velocity', 'engagement_score')
         })
-        
+        metrics['performance'] = {
+            'like_ratio': row['like_grade'],
+            'comment_ratio': row['comment_grade']
+        }
         return metrics
         
     except Exception as e:
         print(f"Error calculating metrics: {str(e)}")
         return None
-            
 
-def get_video_details(video_id: str, api_key: str) -> Dict:
+def _parse_video_details(video_data: Dict, channel_data: Dict) -> Dict:
+    snippet = video_data['snippet']
+    statistics = video_data['statistics']
+    
+    # Parse duration and date
+    duration = isodate.parse_duration(video_data['contentDetails']['duration'])
+    published_date = datetime.strptime(snippet['publishedAt'], "%Y-%m-%dT%H:%M:%SZ")
+    
+    return {
+        'title': snippet['title'],
+        'description': snippet['description'],
+        'published_date': published_date.strftime("%B %d, %Y"),
+        'published_at': snippet['publishedAt'],
+        'duration': str(duration).split('.')[0],
+        'view_count': int(statistics.get('viewCount', 0)),
+        'like_count': int(statistics.get('likeCount', 0)),
+        'comment_count': int(statistics.get('commentCount', 0)),
+        'thumbnail_url': snippet['thumbnails'].get('maxres', 
+                       snippet['thumbnails'].get('high', 
+                       snippet['thumbnails'].get('default')))['url'],
+        'channel_name': snippet['channelTitle'],
+        'channel_id': snippet['channelId'],
+        'channel_thumbnail': channel_data['snippet']['thumbnails']['default']['url'],
+        'subscriber_count': int(channel_data['statistics'].get('subscriberCount', 0)),
+        'tags': snippet.get('tags', []),
+        'category_id': snippet.get('categoryId'),
+        'is_live': snippet.get('liveBroadcastContent') == 'live'
+    }
+
+
+@single_flight('youtube.get_videos_details')
+def get_videos_details(video_ids: List[str], api_key: str) -> Dict[str, Dict]:
     """
-    Get comprehensive video details using YouTube API.
+    Get comprehensive details for many videos in batched API calls.
+    
+    Uses one videos.list call per 50 videos and one channels.list call per
+    50 distinct channels, instead of two calls per video.
+    
+    Returns:
+        Mapping of video ID to details; unknown videos are left out
+
+    Raises:
+        HttpError: For API errors other than 404
+        BatchRequestError: If some of the batched calls failed; its
+            `failed` lists the affected IDs
     """
-    youtube = build('youtube', 'v3', developerKey=api_key)
+    youtube = get_youtube_client(api_key)
     
     try:
-        video_response = youtube.videos().list(
-            part="snippet,statistics,contentDetails",
-            id=video_id
-        ).execute()
-        
-        if not video_response.get('items'):
-            return None
-            
-        video_data = video_response['items'][0]
-        snippet = video_data['snippet']
-        statistics = video_data['statistics']
-        
-        # Get channel info
-        channel_response = youtube.channels().list(
-            part="snippet,statistics",
-            id=snippet['channelId']
-        ).execute()
-        channel_data = channel_response['items'][0]
-        
-        # Parse duration and date
-        duration = isodate.parse_duration(video_data['contentDetails']['duration'])
-        published_date = datetime.strptime(snippet['publishedAt'], "%Y-%m-%dT%H:%M:%SZ")
+        videos = list_videos(youtube, video_ids, part="snippet,statistics,contentDetails")
+        channels = list_channels(youtube, (v['snippet']['channelId'] for v in videos.values()))
         
         return {
-            'title': snippet['title'],
-            'description': snippet['description'],
-            'published_date': published_date.strftime("%B %d, %Y"),
-            'duration': str(duration).split('.')[0],
-            'view_count': int(statistics.get('viewCount', 0)),
-            'like_count': int(statistics.get('likeCount', 0)),
-            'comment_count': int(statistics.get('commentCount', 0)),
-            'thumbnail_url': snippet['thumbnails'].get('maxres', 
-                           snippet['thumbnails'].get('high', 
-                           snippet['thumbnails'].get('default')))['url'],
-            'channel_name': snippet['channelTitle'],
-            'channel_id': snippet['channelId'],
-            'channel_thumbnail': channel_data['snippet']['thumbnails']['default']['url'],
-            'subscriber_count': int(channel_data['statistics'].get('subscriberCount', 0)),
-            'tags': snippet.get('tags', []),
-            'category_id': snippet.get('categoryId'),
-            'is_live': snippet.get('liveBroadcastContent') == 'live'
+            video_id: _parse_video_details(video_data, channels[video_data['snippet']['channelId']])
+            for video_id, video_data in videos.items()
+            if video_data['snippet']['channelId'] in channels
         }
         
     except HttpError as e:
-        print(f"YouTube API error: {e}")
-        return None
+        if e.resp.status != 404:
+            raise
+        logging.warning(f"YouTube API returned 404 for videos {video_ids}: {str(e)}")
+        return {}
 
 
-def get_video_stats(channel_id, api_key):
-   youtube = build('youtube', 'v3', developerKey=api_key)
+def get_video_details(video_id: str, api_key: str) -> Dict:
+    """
+    Get comprehensive video details using YouTube API.
+    """
+    return get_videos_details([video_id], api_key).get(video_id)
+
+
+@single_flight('youtube.get_video_stats')
+def get_video_stats(channel_id, api_key, max_results=5):
+   youtube = get_youtube_client(api_key)
    videos_request = youtube.search().list(
     part='snippet',
     channelId=channel_id,
     order='date',
-    maxResults=5
+    type='video',
+    maxResults=max_results
     )
-   videos_response = videos_request.execute()
-   st.write(videos_response)
+   videos_response = execute(videos_request)
+   
+   # Get stats for all videos in one batched call
+   video_ids = [video['id']['videoId'] for video in videos_response['items']]
+   stats_by_id = list_videos(youtube, video_ids, part='statistics')
    
-   # Get stats for each video
    video_stats = []
    for video in videos_response['items']:
-       video_id = video['id']['videoId']
-       stats_request = youtube.videos().list(
-           part='statistics',
-           id=video_id
-       )
-       stats_response = stats_request.execute()
-       
-       if stats_response['items']:
-           stats = stats_response['items'][0]['statistics']
+       item = stats_by_id.get(video['id']['videoId'])
+       if item:
+           stats = item['statistics']
            video_stats.append({
+               'video_id': video['id']['videoId'],
                'title': video['snippet']['title'],
                'published_at': video['snippet']['publishedAt'],
                'views': int(stats.get('viewCount', 0)),
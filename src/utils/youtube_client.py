@@ -0,0 +1,182 @@
+# src/utils/youtube_client.py
+
+import os
+import threading
+import logging
+from typing import Dict, Iterable, Iterator, List
+
+from googleapiclient.discovery import build
+from googleapiclient.http import BatchHttpRequest
+
+from utils.quota import QuotaExceededError, get_scheduler, request_key
+
+# The Data API accepts at most 50 IDs per list call
+MAX_IDS_PER_REQUEST = 50
+# Google recommends keeping batch HTTP requests to 50 calls or fewer
+MAX_CALLS_PER_BATCH = 50
+# Point the client at another server, e.g. a local fake API in tests
+API_ENDPOINT = os.getenv('YOUTUBE_API_ENDPOINT')
+
+_local = threading.local()
+
+
+class BatchRequestError(Exception):
+    """Some calls made through execute_batch failed."""
+
+    def __init__(self, failed: Dict[str, Exception], responses: Dict[str, Dict]):
+        first_id, first_error = next(iter(failed.items()))
+        super().__init__(f"{len(failed)} of {len(failed) + len(responses)} batched calls failed "
+                         f"({first_id}: {first_error})")
+        # Request ID -> exception of every failed call
+        self.failed = failed
+        # Responses of the calls that succeeded
+        self.responses = responses
+
+
+def get_youtube_client(api_key: str):
+    """
+    Return a YouTube Data API client for `api_key`, building it once per thread.
+
+    Discovery clients aren't thread-safe (they share an httplib2 connection),
+    so each thread keeps its own, but never rebuilds it.
+    """
+    clients = getattr(_local, 'clients', None)
+    if clients is None:
+        clients = _local.clients = {}
+    if api_key not in clients:
+        client_options = {'api_endpoint': API_ENDPOINT} if API_ENDPOINT else None
+        clients[api_key] = build('youtube', 'v3', developerKey=api_key, cache_discovery=False,
+                                 client_options=client_options)
+    return clients[api_key]
+
+
+def execute(request, priority=None):
+    """
+    Execute an API request through the quota scheduler.
+
+    Args:
+        request: Unexecuted request, e.g. youtube.videos().list(...)
+        priority: quota.INTERACTIVE or quota.BACKGROUND; defaults to the
+            current context (see quota.background_priority)
+    """
+    return get_scheduler().execute(request, priority)
+
+
+def chunked(items: Iterable[str], size: int = MAX_IDS_PER_REQUEST) -> Iterator[List[str]]:
+    """Yield consecutive lists of at most `size` unique items, keeping order."""
+    chunk = []
+    for item in dict.fromkeys(items):
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def execute_batch(youtube, requests: Dict[str, object]) -> Dict[str, Dict]:
+    """
+    Execute several API requests in as few batch HTTP round trips as possible.
+
+    Args:
+        youtube: Client from get_youtube_client
+        requests: Mapping of caller-chosen ID to an unexecuted API request
+
+    Returns:
+        Mapping of the same IDs to their responses
+
+    Raises:
+        BatchRequestError: After running every batch, if any call failed;
+            it carries the failed IDs and the other calls' responses. Calls
+            refused for quota fail with QuotaExceededError, and a
+            quotaExceeded response pauses the key like execute does
+    """
+    responses = {}
+    failed = {}
+    scheduler = get_scheduler()
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            exception = scheduler.api_error(request_key(requests[request_id]), exception)
+            logging.error(f"YouTube API batch call {request_id} failed: {exception}")
+            failed[request_id] = exception
+        else:
+            responses[request_id] = response
+
+    request_ids = list(requests)
+    for start in range(0, len(request_ids), MAX_CALLS_PER_BATCH):
+        chunk_ids = request_ids[start:start + MAX_CALLS_PER_BATCH]
+        batch = _new_batch(youtube, on_response)
+        for request_id in chunk_ids:
+            batch.add(requests[request_id], request_id=request_id)
+        try:
+            scheduler.execute_batch(batch, [requests[request_id] for request_id in chunk_ids])
+        except QuotaExceededError as e:
+            # Out of quota before (or while) sending: the calls that didn't run fail with it
+            for request_id in chunk_ids:
+                if request_id not in responses:
+                    failed.setdefault(request_id, e)
+    if failed:
+        raise BatchRequestError(failed, responses)
+    return responses
+
+
+def _new_batch(youtube, callback) -> BatchHttpRequest:
+    # The client builds its batch URI from the discovery document's rootUrl,
+    # ignoring api_endpoint, so point it at the override explicitly
+    if API_ENDPOINT:
+        return BatchHttpRequest(callback=callback, batch_uri=f"{API_ENDPOINT.rstrip('/')}/batch")
+    return youtube.new_batch_http_request(callback=callback)
+
+
+def _list_by_id(resource, ids: Iterable[str], part: str, youtube) -> Dict[str, Dict]:
+    chunks = list(chunked(ids))
+    if not chunks:
+        return {}
+    if len(chunks) == 1:
+        responses = {'0': execute(resource.list(part=part, id=','.join(chunks[0])))}
+    else:
+        try:
+            responses = execute_batch(youtube, {
+                str(i): resource.list(part=part, id=','.join(chunk)) for i, chunk in enumerate(chunks)
+            })
+        except BatchRequestError as e:
+            # Report the resource IDs whose chunk failed, with the items that did arrive
+            raise BatchRequestError(
+                {item_id: error for request_id, error in e.failed.items() for item_id in chunks[int(request_id)]},
+                _items_by_id(e.responses)
+            ) from e
+    return _items_by_id(responses)
+
+
+def _items_by_id(responses: Dict[str, Dict]) -> Dict[str, Dict]:
+    return {item['id']: item for response in responses.values() for item in response.get('items', [])}
+
+
+def list_videos(youtube, video_ids: Iterable[str], part: str = 'snippet,statistics') -> Dict[str, Dict]:
+    """
+    Fetch video resources with one videos.list call per 50 IDs.
+
+    Returns:
+        Mapping of video ID to API item; IDs the API doesn't know are missing
+
+    Raises:
+        BatchRequestError: If some of the calls failed; `failed` maps each
+            video ID of the failed calls to its error and `responses` holds
+            the items that were fetched
+    """
+    return _list_by_id(youtube.videos(), video_ids, part, youtube)
+
+
+def list_channels(youtube, channel_ids: Iterable[str], part: str = 'snippet,statistics') -> Dict[str, Dict]:
+    """
+    Fetch channel resources with one channels.list call per 50 IDs.
+
+    Returns:
+        Mapping of channel ID to API item; IDs the API doesn't know are missing
+
+    Raises:
+        BatchRequestError: As for list_videos
+    """
+    return _list_by_id(youtube.channels(), channel_ids, part, youtube)
+
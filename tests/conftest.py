@@ -0,0 +1,13 @@
+# tests/conftest.py
+
+import os
+import sys
+import tempfile
+
+# The app imports its modules from src/ (streamlit runs from there)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+# Keep the SQLite database and the thumbnail/disk caches out of ~/.cache
+_cache_root = tempfile.mkdtemp(prefix='yt-thumbs-tests-')
+os.environ.setdefault('YT_THUMBS_CACHE_DIR', _cache_root)
+os.environ.setdefault('YT_THUMBS_DB', os.path.join(_cache_root, 'data.sqlite3'))
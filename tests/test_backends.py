@@ -0,0 +1,40 @@
+# tests/test_backends.py
+
+import builtins
+import importlib
+
+import pytest
+
+from utils import backends
+
+
+@pytest.fixture
+def module_dir(tmp_path, monkeypatch):
+    for name in ('timed_by_statement', 'timed_by_importlib', 'untimed_module'):
+        (tmp_path / f'{name}.py').write_text('VALUE = 1\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path
+    backends.stop_import_timer()
+
+
+def test_import_timer_is_off_without_debug(module_dir, monkeypatch):
+    monkeypatch.delenv('YT_THUMBS_DEBUG', raising=False)
+    backends.start_import_timer()
+    assert builtins.__import__ is backends._original_import
+    assert importlib.import_module is backends._original_import_module
+
+
+def test_import_timer_records_startup_imports_then_restores(module_dir, monkeypatch):
+    monkeypatch.setenv('YT_THUMBS_DEBUG', '1')
+    backends.start_import_timer()
+    import timed_by_statement  # noqa: F401
+    importlib.import_module('timed_by_importlib')
+    backends.stop_import_timer()
+
+    assert builtins.__import__ is backends._original_import
+    assert importlib.import_module is backends._original_import_module
+    import untimed_module  # noqa: F401
+
+    recorded = {row['module'] for row in backends.import_report(limit=1000)}
+    assert {'timed_by_statement', 'timed_by_importlib'} <= recorded
+    assert 'untimed_module' not in recorded
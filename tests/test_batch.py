@@ -0,0 +1,111 @@
+# tests/test_batch.py
+
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pytest
+from PIL import Image
+
+import utils.image_analysis as image_analysis
+import utils.youtube as youtube
+from utils.batch import run_batch
+
+
+def _fake_thumbnail(video_id, size=None):
+    # Distinct pixels per video, so no analysis cache entry is shared between tests
+    seed = sum(ord(c) * 31 ** i for i, c in enumerate(video_id)) % 2 ** 32
+    pixels = np.random.default_rng(seed).integers(0, 256, (180, 320, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels)
+    if size is not None:
+        image.thumbnail(size)
+    return image
+
+
+class _BrokenPool:
+    @contextmanager
+    def engine(self):
+        raise ModuleNotFoundError("No module named 'easyocr'")
+        yield
+
+
+class _Reader:
+    def detect(self, image, **kwargs):
+        return [[[0, 80, 0, 40]]], [[]]
+
+    def recognize(self, image, horizontal_list, free_list):
+        return [([[0, 0], [80, 0], [80, 40], [0, 40]], 'HELLO', 0.9)]
+
+
+class _WorkingPool:
+    @contextmanager
+    def engine(self):
+        yield _Reader()
+
+
+@pytest.fixture(autouse=True)
+def fake_thumbnails(monkeypatch):
+    monkeypatch.setattr(youtube, 'get_thumbnail', _fake_thumbnail)
+
+
+def test_failed_ocr_marks_row_error_and_is_retried(tmp_path, monkeypatch):
+    output = str(tmp_path / 'out.csv')
+
+    monkeypatch.setattr(image_analysis, 'get_ocr_pool', lambda: _BrokenPool())
+    counts = run_batch(['ocrfail0001'], output, workers=1)
+    assert counts == {'ok': 0, 'error': 1, 'skipped': 0}
+    row = pd.read_csv(output).iloc[-1]
+    assert row['status'] == 'error'
+    assert 'easyocr' in row['error']
+
+    monkeypatch.setattr(image_analysis, 'get_ocr_pool', lambda: _WorkingPool())
+    counts = run_batch(['ocrfail0001'], output, workers=1)
+    assert counts == {'ok': 1, 'error': 0, 'skipped': 0}
+    rows = pd.read_csv(output)
+    # The retry replaces the failed row rather than adding a second one
+    assert list(rows['video_id']) == ['ocrfail0001']
+    assert rows.iloc[0]['status'] == 'ok'
+    assert rows.iloc[0]['text'] == 'HELLO'
+
+    counts = run_batch(['ocrfail0001'], output, workers=1)
+    assert counts == {'ok': 0, 'error': 0, 'skipped': 1}
+
+
+def test_parquet_output_merges_on_resume_and_is_replaced_without(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_analysis, 'get_ocr_pool', lambda: _WorkingPool())
+    output = str(tmp_path / 'out.parquet')
+
+    run_batch(['parquet0001', 'parquet0002'], output, workers=1)
+    run_batch(['parquet0002', 'parquet0003'], output, workers=1)
+    assert sorted(pd.read_parquet(output)['video_id']) == ['parquet0001', 'parquet0002', 'parquet0003']
+
+    counts = run_batch(['parquet0003'], output, workers=1, resume=False)
+    assert counts == {'ok': 1, 'error': 0, 'skipped': 0}
+    assert list(pd.read_parquet(output)['video_id']) == ['parquet0003']
+
+
+def test_single_video_runs_in_process(monkeypatch):
+    import utils.batch as batch
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a process pool was started for one video")
+
+    monkeypatch.setattr(image_analysis, 'get_ocr_pool', lambda: _WorkingPool())
+    monkeypatch.setattr(batch, 'ProcessPoolExecutor', no_pool)
+    rows = list(batch.analyze_many(['single00001'], workers=8))
+    assert [row['status'] for row in rows] == ['ok']
+
+
+def test_analyze_videos_keeps_analyses_when_details_fail(monkeypatch):
+    import utils.api as api
+    from utils.youtube_client import BatchRequestError
+
+    def failing_details(video_ids, api_key):
+        raise BatchRequestError({'videos.list': RuntimeError('backendError')}, {})
+
+    monkeypatch.setattr(image_analysis, 'get_ocr_pool', lambda: _WorkingPool())
+    monkeypatch.setattr(api, 'get_videos_details', failing_details)
+    frame = api.analyze_videos(['details0001'], api_key='key', workers=1)
+    assert list(frame['video_id']) == ['details0001']
+    assert list(frame['status']) == ['ok']
+    assert not set(api.DETAIL_COLUMNS) & set(frame.columns)
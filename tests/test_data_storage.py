@@ -0,0 +1,124 @@
+# tests/test_data_storage.py
+
+import json
+import pickle
+import subprocess
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cli import build_parser
+from utils.data_storage import AnalysisResultCache, MetricsStore, _range_bounds
+
+
+def test_range_bounds_cover_the_whole_end_day():
+    assert _range_bounds(date(2024, 1, 1), date(2024, 1, 31)) == ('2024-01-01T00:00:00Z', '2024-02-01T00:00:00Z')
+    # A date-only string is the same inclusive day, not midnight
+    assert _range_bounds('2024-01-01', '2024-01-31') == ('2024-01-01T00:00:00Z', '2024-02-01T00:00:00Z')
+    # Timestamps are exact bounds
+    assert _range_bounds(None, datetime(2024, 1, 31, 12)) == ('0000', '2024-01-31T12:00:00Z')
+    assert _range_bounds(None, '2024-01-31T12:00:00Z') == ('0000', '2024-01-31T12:00:00Z')
+    assert _range_bounds(None, None) == ('0000', '9999')
+
+
+def test_cli_dates_include_the_end_day(tmp_path):
+    args = build_parser().parse_args(['channel', 'UCxxxxxxxxxxxxxxxxxxxxxx', '--start', '2024-01-01',
+                                      '--end', '2024-01-31', '--no-sync'])
+    assert (args.start, args.end) == (date(2024, 1, 1), date(2024, 1, 31))
+
+    store = MetricsStore(str(tmp_path / 'metrics.sqlite3'))
+    store.record_snapshots('UCrange', pd.DataFrame([
+        {'video_id': f'vid{day:08d}', 'title': str(day), 'published_at': f'2024-01-{day:02d}T15:00:00Z',
+         'views': 100, 'likes': 10, 'comments': 1}
+        for day in (1, 15, 31)
+    ]), subscribers=1000)
+    videos = store.latest_snapshots('UCrange', args.start, args.end)
+    assert list(videos['title']) == ['1', '15', '31']
+
+
+def test_importing_does_not_create_the_cache_dir(tmp_path):
+    cache_root = tmp_path / 'cache'
+    env = {'YT_THUMBS_CACHE_DIR': str(cache_root), 'PATH': ''}
+    src = Path(__file__).resolve().parents[1] / 'src'
+    subprocess.run([sys.executable, '-c', 'import utils.data_storage'], cwd=src, env=env, check=True)
+    assert not cache_root.exists()
+
+
+def test_result_cache_stores_numpy_results_as_json(tmp_path):
+    cache = AnalysisResultCache(str(tmp_path / 'results.sqlite3'))
+    palette = [(np.array([255, 0, 10]), np.float64(0.75)), (np.array([0, 0, 0]), np.float64(0.25))]
+    key = cache.make_key('digest', 'colors', '1', {'args': [2], 'kwargs': {}})
+    cache.put(key, 'digest', 'colors', '1', {'args': [2], 'kwargs': {}}, palette)
+
+    blob = cache._conn.execute('SELECT result FROM analysis_results WHERE key = ?', (key,)).fetchone()[0]
+    assert json.loads(blob) == [[[255, 0, 10], 0.75], [[0, 0, 0], 0.25]]
+    assert cache.get(key) == [[[255, 0, 10], 0.75], [[0, 0, 0], 0.25]]
+
+    # Rows from the old pickle format are dropped as misses
+    with cache._conn:
+        cache._conn.execute('UPDATE analysis_results SET result = ? WHERE key = ?', (pickle.dumps(palette), key))
+    assert cache.get(key, 'missing') == 'missing'
+    assert cache._conn.execute('SELECT COUNT(*) FROM analysis_results').fetchone()[0] == 0
+
+
+def _snapshots(prefix, category_id, views, n=5):
+    return pd.DataFrame([
+        {'video_id': f'{prefix}{i:03d}', 'title': f'{prefix} {i}', 'published_at': '2024-01-01T00:00:00Z',
+         'views': views * (i + 1), 'likes': views * (i + 1) // 10, 'comments': 1, 'category_id': category_id}
+        for i in range(n)
+    ])
+
+
+def test_refresh_benchmarks_recomputes_only_dirty_buckets(tmp_path):
+    store = MetricsStore(str(tmp_path / 'metrics.sqlite3'))
+    store.record_snapshots('UCgaming', _snapshots('game', '20', 1000), subscribers=50_000)
+    store.record_snapshots('UCmusic', _snapshots('song', '10', 1000, n=3), subscribers=5_000_000)
+    assert store.refresh_benchmarks() == 7
+
+    def sample(category, size):
+        return store.get_benchmark(category, size, min_videos=0)
+
+    assert (sample('20', 50_000)['videos'], sample('20', 50_000)['category_id']) == (5, '20')
+    assert sample('10', 5_000_000)['videos'] == 3
+    assert store.get_benchmark('99', 50_000, min_videos=5)['size_bucket'] == '10K-100K'
+    assert store.get_benchmark('99', 500, min_videos=8)['videos'] == 8
+
+    # The channel grows into the next size bucket; one video is snapshotted again
+    moved = _snapshots('game', '20', 1000, n=1)
+    store.record_snapshots('UCgaming', moved, subscribers=2_000_000, captured_at='2030-01-01T00:00:00Z')
+    # (20, 10K-100K), (20, 1M-10M) and (20, *) are refreshed; the buckets
+    # spanning every category were refreshed too recently and stay dirty
+    assert store.refresh_benchmarks() == 3
+    assert store._conn.execute('SELECT COUNT(*) FROM benchmark_dirty').fetchone()[0] == 3
+    assert sample('20', 50_000)['videos'] == 4
+    assert sample('20', 2_000_000)['videos'] == 1
+
+    assert store.refresh_benchmarks(global_interval=0) == 3
+    assert store._conn.execute('SELECT COUNT(*) FROM benchmark_dirty').fetchone()[0] == 0
+    assert store.get_benchmark('99', 2_000_000, min_videos=4)['videos'] == 4
+
+
+def test_result_cache_evicts_lru_without_recounting_every_put(tmp_path, monkeypatch):
+    cache = AnalysisResultCache(str(tmp_path / 'results.sqlite3'), max_bytes=10_000)
+    recounts = []
+    total_size = cache._total_size
+    monkeypatch.setattr(cache, '_total_size', lambda: recounts.append(1) or total_size())
+
+    for i in range(5):
+        cache.put(f'key{i}', f'digest{i}', 'text', '1', {}, 'x' * 1000)
+    # Well under the limit: no table scans at all
+    assert recounts == []
+
+    cache.get('key0')
+    for i in range(5, 12):
+        cache.put(f'key{i}', f'digest{i}', 'text', '1', {}, 'x' * 1000)
+    # Each pass evicts down to 90% of the limit, leaving room for the next puts
+    assert len(recounts) == 2
+    assert total_size() <= 10_000
+    # Least recently used entries went first; the one read back stayed
+    assert cache.get('key0') is not None
+    assert [cache.get(f'key{i}') for i in (1, 2, 3, 4)] == [None] * 4
+    assert cache.get('key11') is not None
@@ -0,0 +1,23 @@
+# tests/test_env_loader.py
+
+import logging
+
+from utils.env_loader import env_float, env_int
+
+
+def test_env_numbers_fall_back_on_malformed_values(monkeypatch, caplog):
+    monkeypatch.setenv('TEST_ENV_INT', '42')
+    monkeypatch.setenv('TEST_ENV_FLOAT', '2.5')
+    assert env_int('TEST_ENV_INT', 1) == 42
+    assert env_float('TEST_ENV_FLOAT', 1.0) == 2.5
+
+    monkeypatch.delenv('TEST_ENV_INT')
+    assert env_int('TEST_ENV_INT', 7) == 7
+
+    monkeypatch.setenv('TEST_ENV_INT', '15m')
+    monkeypatch.setenv('TEST_ENV_FLOAT', 'fast')
+    with caplog.at_level(logging.WARNING):
+        assert env_int('TEST_ENV_INT', 900) == 900
+        assert env_float('TEST_ENV_FLOAT', 10.0) == 10.0
+    assert "TEST_ENV_INT='15m'" in caplog.text
+    assert "TEST_ENV_FLOAT='fast'" in caplog.text
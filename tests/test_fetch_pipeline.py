@@ -0,0 +1,40 @@
+# tests/test_fetch_pipeline.py
+
+import pickle
+import time
+
+import pandas as pd
+from PIL import Image
+
+import utils.fetch_pipeline as fetch_pipeline
+
+
+def test_timed_out_request_does_not_touch_the_returned_bundle(monkeypatch):
+    def details(video_ids, api_key):
+        return {video_id: {'channel_id': 'UCchannel'} for video_id in video_ids}
+
+    def slow_thumbnail(video_id):
+        time.sleep(0.3)
+        return Image.new('RGB', (8, 8))
+
+    def failing_sync(channel_id, api_key, store=None):
+        raise RuntimeError("quota exceeded")
+
+    monkeypatch.setattr(fetch_pipeline, 'get_videos_details', details)
+    monkeypatch.setattr(fetch_pipeline, 'get_thumbnail', slow_thumbnail)
+    monkeypatch.setattr(fetch_pipeline, 'sync_channel', failing_sync)
+    monkeypatch.setattr(fetch_pipeline, 'get_video_stats', lambda channel_id, api_key: pd.DataFrame({'views': [1]}))
+
+    bundle = fetch_pipeline.fetch_video_bundle('vid00000001', 'key', timeouts={'thumbnail': 0.05})
+
+    assert bundle.errors == {'thumbnail': 'timed out'}
+    assert bundle.thumbnail is None
+    assert list(bundle.channel_stats['views']) == [1]
+    assert bundle.channel_stats_from_store is False
+    snapshot = dict(bundle.timings)
+    assert 'details' in snapshot and 'channel_stats' in snapshot and 'thumbnail' not in snapshot
+
+    # The straggler finishes after the bundle was returned (and possibly pickled)
+    time.sleep(0.4)
+    assert bundle.timings == snapshot
+    assert pickle.loads(pickle.dumps(bundle)).timings == snapshot
@@ -0,0 +1,86 @@
+# tests/test_image_analysis.py
+
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+import utils.image_analysis as image_analysis
+from utils.image_analysis import detect_text
+
+
+class _CountingReader:
+    def __init__(self):
+        self.detect_calls = []
+
+    def detect(self, image, **kwargs):
+        self.detect_calls.append(kwargs)
+        return [[[0, 80, 0, 40]]], [[]]
+
+    def recognize(self, image, horizontal_list, free_list):
+        return [([[0, 0], [80, 0], [80, 40], [0, 40]], 'SALE', 0.8)]
+
+
+def test_ocr_settings_are_part_of_the_text_cache_key(monkeypatch):
+    reader = _CountingReader()
+
+    @contextmanager
+    def engine():
+        yield reader
+
+    monkeypatch.setattr(image_analysis, 'get_ocr_pool', lambda: type('Pool', (), {'engine': staticmethod(engine)})())
+    pixels = np.random.default_rng(18).integers(0, 256, (90, 160, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels)
+
+    assert detect_text(image, mode='fast', raise_errors=True)['full_text'] == 'SALE'
+    detect_text(image, mode='fast', raise_errors=True)
+    assert len(reader.detect_calls) == 1
+
+    for setting, value in (('OCR_CANVAS_SIZE', 320), ('OCR_TEXT_THRESHOLD', 0.5), ('OCR_MIN_TEXT_SIZE', 20)):
+        monkeypatch.setattr(image_analysis, setting, value)
+        detect_text(image, mode='fast', raise_errors=True)
+    assert reader.detect_calls[1:] == [
+        {'canvas_size': 320, 'min_size': 24, 'text_threshold': 0.8, 'low_text': 0.8},
+        {'canvas_size': 320, 'min_size': 24, 'text_threshold': 0.5, 'low_text': 0.5},
+        {'canvas_size': 320, 'min_size': 20, 'text_threshold': 0.5, 'low_text': 0.5},
+    ]
+
+
+class _ScoringReader:
+    """Detector stub with easyocr's filtering: score >= text_threshold, max(w, h) >= min_size."""
+    # (x_min, x_max, y_min, y_max), detector score
+    REGIONS = [
+        ([10, 300, 10, 70], 0.95),    # headline
+        ([10, 200, 100, 160], 0.75),  # passes easyocr's default 0.7 only
+        ([10, 32, 200, 222], 0.9),    # 22 px square, above easyocr's 20 px minimum
+        ([10, 400, 300, 314], 0.9),   # long strip only 14 px tall
+    ]
+
+    def __init__(self):
+        self.recognized = []
+
+    def detect(self, image, canvas_size, min_size=20, text_threshold=0.7, low_text=0.4):
+        boxes = [box for box, score in self.REGIONS
+                 if score >= text_threshold and max(box[1] - box[0], box[3] - box[2]) >= min_size]
+        free = [[[10, 400], [60, 400], [60, 410], [10, 410]]]  # 10 px tall rotated region
+        return [boxes], [free]
+
+    def recognize(self, image, horizontal_list, free_list):
+        self.recognized.extend(horizontal_list + free_list)
+        return [([[box[0], box[2]], [box[1], box[2]], [box[1], box[3]], [box[0], box[3]]], 'TEXT', 0.9)
+                for box in horizontal_list]
+
+
+def test_fast_mode_never_recognizes_low_score_or_small_regions(monkeypatch):
+    reader = _ScoringReader()
+
+    @contextmanager
+    def engine():
+        yield reader
+
+    monkeypatch.setattr(image_analysis, 'get_ocr_pool', lambda: type('Pool', (), {'engine': staticmethod(engine)})())
+    pixels = np.random.default_rng(180).integers(0, 256, (360, 480, 3), dtype=np.uint8)
+    result = detect_text(Image.fromarray(pixels), mode='fast', raise_errors=True)
+
+    assert reader.recognized == [[10, 300, 10, 70]]
+    assert result['positions'] == [{'left': 10, 'top': 10, 'width': 290, 'height': 60}]
@@ -0,0 +1,73 @@
+# tests/test_main_display.py
+
+import sqlite3
+from datetime import date
+
+import pandas as pd
+import pytest
+import requests
+
+pytest.importorskip('streamlit')
+from components import main_display  # noqa: E402
+from components.main_display import chart_metrics, filter_published  # noqa: E402
+from utils.metrics import SNAPSHOT_COLUMNS, calculate_metrics_frame  # noqa: E402
+
+
+def test_filter_published_keeps_the_whole_end_day():
+    videos = pd.DataFrame({
+        'video_id': ['before', 'first', 'last', 'after'],
+        'published_at': ['2023-12-31T23:59:59Z', '2024-01-01T00:00:00Z', '2024-01-31T23:00:00Z',
+                         '2024-02-01T00:00:00Z'],
+    })
+    kept = filter_published(videos, date(2024, 1, 1), date(2024, 1, 31))
+    assert list(kept['video_id']) == ['first', 'last']
+    assert filter_published(videos, date(2025, 1, 1), date(2025, 1, 31)).empty
+
+
+def test_engagement_score_is_only_offered_with_subscriber_counts():
+    # get_video_stats' fallback frame has no subscribers column
+    stats = pd.DataFrame({
+        'views': [1_000, 2_000], 'likes': [50, 40], 'comments': [5, 1],
+        'published_at': ['2024-01-01T00:00:00Z', '2024-01-05T00:00:00Z'],
+    })
+    metrics = chart_metrics(calculate_metrics_frame(stats, SNAPSHOT_COLUMNS))
+    assert 'engagement_score' not in metrics
+    assert metrics == ['views', 'likes', 'comments', 'like_ratio', 'comment_ratio', 'view_velocity']
+
+    with_subscribers = calculate_metrics_frame(stats.assign(subscribers=10_000), SNAPSHOT_COLUMNS)
+    assert 'engagement_score' in chart_metrics(with_subscribers)
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    shown = []
+    monkeypatch.setattr(main_display.st, 'warning', lambda body, **kwargs: shown.append(('warning', body)))
+    monkeypatch.setattr(main_display.st, 'info', lambda body, **kwargs: shown.append(('info', body)))
+    monkeypatch.setattr(main_display.st, 'image', lambda *args, **kwargs: shown.append(('image', kwargs['caption'])))
+    return shown
+
+
+def test_similar_thumbnails_warns_when_the_index_fails(monkeypatch, messages):
+    def broken(video_id, image, limit):
+        raise sqlite3.OperationalError('database is locked')
+    monkeypatch.setattr(main_display.cache, 'similar_thumbnails', broken)
+
+    main_display.show_similar_thumbnails('abc', None)
+    assert messages == [('warning', 'Similar thumbnails unavailable')]
+
+
+def test_similar_thumbnails_skips_matches_that_fail_to_download(monkeypatch, messages):
+    matches = [{'video_id': 'gone', 'score': 0.1}, {'video_id': 'ok', 'score': 0.2}]
+    monkeypatch.setattr(main_display.cache, 'similar_thumbnails', lambda video_id, image, limit: matches)
+
+    class _Image:
+        image = None
+
+    def thumbnail(video_id, size):
+        if video_id == 'gone':
+            raise requests.ConnectionError('connection reset')
+        return _Image()
+    monkeypatch.setattr(main_display.cache, 'thumbnail', thumbnail)
+
+    main_display.show_similar_thumbnails('abc', None)
+    assert messages == [('image', 'ok · 80% similar'), ('info', '1 similar thumbnail could not be loaded')]
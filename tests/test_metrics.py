@@ -0,0 +1,55 @@
+# tests/test_metrics.py
+
+import math
+
+import pandas as pd
+import pytest
+
+from utils.metrics import METRIC_COLUMNS, SNAPSHOT_COLUMNS, calculate_metrics_frame
+from utils.youtube import calculate_video_metrics
+
+NOW = pd.Timestamp('2024-01-11T00:00:00Z')
+
+
+def test_metrics_frame_computes_every_row():
+    frame = pd.DataFrame({
+        'views': [10_000, 0, 500],
+        'likes': [500, 0, 2],
+        'comments': [60, 0, 0],
+        'subscribers': [100_000, 1_000, None],
+        'published_at': ['2024-01-01T00:00:00Z', '2024-01-10T00:00:00Z', '2024-01-10T12:00:00Z'],
+    })
+    result = calculate_metrics_frame(frame, SNAPSHOT_COLUMNS, now=NOW)
+
+    first = result.iloc[0]
+    assert first['like_ratio'] == pytest.approx(5.0)
+    assert first['comment_ratio'] == pytest.approx(0.6)
+    assert first['sub_conversion'] == pytest.approx(10.0)
+    assert first['view_velocity'] == pytest.approx(1_000)
+    assert first['engagement_score'] == pytest.approx(100)
+    assert (first['like_grade'], first['comment_grade']) == ('Good', 'Good')
+
+    # Zero views give NaN instead of raising
+    assert math.isnan(result.iloc[1]['like_ratio'])
+    assert pd.isna(result.iloc[1]['like_grade'])
+    # Unknown subscribers only affect the subscriber-based metric
+    third = result.iloc[2]
+    assert math.isnan(third['sub_conversion'])
+    assert third['like_ratio'] == pytest.approx(0.4)
+    assert third['like_grade'] == 'Poor'
+    # Published less than a day ago counts as one day
+    assert third['view_velocity'] == pytest.approx(500)
+
+    # The input frame is left alone
+    assert not set(METRIC_COLUMNS) & set(frame.columns)
+
+
+def test_single_video_metrics_match_the_frame():
+    details = {'view_count': 2_000, 'like_count': 50, 'comment_count': 3, 'subscriber_count': 10_000,
+               'published_at': '2024-01-01T00:00:00Z', 'title': 'x'}
+    metrics = calculate_video_metrics(details)
+    row = calculate_metrics_frame(pd.DataFrame([details])).iloc[0]
+    for name in ('like_ratio', 'comment_ratio', 'sub_conversion', 'engagement_score'):
+        assert metrics[name] == pytest.approx(row[name])
+    assert metrics['performance'] == {'like_ratio': 'Average', 'comment_ratio': 'Average'}
+    assert 'like_ratio' not in details
@@ -0,0 +1,59 @@
+# tests/test_ocr_pool.py
+
+import threading
+import time
+
+import pytest
+
+from utils.ocr_pool import OCREnginePool
+
+
+class _Reader:
+    def readtext(self, image):
+        return []
+
+
+def test_waiter_creates_an_engine_after_the_first_construction_fails():
+    creating = threading.Event()
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            creating.set()
+            time.sleep(0.2)
+            raise RuntimeError('model download failed')
+        return _Reader()
+
+    pool = OCREnginePool(size=1, factory=factory)
+    errors = []
+
+    def first():
+        try:
+            with pool.engine(timeout=10):
+                pass
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    creating.wait(5)
+
+    # The pool is full while the first reader is being built; once that
+    # fails, the waiter must take over the slot rather than time out
+    start = time.monotonic()
+    with pool.engine(timeout=10) as reader:
+        assert isinstance(reader, _Reader)
+    thread.join()
+
+    assert time.monotonic() - start < 5
+    assert len(errors) == 1
+    assert pool.stats == {'size': 1, 'created': 1, 'idle': 1}
+
+
+def test_full_pool_times_out():
+    pool = OCREnginePool(size=1, factory=_Reader)
+    with pool.engine():
+        with pytest.raises(TimeoutError):
+            with pool.engine(timeout=0.05):
+                pass
@@ -0,0 +1,53 @@
+# tests/test_palette.py
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from utils.palette import PALETTE_STRATEGIES, compare_palette_strategies, extract_palette, palette_error
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+import bench_image_analysis as bench  # noqa: E402
+
+
+def _blocks() -> Image.Image:
+    pixels = np.zeros((60, 80, 3), dtype=np.uint8)
+    pixels[:, :40] = (200, 30, 30)
+    pixels[:30, 40:] = (20, 20, 220)
+    pixels[30:, 40:] = (240, 240, 240)
+    return Image.fromarray(pixels)
+
+
+def test_palette_error_is_zero_for_identical_and_one_for_opposite_palettes():
+    palette = extract_palette(_blocks(), 3, 'exact')
+    assert palette_error(palette, palette) == 0.0
+    black = [(np.array([0, 0, 0]), 1.0)]
+    white = [(np.array([255, 255, 255]), 1.0)]
+    assert palette_error(white, black) == pytest.approx(1.0)
+    assert palette_error([], black) == 1.0
+
+
+def test_every_strategy_is_scored_against_exact():
+    report = compare_palette_strategies(_blocks(), 3)
+    assert set(report) == set(PALETTE_STRATEGIES)
+    assert report['exact']['error'] == 0.0
+    for scores in report.values():
+        assert scores['seconds'] >= 0
+        # Three flat colours are easy: every strategy should find them
+        assert 0.0 <= scores['error'] < 0.05
+
+
+def test_benchmark_reports_palette_error_vs_exact(monkeypatch, tmp_path):
+    monkeypatch.setattr(bench, 'SIZES', {'default': (120, 90)})
+    monkeypatch.setattr(bench, 'FIXTURES_DIR', str(tmp_path))
+
+    report = bench.run(repeats=1, n_colors=3, with_ocr=False, only='analyze_colors')
+
+    rows = {row['function']: row for row in report['results']}
+    assert set(rows) == {f'analyze_colors[{name}]' for name in PALETTE_STRATEGIES}
+    assert rows['analyze_colors[exact]']['error_vs_exact'] == 0.0
+    for row in rows.values():
+        assert 0.0 <= row['error_vs_exact'] <= 1.0
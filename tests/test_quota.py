@@ -0,0 +1,164 @@
+# tests/test_quota.py
+
+import json
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import utils.youtube_client as youtube_client
+import utils.quota as quota
+from utils.quota import INTERACTIVE, QuotaExceededError, QuotaScheduler
+from utils.youtube_client import BatchRequestError, list_videos
+
+
+class _FakeYouTubeAPI(BaseHTTPRequestHandler):
+    """
+    videos.list that echoes the requested IDs, alone or in a batch; keys
+    starting with 'exhausted' get quotaExceeded.
+    """
+    delay = 0.0
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _videos_list(self, path):
+        query = parse_qs(urlparse(path).query)
+        type(self).requests.append(path)
+        if query['key'][0].startswith('exhausted'):
+            return 403, {'error': {'code': 403, 'message': 'The request cannot be completed because you '
+                                                            'have exceeded your quota.',
+                                   'errors': [{'reason': 'quotaExceeded', 'domain': 'youtube.quota'}]}}
+        return 200, {'items': [{'id': video_id} for video_id in query['id'][0].split(',')]}
+
+    def _send(self, status, content_type, data):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        status, body = self._videos_list(self.path)
+        self._send(status, 'application/json', json.dumps(body).encode())
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+        parts = []
+        for part in message.iter_parts():
+            path = part.get_payload().split(' ')[1]
+            status, response = self._videos_list(path)
+            parts.append(f"--reply\r\nContent-Type: application/http\r\n"
+                         f"Content-ID: <response-{part['Content-ID'][1:]}\r\n\r\n"
+                         f"HTTP/1.1 {status} {'OK' if status == 200 else 'Forbidden'}\r\n"
+                         f"Content-Type: application/json\r\n\r\n{json.dumps(response)}\r\n")
+        self._send(200, 'multipart/mixed; boundary=reply', (''.join(parts) + '--reply--\r\n').encode())
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    _FakeYouTubeAPI.requests = []
+    _FakeYouTubeAPI.delay = 0.0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeYouTubeAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f'http://127.0.0.1:{server.server_port}'
+    monkeypatch.setenv('YOUTUBE_API_ENDPOINT', endpoint)
+    monkeypatch.setattr(youtube_client, 'API_ENDPOINT', endpoint)
+    yield _FakeYouTubeAPI
+    server.shutdown()
+
+
+def _videos_list(api_key, video_id):
+    # Clients are cached per thread and key; the tests use fresh keys so
+    # every client points at this test's server
+    return youtube_client.get_youtube_client(api_key).videos().list(part='id', id=video_id)
+
+
+def test_token_bucket_throttles_then_rejects(fake_api):
+    # 3 units of burst, refilled at 10 units/s
+    scheduler = QuotaScheduler(daily_quota=864000, burst=3, background_reserve=0)
+    start = time.monotonic()
+    for i in range(5):
+        response = scheduler.execute(_videos_list('throttle-key', f'vid{i}'), INTERACTIVE, timeout=5)
+        assert response['items'] == [{'id': f'vid{i}'}]
+    elapsed = time.monotonic() - start
+    assert len(fake_api.requests) == 5
+    # The last two calls each waited for a unit to refill
+    assert elapsed >= 0.15
+
+    slow = QuotaScheduler(daily_quota=1, burst=2, background_reserve=0)
+    for i in range(2):
+        slow.execute(_videos_list('reject-key', f'other{i}'), INTERACTIVE, timeout=0.1)
+    with pytest.raises(QuotaExceededError):
+        slow.execute(_videos_list('reject-key', 'other2'), INTERACTIVE, timeout=0.1)
+    assert len(fake_api.requests) == 7
+    assert slow.stats['rejected'] == 1
+
+
+def test_identical_concurrent_requests_are_coalesced(fake_api):
+    fake_api.delay = 0.3
+    scheduler = QuotaScheduler(daily_quota=10000, burst=100, background_reserve=0)
+    results = []
+
+    def call():
+        results.append(scheduler.execute(_videos_list('coalesce-key', 'same'), INTERACTIVE, timeout=5))
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fake_api.requests) == 1
+    assert results == [{'items': [{'id': 'same'}]}] * 5
+    assert scheduler.stats['units'] == 1
+
+
+def test_quota_exceeded_drains_the_bucket(fake_api):
+    scheduler = QuotaScheduler(daily_quota=10000, burst=100, background_reserve=0)
+    with pytest.raises(QuotaExceededError):
+        scheduler.execute(_videos_list('exhausted-key', 'first'), INTERACTIVE, timeout=0.1)
+    assert len(fake_api.requests) == 1
+    assert scheduler._bucket('exhausted-key').available() <= 0.01
+
+    # The next call is refused locally instead of spending another request
+    with pytest.raises(QuotaExceededError):
+        scheduler.execute(_videos_list('exhausted-key', 'second'), INTERACTIVE, timeout=0.1)
+    assert len(fake_api.requests) == 1
+
+
+def test_quota_exceeded_in_a_batch_pauses_the_key(fake_api, monkeypatch):
+    scheduler = QuotaScheduler(daily_quota=10000, burst=100, background_reserve=0)
+    monkeypatch.setattr(quota, '_scheduler', scheduler)
+    client = youtube_client.get_youtube_client('exhausted-batch-key')
+    video_ids = [f'vid{i:03d}' for i in range(120)]
+
+    # Three videos.list calls in one batch POST to the overridden endpoint
+    with pytest.raises(BatchRequestError) as excinfo:
+        list_videos(client, video_ids)
+    assert len(fake_api.requests) == 3
+    assert set(excinfo.value.failed) == set(video_ids)
+    assert all(isinstance(error, QuotaExceededError) for error in excinfo.value.failed.values())
+    assert scheduler._bucket('exhausted-batch-key').available() <= 0.01
+
+    # Later batches are refused locally instead of spending more requests
+    with pytest.raises(BatchRequestError) as excinfo:
+        list_videos(client, video_ids)
+    assert len(fake_api.requests) == 3
+    assert all(isinstance(error, QuotaExceededError) for error in excinfo.value.failed.values())
+
+
+def test_batches_use_the_endpoint_override(fake_api, monkeypatch):
+    monkeypatch.setattr(quota, '_scheduler', QuotaScheduler(daily_quota=10000, burst=1000, background_reserve=0))
+    video_ids = [f'ok{i:03d}' for i in range(120)]
+    items = list_videos(youtube_client.get_youtube_client('batch-endpoint-key'), video_ids)
+    assert sorted(items) == video_ids
+    assert len(fake_api.requests) == 3
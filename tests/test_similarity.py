@@ -0,0 +1,56 @@
+# tests/test_similarity.py
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import utils.api as api
+from utils.similarity import SimilarityIndex, dhash, palette_vector
+
+
+def _image(seed, size=(320, 180)):
+    pixels = np.random.default_rng(seed).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def test_similar_videos_reports_thumbnails_that_cannot_be_downloaded(monkeypatch):
+    def missing(video_id, size=None):
+        raise ValueError(f"No thumbnail available for video {video_id}")
+
+    monkeypatch.setattr(api, 'get_thumbnail', missing)
+    with pytest.raises(ValueError, match='Could not download the thumbnail of noThumb001'):
+        api.similar_videos('noThumb001')
+
+
+def test_query_ranks_near_duplicates_first(tmp_path):
+    index = SimilarityIndex(str(tmp_path / 'similarity.sqlite3'))
+    original = _image(1)
+    palette = palette_vector([(np.array([200, 30, 30]), 0.7), (np.array([20, 20, 20]), 0.3)])
+    index.add('original000', dhash(original), palette)
+    index.add('resized0000', dhash(original.resize((160, 90))), palette)
+    for seed in range(2, 12):
+        index.add(f'other{seed:06d}', dhash(_image(seed)), palette_vector([(np.array([0, 0, 255]), 1.0)]))
+
+    results = index.query(dhash(original), palette, k=3, exclude='original000')
+    assert results[0]['video_id'] == 'resized0000'
+    assert results[0]['hamming'] <= 8
+    assert all(result['video_id'] != 'original000' for result in results)
+
+
+def test_re_adding_an_unchanged_thumbnail_keeps_its_row(tmp_path):
+    index = SimilarityIndex(str(tmp_path / 'similarity.sqlite3'))
+    image = _image(42)
+    palette = palette_vector([(np.array([10, 200, 10]), 1.0)])
+
+    def row_id():
+        return index._conn.execute("SELECT id FROM thumbnail_hashes WHERE video_id = 'unchanged00'").fetchone()[0]
+
+    assert index.add('unchanged00', dhash(image), palette)
+    first = row_id()
+    assert not index.add('unchanged00', dhash(image), palette)
+    assert row_id() == first
+
+    assert index.add('unchanged00', dhash(_image(43)), palette)
+    assert row_id() > first
+    assert index.get('unchanged00')[0] == dhash(_image(43))
+    assert len(index) == 1
@@ -0,0 +1,87 @@
+# tests/test_singleflight.py
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from utils.singleflight import SingleFlight, single_flight
+
+
+def _run_concurrently(func, n=4):
+    results, errors = [None] * n, [None] * n
+
+    def call(i):
+        try:
+            results[i] = func()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_calls_run_once():
+    calls = []
+
+    @single_flight('test.run_once')
+    def slow(value):
+        calls.append(value)
+        time.sleep(0.2)
+        return {'value': value}
+
+    results, _ = _run_concurrently(lambda: slow(1))
+    assert len(calls) == 1
+    assert results == [{'value': 1}] * 4
+    assert slow.flight.stats['collapsed'] == 3
+    assert slow.flight.stats['in_flight'] == 0
+
+
+def test_waiters_get_their_own_copy():
+    @single_flight('test.copies')
+    def frame():
+        time.sleep(0.2)
+        return pd.DataFrame({'views': [1, 2]}), {'tags': ['a']}
+
+    results, _ = _run_concurrently(frame)
+    frames = [result[0] for result in results]
+    # Every caller mutating its result must leave the others untouched
+    for i, (df, details) in enumerate(results):
+        df['views'] += 10 * (i + 1)
+        details['tags'].append(i)
+    assert len({id(df) for df in frames}) == 4
+    for i, (df, details) in enumerate(results):
+        assert df['views'].tolist() == [1 + 10 * (i + 1), 2 + 10 * (i + 1)]
+        assert details['tags'] == ['a', i]
+
+
+def test_exceptions_are_shared_and_not_cached():
+    group = SingleFlight('test.errors')
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        time.sleep(0.2)
+        raise RuntimeError('boom')
+
+    _, errors = _run_concurrently(lambda: group.do('key', failing))
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert len(attempts) == 1
+    assert group.do('key', lambda: 'ok') == 'ok'
+
+
+def test_format_date_leaves_shared_frame_alone():
+    pytest.importorskip('streamlit')
+    from components.main_display import format_date
+
+    shared = pd.DataFrame({'published_at': ['2024-01-01T00:00:00Z', '2024-03-01T00:00:00Z']})
+    dtype = shared['published_at'].dtype
+    formatted = format_date(shared)
+    assert 'display_date' in formatted
+    assert list(shared.columns) == ['published_at']
+    assert shared['published_at'].dtype == dtype
@@ -0,0 +1,84 @@
+# tests/test_thumbnail_cache.py
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import utils.thumbnail_cache as thumbnail_cache
+from utils.thumbnail_cache import ThumbnailCache
+
+
+class _NoNetwork:
+    def get(self, *args, **kwargs):
+        raise AssertionError("no request should be made")
+
+
+@pytest.mark.parametrize('video_id', [
+    '../../../etc/passwd', '..%2F..%2Fx', 'short', 'abcdefghijk\n', 'abcdefghij/', 'abcdefghijkl', '', None,
+])
+def test_invalid_video_ids_are_refused(tmp_path, video_id):
+    cache = ThumbnailCache(str(tmp_path), session=_NoNetwork())
+    with pytest.raises(ValueError):
+        cache.get(video_id, 'hqdefault')
+    assert os.listdir(tmp_path / 'index') == []
+
+
+def test_unknown_resolutions_are_refused(tmp_path):
+    cache = ThumbnailCache(str(tmp_path), session=_NoNetwork())
+    with pytest.raises(ValueError):
+        cache.get('dQw4w9WgXcQ', '../hqdefault')
+
+
+class _ThumbnailServer(BaseHTTPRequestHandler):
+    """Serves one JPEG for every path, honouring If-None-Match."""
+    body = b''
+    etag = ''
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.send_header('ETag', self.etag)
+        self.end_headers()
+        self.wfile.write(self.body)
+
+
+def _jpeg(color):
+    buffer = BytesIO()
+    Image.new('RGB', (640, 360), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def test_changed_thumbnail_replaces_every_decoded_size(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ThumbnailServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(thumbnail_cache, 'THUMBNAIL_URL',
+                        f'http://127.0.0.1:{server.server_port}/vi/{{video_id}}/{{resolution}}.jpg')
+    try:
+        _ThumbnailServer.body, _ThumbnailServer.etag = _jpeg((255, 0, 0)), '"red"'
+        # max_age=0 revalidates on every call
+        cache = ThumbnailCache(str(tmp_path), max_age=0)
+        assert cache.get('dQw4w9WgXcQ', 'hqdefault').getpixel((0, 0))[0] > 200
+        assert cache.get('dQw4w9WgXcQ', 'hqdefault', (160, 90)).getpixel((0, 0))[0] > 200
+
+        _ThumbnailServer.body, _ThumbnailServer.etag = _jpeg((0, 0, 255)), '"blue"'
+        assert cache.get('dQw4w9WgXcQ', 'hqdefault').getpixel((0, 0))[2] > 200
+        # The small size was decoded from the old image; the 304 it now gets
+        # must not bring the red copy back
+        small = cache.get('dQw4w9WgXcQ', 'hqdefault', (160, 90))
+        assert small.size == (160, 90)
+        assert small.getpixel((0, 0))[2] > 200
+    finally:
+        server.shutdown()
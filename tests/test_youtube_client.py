@@ -0,0 +1,69 @@
+# tests/test_youtube_client.py
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import utils.youtube as youtube
+from utils.youtube_client import BatchRequestError, get_youtube_client, list_videos
+
+
+def _http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'{"error": {"message": "backend error"}}')
+
+
+class _FakeBatch:
+    """Batch that answers every call locally, failing the ones in `failing`."""
+
+    def __init__(self, callback, failing):
+        self.callback = callback
+        self.failing = failing
+        self.calls = []
+
+    def add(self, request, request_id):
+        self.calls.append((request_id, request))
+
+    def execute(self):
+        for request_id, request in self.calls:
+            if request_id in self.failing:
+                self.callback(request_id, None, _http_error(500))
+            else:
+                ids = request.uri.split('id=')[1].split('&')[0].split('%2C')
+                self.callback(request_id, {'items': [{'id': video_id} for video_id in ids]}, None)
+
+
+class _FakeClient:
+    def __init__(self, failing):
+        self._client = get_youtube_client('batch-test-key')
+        self._failing = failing
+
+    def videos(self):
+        return self._client.videos()
+
+    def new_batch_http_request(self, callback):
+        return _FakeBatch(callback, self._failing)
+
+
+def test_failed_batch_calls_report_their_ids():
+    video_ids = [f'video{i:06d}' for i in range(120)]
+    with pytest.raises(BatchRequestError) as excinfo:
+        list_videos(_FakeClient(failing={'1'}), video_ids, part='id')
+    # The second chunk of 50 failed; the others still came back
+    assert sorted(excinfo.value.failed) == video_ids[50:100]
+    assert sorted(excinfo.value.responses) == video_ids[:50] + video_ids[100:]
+
+    assert sorted(list_videos(_FakeClient(failing=set()), video_ids, part='id')) == video_ids
+
+
+def test_get_videos_details_raises_api_errors_other_than_404(monkeypatch):
+    def failing_list(status):
+        def list_videos(*args, **kwargs):
+            raise _http_error(status)
+        return list_videos
+
+    monkeypatch.setattr(youtube, 'list_videos', failing_list(500))
+    with pytest.raises(HttpError):
+        youtube.get_videos_details(['abcdefghijk'], 'details-key')
+
+    monkeypatch.setattr(youtube, 'list_videos', failing_list(404))
+    assert youtube.get_videos_details(['abcdefghijk'], 'details-key') == {}